@@ -0,0 +1,385 @@
+# binlog.py
+"""Compact append-only binary log of the metrics `log_results` writes.
+
+The file is a sequence of length-prefixed records. A schema record lists the column
+names (the `data_points` keys, in order) and starts a new block. Each row record in
+the block holds:
+
+- a null bitmap and a text bitmap over the columns;
+- a bit stream of the delta-of-delta encoded timestamp (epoch seconds), followed by
+  the XOR-compressed float of every numeric cell, Gorilla-style;
+- the text cells (Wi-Fi details, series, TIMEOUT markers) as length-prefixed UTF-8,
+  where length 0 means "same as the previous row".
+
+Compression state carries across the rows of a block, so rows must be read in order.
+A writer opening an existing file replays its last block and keeps appending to it
+when the columns match, so short-lived writers (one per `run-once`) do not repeat
+the schema and restart compression for every row. Blocks are capped at
+MAX_BLOCK_ROWS rows, which bounds that replay. Each record is byte-aligned and
+length-prefixed, so a row truncated by a crash is dropped by the reader, and a
+writer cuts it off before appending.
+"""
+
+import struct
+from datetime import datetime
+from typing import IO, Iterator, Mapping, Optional, Sequence
+
+MAGIC = b"SGLB"
+VERSION = 1
+_SCHEMA = 1
+_ROW = 2
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Rows per block before a new schema record restarts compression.
+MAX_BLOCK_ROWS = 1024
+
+# Delta-of-delta buckets: (control bit count, value bit count), as in the Gorilla paper,
+# with a 64-bit fallback for arbitrary gaps.
+_DOD_BUCKETS = ((2, 7), (3, 9), (4, 12))
+
+
+# --- Bit I/O ---
+class BitWriter:
+    """Accumulates bits most-significant first into a byte string."""
+
+    def __init__(self) -> None:
+        self._value = 0
+        self._bits = 0
+
+    def write(self, value: int, bits: int) -> None:
+        if bits:
+            self._value = (self._value << bits) | (value & ((1 << bits) - 1))
+            self._bits += bits
+
+    def getvalue(self) -> bytes:
+        padding = -self._bits % 8
+        return (self._value << padding).to_bytes((self._bits + padding) // 8, "big")
+
+
+class BitReader:
+    def __init__(self, data: bytes) -> None:
+        self._value = int.from_bytes(data, "big")
+        self._remaining = len(data) * 8
+
+    def read(self, bits: int) -> int:
+        if bits > self._remaining:
+            raise EOFError("Bit stream exhausted")
+        self._remaining -= bits
+        return (self._value >> self._remaining) & ((1 << bits) - 1)
+
+
+def _signed(value: int, bits: int) -> int:
+    return value - (1 << bits) if value >= 1 << (bits - 1) else value
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise EOFError("Truncated varint")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _read_stream_varint(stream: IO[bytes]) -> Optional[int]:
+    value = shift = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            return None
+        value |= (byte[0] & 0x7F) << shift
+        if not byte[0] & 0x80:
+            return value
+        shift += 7
+
+
+# --- Block compression state ---
+class _BlockState:
+    """Previous timestamp/delta and per-column XOR state for one schema block."""
+
+    def __init__(self, columns: Sequence[str]) -> None:
+        self.columns = list(columns)
+        self.prev_ts: Optional[int] = None
+        self.prev_delta = 0
+        self.prev_bits: list[Optional[int]] = [None] * len(columns)
+        self.window: list[tuple[int, int]] = [(64, 0)] * len(columns)  # (leading, trailing)
+        self.prev_text: list[str] = [""] * len(columns)
+        self.rows = 0
+
+
+def _float_bits(value: float) -> int:
+    return struct.unpack(">Q", struct.pack(">d", value))[0]
+
+
+def _bits_float(bits: int) -> float:
+    return struct.unpack(">d", struct.pack(">Q", bits))[0]
+
+
+def _write_timestamp(bits: BitWriter, state: _BlockState, ts: int) -> None:
+    if state.prev_ts is None:
+        bits.write(ts, 64)
+    else:
+        delta = ts - state.prev_ts
+        dod = delta - state.prev_delta
+        if dod == 0:
+            bits.write(0, 1)
+        else:
+            for control, width in _DOD_BUCKETS:
+                if -(1 << (width - 1)) < dod <= 1 << (width - 1):
+                    # Control is `control - 1` ones followed by a zero, e.g. 10, 110, 1110.
+                    bits.write((1 << control) - 2, control)
+                    bits.write(dod - 1 if dod > 0 else dod, width)
+                    break
+            else:
+                bits.write(0b1111, 4)
+                bits.write(dod, 64)
+        state.prev_delta = delta
+    state.prev_ts = ts
+
+
+def _read_timestamp(bits: BitReader, state: _BlockState) -> int:
+    if state.prev_ts is None:
+        ts = _signed(bits.read(64), 64)
+    else:
+        control = 0
+        while control < 4 and bits.read(1):
+            control += 1
+        if control == 0:
+            dod = 0
+        elif control < 4:
+            width = _DOD_BUCKETS[control - 1][1]
+            dod = _signed(bits.read(width), width)
+            dod = dod + 1 if dod >= 0 else dod
+        else:
+            dod = _signed(bits.read(64), 64)
+        state.prev_delta += dod
+        ts = state.prev_ts + state.prev_delta
+    state.prev_ts = ts
+    return ts
+
+
+def _write_float(bits: BitWriter, state: _BlockState, index: int, value: float) -> None:
+    current = _float_bits(value)
+    previous = state.prev_bits[index]
+    state.prev_bits[index] = current
+    if previous is None:
+        bits.write(current, 64)
+        return
+    xor = current ^ previous
+    if xor == 0:
+        bits.write(0, 1)
+        return
+    bits.write(1, 1)
+    leading = min(64 - xor.bit_length(), 31)
+    trailing = (xor & -xor).bit_length() - 1
+    prev_leading, prev_trailing = state.window[index]
+    if leading >= prev_leading and trailing >= prev_trailing:
+        # Meaningful bits fit in the previous window: reuse it.
+        bits.write(0, 1)
+        bits.write(xor >> prev_trailing, 64 - prev_leading - prev_trailing)
+        return
+    meaningful = 64 - leading - trailing
+    bits.write(1, 1)
+    bits.write(leading, 5)
+    bits.write(meaningful & 0x3F, 6)  # 64 is stored as 0
+    bits.write(xor >> trailing, meaningful)
+    state.window[index] = (leading, trailing)
+
+
+def _read_float(bits: BitReader, state: _BlockState, index: int) -> float:
+    previous = state.prev_bits[index]
+    if previous is None:
+        current = bits.read(64)
+    elif not bits.read(1):
+        current = previous
+    else:
+        if bits.read(1):
+            leading = bits.read(5)
+            meaningful = bits.read(6) or 64
+            state.window[index] = (leading, 64 - leading - meaningful)
+        leading, trailing = state.window[index]
+        current = previous ^ (bits.read(64 - leading - trailing) << trailing)
+    state.prev_bits[index] = current
+    return _bits_float(current)
+
+
+def _bitmap(flags: Sequence[bool]) -> bytes:
+    value = 0
+    for flag in flags:
+        value = (value << 1) | flag
+    padding = -len(flags) % 8
+    return (value << padding).to_bytes((len(flags) + padding) // 8, "big")
+
+
+def _unbitmap(data: bytes, count: int) -> list[bool]:
+    value = int.from_bytes(data, "big")
+    total = len(data) * 8
+    return [bool((value >> (total - 1 - i)) & 1) for i in range(count)]
+
+
+# --- Writer ---
+class BinaryLogWriter:
+    """Appends rows to a binary log, continuing its last block while the columns match."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "ab")
+        self._state: Optional[_BlockState] = None
+        if self._file.tell() == 0:
+            self._file.write(MAGIC + bytes([VERSION]))
+        else:
+            self._resume()
+
+    def _resume(self) -> None:
+        """
+        Replays the last block to pick up its compression state, and truncates a record
+        cut off by a crash so new rows are not appended inside it.
+        """
+        with open(self.path, "rb") as stream:
+            _read_header(stream, self.path)
+            end = stream.tell()
+            for kind, payload in _records(stream):
+                end = stream.tell()
+                if kind == _SCHEMA:
+                    self._state = _BlockState(_parse_schema(payload))
+                elif kind == _ROW and self._state is not None:
+                    _decode_row(payload, self._state)
+        if end < self._file.tell():
+            self._file.truncate(end)
+
+    def _write_record(self, kind: int, payload: bytes) -> None:
+        self._file.write(bytes([kind]) + _varint(len(payload)) + payload)
+
+    def _start_block(self, columns: Sequence[str]) -> None:
+        payload = bytearray(_varint(len(columns)))
+        for name in columns:
+            encoded = name.encode()
+            payload += _varint(len(encoded)) + encoded
+        self._write_record(_SCHEMA, bytes(payload))
+        self._state = _BlockState(columns)
+
+    def append(self, timestamp: str, row: Mapping[str, object]) -> None:
+        """Appends one row; a different set of columns starts a new block."""
+        columns = list(row)
+        state = self._state
+        if state is None or state.columns != columns or state.rows >= MAX_BLOCK_ROWS:
+            self._start_block(columns)
+        state = self._state
+        assert state is not None
+        values = list(row.values())
+        present = [v is not None and v != "N/A" for v in values]
+        is_text = [p and not isinstance(v, (int, float)) for p, v in zip(present, values)]
+
+        bits = BitWriter()
+        ts = int(datetime.strptime(timestamp, _TIMESTAMP_FORMAT).timestamp())
+        _write_timestamp(bits, state, ts)
+        texts = bytearray()
+        for index, value in enumerate(values):
+            if not present[index]:
+                continue
+            if isinstance(value, (int, float)):
+                _write_float(bits, state, index, float(value))
+            else:
+                text = str(value)
+                if text == state.prev_text[index]:
+                    texts += _varint(0)
+                else:
+                    encoded = text.encode()
+                    texts += _varint(len(encoded) + 1) + encoded
+                    state.prev_text[index] = text
+        stream = bits.getvalue()
+        payload = _bitmap(present) + _bitmap(is_text) + _varint(len(stream)) + stream + texts
+        self._write_record(_ROW, payload)
+        state.rows += 1
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+# --- Reader ---
+def _read_header(stream: IO[bytes], path: str) -> None:
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{path} is not a binary results log")
+    version = stream.read(1)
+    if not version or version[0] != VERSION:
+        raise ValueError(f"Unsupported binary log version in {path}")
+
+
+def _records(stream: IO[bytes]) -> Iterator[tuple[int, bytes]]:
+    """Yields (kind, payload) for each complete record, stopping at a partial one."""
+    while True:
+        kind = stream.read(1)
+        length = _read_stream_varint(stream) if kind else None
+        if length is None:
+            return
+        payload = stream.read(length)
+        if len(payload) < length:
+            return  # Partial record from an interrupted write
+        yield kind[0], payload
+
+
+def read_binary_log(path: str) -> Iterator[tuple[datetime, dict[str, float | str | None]]]:
+    """
+    Streams (timestamp, row) pairs back out of a binary log in write order. Numeric
+    cells come back as floats, missing cells as None. A truncated trailing record is
+    ignored.
+    """
+    with open(path, "rb") as stream:
+        _read_header(stream, path)
+        state: Optional[_BlockState] = None
+        for kind, payload in _records(stream):
+            if kind == _SCHEMA:
+                state = _BlockState(_parse_schema(payload))
+            elif kind == _ROW and state is not None:
+                yield _decode_row(payload, state)
+
+
+def _parse_schema(payload: bytes) -> list[str]:
+    count, pos = _read_varint(payload, 0)
+    columns = []
+    for _ in range(count):
+        size, pos = _read_varint(payload, pos)
+        columns.append(payload[pos : pos + size].decode())
+        pos += size
+    return columns
+
+
+def _decode_row(payload: bytes, state: _BlockState) -> tuple[datetime, dict]:
+    count = len(state.columns)
+    width = (count + 7) // 8
+    present = _unbitmap(payload[:width], count)
+    is_text = _unbitmap(payload[width : 2 * width], count)
+    size, pos = _read_varint(payload, 2 * width)
+    bits = BitReader(payload[pos : pos + size])
+    pos += size
+    ts = _read_timestamp(bits, state)
+    row: dict[str, float | str | None] = {}
+    for index, name in enumerate(state.columns):
+        if not present[index]:
+            row[name] = None
+        elif is_text[index]:
+            length, pos = _read_varint(payload, pos)
+            if length:
+                state.prev_text[index] = payload[pos : pos + length - 1].decode()
+                pos += length - 1
+            row[name] = state.prev_text[index]
+        else:
+            row[name] = _read_float(bits, state, index)
+    state.rows += 1
+    return datetime.fromtimestamp(ts), row
@@ -0,0 +1,84 @@
+# breaker.py
+"""Per-probe circuit breakers, so a probe that keeps failing stops costing every cycle.
+
+A breaker starts closed and lets its probe run. After `failure_threshold` failures in
+a row it opens, and the probe is skipped until a cooldown passes. The first run after
+that is a half-open trial: success closes the breaker again, failure reopens it with
+the cooldown doubled (up to `max_cooldown`). Cooldowns run on time.monotonic(), like
+the scheduler.
+"""
+
+import time
+from typing import Callable, Literal, Optional
+
+State = Literal["closed", "open", "half_open"]
+
+
+class CircuitBreaker:
+    """Closed -> open -> half-open state machine for one probe."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        base_cooldown: float = 300.0,
+        max_cooldown: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+        on_transition: Optional[Callable[[str, State, State, str], None]] = None,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.on_transition = on_transition
+        self.state: State = "closed"
+        self.failures = 0
+        # Times the breaker has opened since it last closed; sets the cooldown.
+        self.trips = 0
+        self.retry_at: Optional[float] = None
+
+    @property
+    def cooldown(self) -> float:
+        """Cooldown for the current trip: base_cooldown doubled for every failed trial."""
+        return min(self.base_cooldown * 2 ** max(self.trips - 1, 0), self.max_cooldown)
+
+    def _transition(self, state: State, reason: str) -> None:
+        previous, self.state = self.state, state
+        if self.on_transition is not None:
+            self.on_transition(self.name, previous, state, reason)
+
+    def blocking(self) -> bool:
+        """True while the breaker is open and cooling down; unlike allow(), never transitions."""
+        return self.state == "open" and self.retry_at is not None and self.clock() < self.retry_at
+
+    def allow(self) -> bool:
+        """True if the probe may run now; an expired cooldown starts a half-open trial."""
+        if self.state != "open":
+            return True
+        if self.blocking():
+            return False
+        self._transition("half_open", "cooldown elapsed, trying once")
+        return True
+
+    def record(self, success: bool) -> None:
+        """Feeds the outcome of a run the breaker allowed."""
+        if success:
+            if self.state != "closed":
+                self._transition("closed", "trial run succeeded")
+            self.failures = 0
+            self.trips = 0
+            self.retry_at = None
+            return
+        self.failures += 1
+        if self.state == "half_open" or (
+            self.state == "closed" and self.failures >= self.failure_threshold
+        ):
+            self.trips += 1
+            self.retry_at = self.clock() + self.cooldown
+            reason = (
+                "trial run failed"
+                if self.state == "half_open"
+                else f"{self.failures} consecutive failures"
+            )
+            self._transition("open", f"{reason}; retrying in {self.cooldown:g}s")
@@ -5,8 +5,118 @@
 PING_TARGET: str = "google.com"
 # The name of the file where results will be logged.
 LOG_FILE: str = "network_log.csv"
-# How often the script should run, in minutes.
-RUN_INTERVAL_MINUTES: int = 5
+# Write each cycle to LOG_FILE. Turn off to log only to the SQLite store or binary log.
+ENABLE_CSV_LOG: bool = True
+# The CSV file stays open between cycles. Buffered rows are flushed every
+# CSV_FLUSH_EVERY_ROWS rows or, when set, once CSV_FLUSH_EVERY_SECONDS have passed since
+# the last flush. CSV_FSYNC also forces each flush to disk (safer on SD cards, but slower).
+CSV_FLUSH_EVERY_ROWS: int = 1
+CSV_FLUSH_EVERY_SECONDS: float | None = None
+CSV_FSYNC: bool = False
+# Also append each cycle to a compact binary log (delta-of-delta timestamps,
+# XOR-compressed floats) that is far smaller than the CSV and faster to scan.
+ENABLE_BINARY_LOG: bool = False
+# Path of the binary log used when ENABLE_BINARY_LOG is True.
+BINARY_LOG_FILE: str = "network_log.sglb"
+# Serve the latest value of each metric (named after the CSV columns, kept until a later
+# cycle measures it again) plus per-probe duration and failure counters in OpenMetrics
+# format at http://HOST:PORT/metrics. None turns it off.
+METRICS_EXPORTER_PORT: int | None = None
+METRICS_EXPORTER_HOST: str = "127.0.0.1"
+# Rotate LOG_FILE and gateway_raw_output.log into gzip-compressed segments once the live
+# file reaches LOG_ROTATE_MAX_BYTES and/or (with LOG_ROTATE_DAILY) when the day changes.
+# Each log's `<file>.manifest.json` records every segment's time range and row count.
+LOG_ROTATE_MAX_BYTES: int | None = None
+LOG_ROTATE_DAILY: bool = False
+# Keep a `<file>.idx` sidecar next to LOG_FILE and gateway_raw_output.log that maps
+# entry timestamps to byte offsets, so readers can seek straight to a time window.
+ENABLE_LOG_INDEX: bool = False
+# Also write each cycle to a SQLite database (WAL mode, indexed by timestamp) so range
+# queries do not have to re-read the whole CSV.
+ENABLE_SQLITE_STORE: bool = False
+# Path of the SQLite database used when ENABLE_SQLITE_STORE is True.
+SQLITE_DB_FILE: str = "network_log.db"
+# Rows are committed in one transaction once this many are pending, or once the oldest
+# pending row is SQLITE_BATCH_SECONDS old, whichever comes first.
+SQLITE_BATCH_ROWS: int = 10
+SQLITE_BATCH_SECONDS: float = 30.0
+# How often the full check cycle runs, in minutes. Fractions work (0.5 = every 30 s).
+RUN_INTERVAL_MINUTES: float = 5
+# Optional per-probe cadences that take a probe out of the full cycle: seconds between
+# runs, or "HH:MM" for once a day. Probes: wifi, local_ping, local_gateway_ping,
+# local_speed, lan_bufferbloat, gateway_ping, gateway_speed.
+# Example: {"gateway_ping": 30, "local_speed": 3600, "gateway_speed": "03:00"}
+PROBE_SCHEDULES: dict[str, float | str] = {}
+# What to do when a run ends after its next slot has passed: "skip" the missed slots,
+# "coalesce" them into one immediate run, or "queue" them to run back to back.
+SCHEDULER_OVERRUN_POLICY: str = "skip"
+# Adaptive cadence: when any logged result crosses its anomaly threshold below,
+# run the cheap ADAPTIVE_PROBES every ADAPTIVE_FAST_INTERVAL_SECONDS until
+# ADAPTIVE_HOLD_MINUTES pass with no further anomaly. Speed tests and LAN bufferbloat
+# always keep their own cadence.
+ENABLE_ADAPTIVE_CADENCE: bool = False
+ADAPTIVE_PROBES: tuple[str, ...] = ("local_ping", "local_gateway_ping")
+ADAPTIVE_FAST_INTERVAL_SECONDS: float = 30
+ADAPTIVE_HOLD_MINUTES: float = 15
+# Conditional expensive probes: in full cycles, the local and gateway speed tests and LAN
+# bufferbloat run only when one of their rules below matches this cycle's cheaper results,
+# or as a baseline once every CONDITIONAL_PROBE_BASELINE_RUNS cycles (0 or missing means
+# rules only). In this mode RUN_GATEWAY_SPEED_TEST_INTERVAL only turns the gateway
+# speed test off (0) or on.
+ENABLE_CONDITIONAL_PROBES: bool = False
+# probe -> [(result key, ">" or "<", threshold as a number or a config setting name)].
+CONDITIONAL_PROBE_RULES: dict[str, list[tuple[str, str, float | str]]] = {
+    "local_speed": [
+        ("local_wan_loss_percentage", ">", "PACKET_LOSS_THRESHOLD"),
+        ("local_wan_rtt_avg_ms", ">", "PING_RTT_THRESHOLD"),
+        ("local_wan_ping_stddev", ">", "JITTER_THRESHOLD"),
+    ],
+    "lan_bufferbloat": [
+        ("local_gw_rtt_avg_ms", ">", 10.0),
+        ("local_gw_loss_percentage", ">", "PACKET_LOSS_THRESHOLD"),
+    ],
+    "gateway_speed": [
+        ("local_downstream_speed", "<", "LOCAL_DOWNSTREAM_SPEED_THRESHOLD"),
+        ("local_upstream_speed", "<", "LOCAL_UPSTREAM_SPEED_THRESHOLD"),
+    ],
+}
+CONDITIONAL_PROBE_BASELINE_RUNS: dict[str, int] = {
+    "local_speed": 12,
+    "lan_bufferbloat": 12,
+    "gateway_speed": 12,
+}
+# Circuit breakers: after CIRCUIT_BREAKER_FAILURES failed runs in a row, a probe is
+# skipped (its columns logged as SKIPPED) for a cooldown, then tried once. A failed trial
+# doubles the cooldown, up to the maximum; a successful one resumes normal runs. State
+# changes are printed and recorded in the next row's Breaker_Transitions column.
+ENABLE_CIRCUIT_BREAKER: bool = False
+CIRCUIT_BREAKER_FAILURES: int = 3
+CIRCUIT_BREAKER_BASE_COOLDOWN_SECONDS: float = 300
+CIRCUIT_BREAKER_MAX_COOLDOWN_SECONDS: float = 3600
+# Directory for per-cycle span traces (trace-<start time>.json in Chrome trace-event
+# format; open them in chrome://tracing or https://ui.perfetto.dev). None disables tracing.
+TRACE_DIR: str | None = None
+# State kept between `main.py run-once` invocations: the HTTP backend's gateway session
+# cookies and the run counters. Written with mode 0600 since the cookies log in to the
+# gateway; None keeps no state. The access code is never stored here: set
+# GATEWAY_ACCESS_CODE in .env so unattended runs do not need to prompt for it.
+RUN_ONCE_STATE_FILE: str | None = "run_once_state.json"
+# CSV log of every probe run's and cycle's wall time, child CPU time and peak RSS of the
+# logger's process tree (None: off). Probes only get child CPU time when
+# ENABLE_CONCURRENT_PROBES is off, since overlapping probes share it. A run slower than
+# PROBE_REGRESSION_FACTOR x the median of the probe's (or cycle's) last
+# PROBE_REGRESSION_WINDOW successful runs prints a warning, once there are at least
+# PROBE_REGRESSION_MIN_SAMPLES of them.
+PROBE_HISTORY_FILE: str | None = None
+PROBE_REGRESSION_FACTOR: float = 2.0
+PROBE_REGRESSION_WINDOW: int = 50
+PROBE_REGRESSION_MIN_SAMPLES: int = 10
+# Time budget in seconds for one check cycle (or per-probe run). Probes still running
+# when it is spent are abandoned and their columns logged as TIMEOUT, so a slow cycle
+# never delays the next one. If None, CYCLE_DEADLINE_FRACTION of each job's interval
+# (e.g. 0.9) is used instead; with both None, cycles run without a deadline.
+CYCLE_DEADLINE_SECONDS: float | None = None
+CYCLE_DEADLINE_FRACTION: float | None = None
 # Set to True to run the browser in headless mode (no visible UI).
 HEADLESS_MODE: bool = True
 # Set to True to enable verbose, high-resolution debug logging for troubleshooting.
@@ -14,6 +124,11 @@ ENABLE_DEBUG_LOGGING: bool = False
 # Set to True to write raw gateway ping output to `gateway_raw_output.log`.
 # Raw output can include network details; leave off unless you need it for debugging.
 LOG_RAW_GATEWAY_OUTPUT: bool = False
+# Set to True to run independent checks (pings, Wi-Fi diagnostics, Chrome startup) at the
+# same time. Link-saturating checks (speed tests, iperf3 load) never overlap other checks.
+ENABLE_CONCURRENT_PROBES: bool = False
+# Maximum number of checks running at once when ENABLE_CONCURRENT_PROBES is True.
+MAX_CONCURRENT_PROBES: int = 4
 
 # --- Gateway Configuration ---
 # The base URL for your AT&T gateway.
@@ -22,6 +137,9 @@ GATEWAY_URL: str = "http://192.168.1.254"
 DIAG_URL: str = "http://192.168.1.254/cgi-bin/diag.ha"
 # The full URL to the gateway's speed test page.
 SPEED_TEST_URL: str = "http://192.168.1.254/cgi-bin/speed.ha"
+# How gateway pages are driven: "selenium" uses Chrome; "http" submits the diag.ha and
+# speed.ha forms directly with a keep-alive HTTP client, so no browser is started.
+GATEWAY_BACKEND: str = "selenium"
 # Set to True to run the gateway's built-in ping diagnostic.
 RUN_GATEWAY_PING_TEST: bool = True
 # How often the gateway speed test runs. For example, a value of 2 means the
@@ -33,14 +151,48 @@ RUN_GATEWAY_SPEED_TEST_INTERVAL: int = 1
 CLEANUP_STALE_CHROMEDRIVER_PROCESSES: bool = False
 # Set to True only if Chrome fails to start without the flag.
 ENABLE_CHROME_NO_SANDBOX: bool = False
+# Set to True to keep one Chrome session warm between checks instead of launching Chrome
+# on every run. The browser is health-checked before each use and always shut down on exit.
+REUSE_WEBDRIVER_SESSION: bool = False
+# Restart the warm browser after this many runs. Set to None to disable.
+WEBDRIVER_MAX_SESSION_USES: int | None = 50
+# Restart the warm browser when chromedriver and Chrome together use more than this many
+# megabytes of memory. Set to None to disable.
+WEBDRIVER_MAX_MEMORY_MB: float | None = 1024.0
 
 # --- Local Machine Test Configuration ---
 # Set to True to run a ping test from the local machine to the PING_TARGET.
 RUN_LOCAL_PING_TEST: bool = True
 # Set to True to run a speed test from the local machine using the Ookla CLI.
 RUN_LOCAL_SPEED_TEST: bool = True
+# Set to True to probe PING_TARGET and the gateway throughout the local speed test and
+# report our own idle/download/upload latency, aligned with Ookla's progress events.
+# Bufferbloat is then graded from these medians instead of mixing two measurements.
+ENABLE_SPEEDTEST_LATENCY_SAMPLER: bool = False
+# Seconds between latency probes to each target during the speed test.
+SPEEDTEST_LATENCY_SAMPLE_INTERVAL_SECONDS: float = 0.1
+# Abort the local speed test when a download/upload makes no progress for this many seconds.
+SPEEDTEST_STALL_SECONDS: float = 10.0
 # Set to True to run a ping test from the local machine to the gateway itself.
 RUN_LOCAL_GATEWAY_PING_TEST: bool = True
+# How local pings are sent: "subprocess" runs the system `ping -c 4`; "native" sends
+# probes in-process (unprivileged ICMP, falling back to TCP connect timing) at a high rate.
+LOCAL_PING_BACKEND: str = "subprocess"
+# Probes per native ping test and the spacing between them (40 x 0.05 s = 2 s at 20 Hz).
+NATIVE_PING_COUNT: int = 40
+NATIVE_PING_INTERVAL_SECONDS: float = 0.05
+# Seconds to wait for a native probe reply before counting it as lost.
+NATIVE_PING_TIMEOUT: float = 1.0
+# Set to True to keep pinging PING_TARGET and the gateway in the background between runs,
+# so each CSV row summarizes the whole interval (loss, min/avg/max, jitter, outages).
+ENABLE_LATENCY_STREAM: bool = False
+# Seconds between background probes to each target.
+LATENCY_STREAM_INTERVAL_SECONDS: float = 1.0
+# Most recent per-packet samples kept in memory per target. Each row is summarized from
+# them, so keep this at least RUN_INTERVAL_MINUTES * 60 / LATENCY_STREAM_INTERVAL_SECONDS.
+LATENCY_STREAM_BUFFER_SIZE: int = 3600
+# Consecutive lost probes that count as one outage.
+LATENCY_STREAM_OUTAGE_MIN_LOSSES: int = 3
 # Set to True to capture macOS Wi-Fi diagnostics via `sudo wdutil info`.
 # This is optional because it requires privileged local system access.
 RUN_WIFI_DIAGNOSTICS_TEST: bool = False
@@ -56,6 +208,10 @@ ENABLE_ANOMALY_HIGHLIGHTING: bool = True
 PACKET_LOSS_THRESHOLD: float = 0.0
 # Any ping RTT (average) strictly greater than this value (in ms) is an anomaly.
 PING_RTT_THRESHOLD: float = 30.0
+# Per-packet RTT percentiles (in ms) strictly greater than these are anomalies.
+PING_RTT_P50_THRESHOLD: float = 30.0
+PING_RTT_P95_THRESHOLD: float = 60.0
+PING_RTT_P99_THRESHOLD: float = 100.0
 # Any jitter measurement strictly greater than this value (in ms) is an anomaly.
 JITTER_THRESHOLD: float = 5.0
 # A latency increase (in ms) greater than this is an anomaly (bufferbloat delta).
@@ -64,6 +220,8 @@ BUFFERBLOAT_DELTA_THRESHOLD: float = 75.0
 LATENCY_UNDER_LOAD_THRESHOLD: float = 100.0
 # Packet loss percentage from the speedtest that is an anomaly.
 SPEEDTEST_PACKET_LOSS_THRESHOLD: float = 0.5
+# Per-second throughput coefficient of variation (stddev / mean) above this is unstable.
+SPEEDTEST_STABILITY_CV_THRESHOLD: float = 0.25
 
 # --- Speed Test Thresholds (in Mbps) ---
 # Set separate thresholds for speed tests. Anomalies are values strictly LESS than these.
@@ -0,0 +1,331 @@
+# gateway_http.py
+"""Selenium-free backend for the gateway's diag.ha and speed.ha pages.
+
+The gateway pages are plain HTML forms, so they can be driven with ordinary HTTP
+requests: submit the form, then poll the page until the results appear. A single
+keep-alive connection per host is reused across requests and check cycles.
+"""
+
+import hashlib
+import http.client
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Callable, Optional
+
+# Transport errors after which a pooled connection is discarded and the request retried once.
+_RETRYABLE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.ResponseNotReady,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+_MAX_REDIRECTS = 5
+
+
+class GatewayHttpError(Exception):
+    """Raised when the gateway returns an unexpected page or status."""
+
+
+@dataclass
+class GatewayForm:
+    """A parsed HTML form: its target plus the fields a browser would submit."""
+
+    action: str
+    method: str = "get"
+    fields: dict[str, str] = field(default_factory=dict)
+    # Submit buttons by name; only the clicked one is sent.
+    buttons: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class GatewayPage:
+    """The parts of a gateway page that the diagnostics care about."""
+
+    url: str
+    forms: list[GatewayForm] = field(default_factory=list)
+    # <textarea> contents keyed by id (falling back to name).
+    textareas: dict[str, str] = field(default_factory=dict)
+    # Cell text of every row in `table.grid.table100`, header rows included.
+    grid_rows: list[list[str]] = field(default_factory=list)
+
+    def form_with(self, name: str) -> Optional[GatewayForm]:
+        """Returns the first form containing a field or button with this name."""
+        for form in self.forms:
+            if name in form.fields or name in form.buttons:
+                return form
+        return None
+
+
+class _GatewayPageParser(HTMLParser):
+    """Collects forms, textareas, and result-grid rows from a gateway page."""
+
+    def __init__(self, url: str) -> None:
+        super().__init__(convert_charrefs=True)
+        self.page = GatewayPage(url=url)
+        self._form: Optional[GatewayForm] = None
+        self._textarea: Optional[tuple[Optional[str], list[str]]] = None
+        self._grid_depth = 0
+        self._row: Optional[list[str]] = None
+        self._cell: Optional[list[str]] = None
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        attr = {k: v or "" for k, v in attrs}
+        if tag == "form":
+            self._form = GatewayForm(
+                action=attr.get("action", ""), method=attr.get("method", "get").lower()
+            )
+            self.page.forms.append(self._form)
+        elif tag in ("input", "button") and self._form is not None and attr.get("name"):
+            kind = attr.get("type", "submit" if tag == "button" else "text").lower()
+            if kind in ("submit", "button", "image"):
+                self._form.buttons[attr["name"]] = attr.get("value", "")
+            elif kind not in ("checkbox", "radio") or "checked" in attr:
+                self._form.fields[attr["name"]] = attr.get("value", "")
+        elif tag == "textarea":
+            self._textarea = (attr.get("id") or attr.get("name"), [])
+        elif tag == "table":
+            classes = attr.get("class", "").split()
+            if self._grid_depth or ("grid" in classes and "table100" in classes):
+                self._grid_depth += 1
+        elif self._grid_depth == 1 and tag == "tr":
+            self._row = []
+        elif self._row is not None and tag in ("td", "th"):
+            self._cell = []
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "form":
+            self._form = None
+        elif tag == "textarea" and self._textarea is not None:
+            key, chunks = self._textarea
+            text = "".join(chunks)
+            if key:
+                self.page.textareas[key] = text
+            if self._form is not None and key:
+                self._form.fields.setdefault(key, text)
+            self._textarea = None
+        elif tag == "table" and self._grid_depth:
+            self._grid_depth -= 1
+        elif tag in ("td", "th") and self._cell is not None and self._row is not None:
+            self._row.append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            self.page.grid_rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data: str) -> None:
+        if self._textarea is not None:
+            self._textarea[1].append(data)
+        elif self._cell is not None:
+            self._cell.append(data)
+
+
+def parse_gateway_page(html: str, url: str = "") -> GatewayPage:
+    """Parses gateway HTML into forms, textareas, and result-grid rows."""
+    parser = _GatewayPageParser(url)
+    parser.feed(html)
+    parser.close()
+    return parser.page
+
+
+class GatewayHttpClient:
+    """Minimal keep-alive HTTP client with a per-host connection pool and cookie jar.
+
+    The gateway keeps its login state in a session cookie, so reusing one client across
+    cycles avoids logging in and reconnecting on every run.
+    """
+
+    def __init__(self, timeout: float = 10.0) -> None:
+        self.timeout = timeout
+        self.cookies: dict[str, str] = {}
+        self._connections: dict[tuple[str, str, int], http.client.HTTPConnection] = {}
+        # Number of TCP connections opened, for diagnostics and benchmarks.
+        self.connections_opened = 0
+
+    def close(self) -> None:
+        """Closes every pooled connection."""
+        for conn in self._connections.values():
+            conn.close()
+        self._connections.clear()
+
+    def _connection(self, scheme: str, host: str, port: int) -> http.client.HTTPConnection:
+        key = (scheme, host, port)
+        conn = self._connections.get(key)
+        if conn is None:
+            conn_class = (
+                http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            )
+            conn = conn_class(host, port, timeout=self.timeout)
+            self._connections[key] = conn
+            self.connections_opened += 1
+        return conn
+
+    def _drop_connection(self, scheme: str, host: str, port: int) -> None:
+        conn = self._connections.pop((scheme, host, port), None)
+        if conn is not None:
+            conn.close()
+
+    def _send(self, method: str, url: str, body: Optional[str]) -> tuple[int, dict[str, str], str]:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme or "http"
+        host = parts.hostname or ""
+        port = parts.port or (443 if scheme == "https" else 80)
+        path = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        headers = {"Connection": "keep-alive"}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        if body is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        for attempt in range(2):
+            conn = self._connection(scheme, host, port)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+            except _RETRYABLE_ERRORS:
+                # The gateway closed an idle keep-alive connection; reconnect once.
+                self._drop_connection(scheme, host, port)
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                self._drop_connection(scheme, host, port)
+                raise
+            if response.will_close:
+                self._drop_connection(scheme, host, port)
+            for header in response.msg.get_all("Set-Cookie") or []:
+                name, _, rest = header.partition("=")
+                self.cookies[name.strip()] = rest.split(";", 1)[0].strip()
+            charset = response.msg.get_content_charset() or "utf-8"
+            text = payload.decode(charset, errors="replace")
+            return response.status, dict(response.getheaders()), text
+        raise GatewayHttpError(f"Could not reach {url}")  # pragma: no cover
+
+    def request(self, method: str, url: str, data: Optional[dict[str, str]] = None) -> GatewayPage:
+        """Sends a request, follows redirects like a browser, and parses the page."""
+        body = urllib.parse.urlencode(data) if data is not None else None
+        for _ in range(_MAX_REDIRECTS + 1):
+            status, headers, text = self._send(method, url, body)
+            location = headers.get("Location") or headers.get("location")
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urllib.parse.urljoin(url, location)
+                if status in (301, 302, 303):
+                    method, body = "GET", None
+                continue
+            if status >= 400:
+                raise GatewayHttpError(f"Gateway returned HTTP {status} for {url}")
+            return parse_gateway_page(text, url)
+        raise GatewayHttpError(f"Too many redirects for {url}")
+
+    def get(self, url: str) -> GatewayPage:
+        return self.request("GET", url)
+
+    def submit(
+        self,
+        page: GatewayPage,
+        form: GatewayForm,
+        button: str,
+        overrides: Optional[dict[str, str]] = None,
+    ) -> GatewayPage:
+        """Submits a form as if its `button` submit button had been clicked."""
+        data = dict(form.fields)
+        data.update(overrides or {})
+        data[button] = form.buttons.get(button, "")
+        action = urllib.parse.urljoin(page.url, form.action or page.url)
+        if form.method == "post":
+            return self.request("POST", action, data)
+        split = urllib.parse.urlsplit(action)
+        query = urllib.parse.urlencode(data)
+        return self.get(urllib.parse.urlunsplit(split._replace(query=query)))
+
+
+def login_if_required(
+    client: GatewayHttpClient, page: GatewayPage, access_code: str
+) -> GatewayPage:
+    """Submits the Device Access Code form when the page asks for it.
+
+    Mirrors the gateway's login script: when the form carries a `hashpassword` field,
+    the code is sent as md5(code + nonce) and the clear-text field is blanked.
+    """
+    form = page.form_with("password")
+    if form is None:
+        return page
+    print("Device Access Code required. Attempting to log in...")
+    overrides = {"password": access_code}
+    if "hashpassword" in form.fields:
+        nonce = form.fields.get("nonce", "")
+        overrides["hashpassword"] = hashlib.md5((access_code + nonce).encode()).hexdigest()
+        overrides["password"] = ""
+    button = next(iter(form.buttons), "Continue")
+    page = client.submit(page, form, button, overrides)
+    if page.form_with("password") is not None:
+        raise GatewayHttpError("Gateway rejected the Device Access Code.")
+    return page
+
+
+def _poll(
+    client: GatewayHttpClient,
+    url: str,
+    page: GatewayPage,
+    done: Callable[[GatewayPage], bool],
+    timeout: float,
+    poll_interval: float,
+) -> GatewayPage:
+    """Re-fetches `url` until `done(page)` holds or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while not done(page):
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Timed out after {timeout:.0f}s waiting for {url}")
+        time.sleep(poll_interval)
+        page = client.get(url)
+    return page
+
+
+def run_ping(
+    client: GatewayHttpClient,
+    diag_url: str,
+    target: str,
+    access_code: str = "",
+    timeout: float = 30.0,
+    poll_interval: float = 1.0,
+) -> str:
+    """Runs the diag.ha ping and returns the raw `progress` text once it completes."""
+    page = login_if_required(client, client.get(diag_url), access_code)
+    form = page.form_with("webaddress")
+    if form is None or "Ping" not in form.buttons:
+        raise GatewayHttpError("Ping form not found on the diagnostics page.")
+    page = client.submit(page, form, "Ping", {"webaddress": target})
+    page = _poll(
+        client,
+        diag_url,
+        page,
+        lambda p: "ping statistics" in p.textareas.get("progress", ""),
+        timeout,
+        poll_interval,
+    )
+    return page.textareas.get("progress", "").strip()
+
+
+def run_speed_test(
+    client: GatewayHttpClient,
+    speed_url: str,
+    access_code: str,
+    timeout: float = 90.0,
+    poll_interval: float = 2.0,
+) -> list[list[str]]:
+    """Runs the speed.ha test and returns the result-grid rows once populated."""
+    page = login_if_required(client, client.get(speed_url), access_code)
+    form = page.form_with("run")
+    if form is None:
+        raise GatewayHttpError("Speed test form not found on the speed test page.")
+    page = client.submit(page, form, "run")
+
+    def finished(p: GatewayPage) -> bool:
+        # Same signal as the Selenium path: the second grid row names a direction.
+        return len(p.grid_rows) >= 2 and "downstream" in " ".join(p.grid_rows[1]).lower()
+
+    page = _poll(client, speed_url, page, finished, timeout, poll_interval)
+    return page.grid_rows
@@ -0,0 +1,560 @@
+# latency.py
+"""In-process latency probing without forking `ping`.
+
+Probes use an unprivileged ICMP datagram socket (macOS, and Linux when
+net.ipv4.ping_group_range allows it). When ICMP sockets are unavailable the prober
+falls back to timing TCP connects, where a SYN-ACK or RST both count as a reply.
+Timestamps come from time.perf_counter_ns and every per-packet RTT is kept.
+"""
+
+import errno
+import math
+import os
+import select
+import socket
+import struct
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Literal, Optional, Protocol
+
+ProbeMethod = Literal["icmp", "tcp"]
+
+_ICMP_ECHO_REQUEST = 8
+_ICMP_ECHO_REPLY = 0
+_MAGIC = b"SGLPROBE"
+
+
+class _IcmpSocket(Protocol):
+    """The parts of a datagram socket the ICMP prober uses."""
+
+    def fileno(self) -> int: ...
+
+    def sendto(self, packet: bytes, address: tuple[str, int], /) -> int: ...
+
+    def recvfrom(self, size: int, /) -> tuple[bytes, tuple[str, int]]: ...
+
+    def close(self) -> None: ...
+
+
+@dataclass
+class ProbeRun:
+    """Per-packet results of one probing burst; a lost packet's RTT is None."""
+
+    target: str
+    method: ProbeMethod
+    rtts_ms: list[Optional[float]] = field(default_factory=list)
+
+    @property
+    def sent(self) -> int:
+        return len(self.rtts_ms)
+
+    @property
+    def received_rtts_ms(self) -> list[float]:
+        return [rtt for rtt in self.rtts_ms if rtt is not None]
+
+    @property
+    def loss_percentage(self) -> Optional[float]:
+        if not self.rtts_ms:
+            return None
+        return 100.0 * (self.sent - len(self.received_rtts_ms)) / self.sent
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _echo_request(ident: int, seq: int, token: bytes = b"") -> bytes:
+    payload = _MAGIC + token + struct.pack("!H", seq)
+    header = struct.pack("!BBHHH", _ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = _checksum(header + payload)
+    return struct.pack("!BBHHH", _ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + payload
+
+
+def _parse_echo_reply(packet: bytes, token: bytes = b"") -> Optional[int]:
+    """Returns the sequence number of an echo reply to a request sent with `token`, or None."""
+    # macOS delivers the IP header on ICMP datagram sockets; Linux strips it.
+    if len(packet) >= 20 and packet[0] >> 4 == 4:
+        header_len = (packet[0] & 0x0F) * 4
+        if len(packet) >= header_len + 8 and packet[header_len] == _ICMP_ECHO_REPLY:
+            packet = packet[header_len:]
+    prefix = _MAGIC + token
+    if len(packet) < 8 + len(prefix) + 2 or packet[0] != _ICMP_ECHO_REPLY:
+        return None
+    # The kernel may rewrite the ICMP identifier, so match on the payload instead.
+    payload = packet[8:]
+    if not payload.startswith(prefix):
+        return None
+    return struct.unpack("!H", payload[len(prefix) : len(prefix) + 2])[0]
+
+
+class LatencyProber:
+    """Sends bursts of latency probes to one target from a single socket.
+
+    The target is resolved once at construction. Use as a context manager or call
+    close() to release the ICMP socket.
+    """
+
+    def __init__(self, target: str, timeout: float = 1.0, tcp_port: int = 443) -> None:
+        self.target = target
+        self.timeout = timeout
+        self.tcp_port = tcp_port
+        self.address = str(socket.getaddrinfo(target, None, socket.AF_INET)[0][4][0])
+        self._ident = os.getpid() & 0xFFFF
+        # Every ICMP datagram socket sees every echo reply, so concurrent probers tell
+        # theirs apart by this random payload tag as well as by the sender's address.
+        self._token = os.urandom(8)
+        self._seq = 0
+        self._icmp_socket: Optional[_IcmpSocket] = None
+        self.method: ProbeMethod = "tcp"
+        try:
+            icmp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            icmp_socket.setblocking(False)
+            self._icmp_socket = icmp_socket
+            self.method = "icmp"
+        except OSError:
+            # No unprivileged ICMP on this host; fall back to TCP connect timing.
+            self._icmp_socket = None
+
+    def __enter__(self) -> "LatencyProber":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._icmp_socket is not None:
+            self._icmp_socket.close()
+            self._icmp_socket = None
+
+    def probe(self, count: int, interval: float = 0.1) -> ProbeRun:
+        """Sends `count` probes `interval` seconds apart and returns every RTT."""
+        if self._icmp_socket is not None:
+            return self._probe_icmp(self._icmp_socket, count, interval)
+        return self._probe_tcp(count, interval)
+
+    def _probe_icmp(self, sock: _IcmpSocket, count: int, interval: float) -> ProbeRun:
+        run = ProbeRun(self.target, "icmp", [None] * count)
+        pending: dict[int, tuple[int, int]] = {}  # seq -> (index, send time ns)
+        timeout_ns = int(self.timeout * 1e9)
+        interval_ns = int(interval * 1e9)
+        next_send = time.perf_counter_ns()
+        sent = 0
+        last_send = next_send
+
+        # Replies are read while later probes are still being sent, so one slow
+        # reply never delays the sampling schedule.
+        while True:
+            now = time.perf_counter_ns()
+            if sent < count and now >= next_send:
+                self._seq = (self._seq + 1) & 0xFFFF
+                try:
+                    request = _echo_request(self._ident, self._seq, self._token)
+                    sock.sendto(request, (self.address, 0))
+                    pending[self._seq] = (sent, now)
+                except OSError:
+                    pass  # Counted as lost, like ping's "sendto: No route to host".
+                last_send = now
+                sent += 1
+                next_send += interval_ns
+                continue
+            for seq, (_, sent_at) in list(pending.items()):
+                if now - sent_at > timeout_ns:
+                    del pending[seq]
+            if sent >= count and (not pending or now - last_send > timeout_ns):
+                break
+            wake_at = next_send if sent < count else last_send + timeout_ns
+            readable, _, _ = select.select([sock], [], [], max(0, wake_at - now) / 1e9)
+            if not readable:
+                continue
+            try:
+                packet, (sender, *_) = sock.recvfrom(2048)
+            except OSError:
+                continue
+            received_at = time.perf_counter_ns()
+            seq = _parse_echo_reply(packet, self._token) if sender == self.address else None
+            if seq is not None and seq in pending:
+                index, sent_at = pending.pop(seq)
+                run.rtts_ms[index] = (received_at - sent_at) / 1e6
+        return run
+
+    def _probe_tcp(self, count: int, interval: float) -> ProbeRun:
+        run = ProbeRun(self.target, "tcp")
+        next_send = time.perf_counter_ns()
+        for _ in range(count):
+            delay = (next_send - time.perf_counter_ns()) / 1e9
+            if delay > 0:
+                time.sleep(delay)
+            next_send += int(interval * 1e9)
+            run.rtts_ms.append(self._tcp_connect_rtt())
+        return run
+
+    def _tcp_connect_rtt(self) -> Optional[float]:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            started = time.perf_counter_ns()
+            result = sock.connect_ex((self.address, self.tcp_port))
+            if result not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.ECONNREFUSED):
+                return None
+            if result in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                _, writable, _ = select.select([], [sock], [], self.timeout)
+                if not writable:
+                    return None
+                result = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if result not in (0, errno.ECONNREFUSED):
+                    return None
+            return (time.perf_counter_ns() - started) / 1e6
+        finally:
+            sock.close()
+
+
+def summarize_rtts(rtts_ms: list[float]) -> tuple[float, float, float, float]:
+    """Returns (min, avg, max, population stddev) like ping's summary line."""
+    n = len(rtts_ms)
+    avg = sum(rtts_ms) / n
+    variance = sum((rtt - avg) ** 2 for rtt in rtts_ms) / n
+    return min(rtts_ms), avg, max(rtts_ms), math.sqrt(variance)
+
+
+class P2Quantile:
+    """Streaming estimate of one quantile using the P-square algorithm.
+
+    Jain & Chlamtac (1985): five markers track the minimum, the maximum, the target
+    quantile, and two midpoints, adjusted with piecewise-parabolic interpolation.
+    Memory is constant regardless of how many samples are added.
+    """
+
+    def __init__(self, q: float) -> None:
+        if not 0.0 < q < 1.0:
+            raise ValueError("quantile must be between 0 and 1")
+        self.q = q
+        self.count = 0
+        self._heights: list[float] = []
+        self._positions = [0.0, 1.0, 2.0, 3.0, 4.0]
+        self._desired = [0.0, 2 * q, 4 * q, 2 + 2 * q, 4.0]
+        self._increments = [0.0, q / 2, q, (1 + q) / 2, 1.0]
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        heights = self._heights
+        if self.count <= 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(1, 5) if x < heights[i]) - 1
+        positions = self._positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        for i in (1, 2, 3):
+            d = self._desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (
+                d <= -1 and positions[i - 1] - positions[i] < -1
+            ):
+                step = 1.0 if d > 0 else -1.0
+                candidate = self._parabolic(i, step)
+                if heights[i - 1] < candidate < heights[i + 1]:
+                    heights[i] = candidate
+                else:
+                    j = i + int(step)
+                    heights[i] += step * (heights[j] - heights[i]) / (positions[j] - positions[i])
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: float) -> float:
+        n, h = self._positions, self._heights
+        return h[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> Optional[float]:
+        """Returns the current estimate, exact while five or fewer samples were seen."""
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            # Linear interpolation between closest ranks on the stored samples.
+            rank = self.q * (self.count - 1)
+            lower = int(rank)
+            upper = min(lower + 1, self.count - 1)
+            h = self._heights
+            return h[lower] + (h[upper] - h[lower]) * (rank - lower)
+        return self._heights[2]
+
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class QuantileSketch:
+    """Constant-memory tracker for several quantiles (p50/p95/p99 by default)."""
+
+    def __init__(self, quantiles: tuple[float, ...] = DEFAULT_QUANTILES) -> None:
+        self._estimators = {q: P2Quantile(q) for q in quantiles}
+
+    def add(self, x: float) -> None:
+        for estimator in self._estimators.values():
+            estimator.add(x)
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self._estimators[q].value()
+
+
+class RttRingBuffer:
+    """Fixed-capacity ring of (timestamp ns, RTT ms) samples; lost packets store NaN.
+
+    Backed by two preallocated arrays, so memory stays constant however long it runs.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, capacity)
+        self._timestamps = array("q", [0]) * self.capacity
+        self._rtts = array("d", [math.nan]) * self.capacity
+        self._next = 0
+        self._size = 0
+        # Samples ever appended, including those since overwritten.
+        self.appended = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp_ns: int, rtt_ms: Optional[float]) -> None:
+        self._timestamps[self._next] = timestamp_ns
+        self._rtts[self._next] = math.nan if rtt_ms is None else rtt_ms
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.appended += 1
+
+    def samples(self, last: Optional[int] = None) -> list[tuple[int, Optional[float]]]:
+        """Returns the retained samples, oldest first; only the newest `last` if given."""
+        size = self._size if last is None else max(0, min(last, self._size))
+        start = (self._next - size) % self.capacity
+        out = []
+        for i in range(size):
+            index = (start + i) % self.capacity
+            rtt = self._rtts[index]
+            out.append((self._timestamps[index], None if math.isnan(rtt) else rtt))
+        return out
+
+
+@dataclass
+class LatencySummary:
+    """Loss and RTT statistics over one aggregation interval."""
+
+    sent: int
+    received: int
+    loss_percentage: Optional[float]
+    rtt_min_ms: Optional[float]
+    rtt_avg_ms: Optional[float]
+    rtt_max_ms: Optional[float]
+    rtt_stddev_ms: Optional[float]
+    outages: int
+    rtt_p50_ms: Optional[float] = None
+    rtt_p95_ms: Optional[float] = None
+    rtt_p99_ms: Optional[float] = None
+
+
+class IntervalStats:
+    """Running loss/min/avg/max/stddev (Welford), percentiles, and an outage counter.
+
+    An outage is a run of at least `outage_min_losses` consecutive lost probes; it is
+    counted once, when the run reaches that length.
+    """
+
+    def __init__(self, outage_min_losses: int = 3, loss_run: int = 0) -> None:
+        self.outage_min_losses = max(1, outage_min_losses)
+        # The loss run survives reset() so an outage spanning two intervals counts once;
+        # `loss_run` carries one in from a previous IntervalStats.
+        self._loss_run = loss_run
+        self.reset()
+
+    def reset(self) -> None:
+        self.sent = 0
+        self.received = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+        self._sketch = QuantileSketch()
+        self.outages = 0
+
+    def add(self, rtt_ms: Optional[float]) -> None:
+        self.sent += 1
+        if rtt_ms is None:
+            self._loss_run += 1
+            if self._loss_run == self.outage_min_losses:
+                self.outages += 1
+            return
+        self._loss_run = 0
+        self.received += 1
+        delta = rtt_ms - self._mean
+        self._mean += delta / self.received
+        self._m2 += delta * (rtt_ms - self._mean)
+        self._min = min(self._min, rtt_ms)
+        self._max = max(self._max, rtt_ms)
+        self._sketch.add(rtt_ms)
+
+    def summary(self) -> LatencySummary:
+        has_rtt = self.received > 0
+        return LatencySummary(
+            sent=self.sent,
+            received=self.received,
+            loss_percentage=(
+                100.0 * (self.sent - self.received) / self.sent if self.sent else None
+            ),
+            rtt_min_ms=self._min if has_rtt else None,
+            rtt_avg_ms=self._mean if has_rtt else None,
+            rtt_max_ms=self._max if has_rtt else None,
+            rtt_stddev_ms=math.sqrt(self._m2 / self.received) if has_rtt else None,
+            outages=self.outages,
+            rtt_p50_ms=self._sketch.quantile(0.5),
+            rtt_p95_ms=self._sketch.quantile(0.95),
+            rtt_p99_ms=self._sketch.quantile(0.99),
+        )
+
+
+class LatencyStream:
+    """Probes targets continuously on background threads between check cycles.
+
+    Each target keeps its recent per-packet results in an RttRingBuffer, and a snapshot
+    summarizes the samples appended since the previous one, so memory stays bounded.
+    An interval with more samples than `capacity` is summarized from its newest ones.
+    """
+
+    def __init__(
+        self,
+        targets: dict[str, str],
+        interval: float = 1.0,
+        capacity: int = 3600,
+        outage_min_losses: int = 3,
+        timeout: float = 1.0,
+    ) -> None:
+        self.targets = targets
+        self.interval = interval
+        self.timeout = timeout
+        self.outage_min_losses = outage_min_losses
+        self.buffers = {name: RttRingBuffer(capacity) for name in targets}
+        # Per target: ring position and trailing loss run at the last reset.
+        self._marks = dict.fromkeys(targets, 0)
+        self._loss_runs = dict.fromkeys(targets, 0)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self) -> None:
+        self._stop.clear()
+        for name, host in self.targets.items():
+            thread = threading.Thread(
+                target=self._sample_forever, args=(name, host), name=f"latency-{name}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=self.timeout + self.interval + 1)
+        self._threads = []
+
+    def record(
+        self, name: str, rtt_ms: Optional[float], timestamp_ns: Optional[int] = None
+    ) -> None:
+        """Adds one sample for `name`; used by the sampling threads."""
+        with self._lock:
+            self.buffers[name].append(timestamp_ns or time.time_ns(), rtt_ms)
+
+    def snapshot(self, reset: bool = True) -> dict[str, LatencySummary]:
+        """Summarizes every target's ring samples since the last reset."""
+        summaries = {}
+        with self._lock:
+            for name, ring in self.buffers.items():
+                stats = IntervalStats(self.outage_min_losses, self._loss_runs[name])
+                for _, rtt_ms in ring.samples(last=ring.appended - self._marks[name]):
+                    stats.add(rtt_ms)
+                summaries[name] = stats.summary()
+                if reset:
+                    self._marks[name] = ring.appended
+                    self._loss_runs[name] = stats._loss_run
+        return summaries
+
+    def _sample_forever(self, name: str, host: str) -> None:
+        prober: Optional[LatencyProber] = None
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                if prober is None:
+                    prober = LatencyProber(host, timeout=self.timeout)
+                self.record(name, prober.probe(1).rtts_ms[0])
+            except OSError:
+                # DNS or socket failure: count as loss and retry with a fresh prober.
+                self.record(name, None)
+                if prober is not None:
+                    prober.close()
+                prober = None
+            next_tick += self.interval
+            self._stop.wait(max(0.0, next_tick - time.monotonic()))
+            next_tick = max(next_tick, time.monotonic() - self.interval)
+        if prober is not None:
+            prober.close()
+
+
+class PhasedLatencySampler(LatencyStream):
+    """LatencyStream that also buckets every sample by the current load phase.
+
+    Whatever drives the load (the speed test reader) calls set_phase() as it moves
+    between phases such as idle, download, and upload, so each sample is classified
+    against the phase that was active when it was taken. A phase of None stops
+    classifying without stopping the probes.
+    """
+
+    def __init__(
+        self,
+        targets: dict[str, str],
+        interval: float = 0.1,
+        timeout: float = 1.0,
+        outage_min_losses: int = 3,
+    ) -> None:
+        # The per-packet ring is not needed here; keep it to a single slot.
+        super().__init__(targets, interval, 1, outage_min_losses, timeout)
+        self.phase: Optional[str] = None
+        self._phase_stats: dict[tuple[str, str], IntervalStats] = {}
+
+    def set_phase(self, phase: Optional[str]) -> None:
+        with self._lock:
+            self.phase = phase
+
+    def record(
+        self, name: str, rtt_ms: Optional[float], timestamp_ns: Optional[int] = None
+    ) -> None:
+        super().record(name, rtt_ms, timestamp_ns)
+        with self._lock:
+            if self.phase is None:
+                return
+            key = (name, self.phase)
+            if key not in self._phase_stats:
+                self._phase_stats[key] = IntervalStats(self.outage_min_losses)
+            self._phase_stats[key].add(rtt_ms)
+
+    def phase_summaries(self) -> dict[tuple[str, str], LatencySummary]:
+        """Summaries keyed by (target name, phase) for every phase that saw samples."""
+        with self._lock:
+            return {key: stats.summary() for key, stats in self._phase_stats.items()}
@@ -0,0 +1,224 @@
+# logindex.py
+"""Sidecar timestamp -> byte offset index for the append-only logs.
+
+`<log>.idx` holds a 16-byte header (magic, version, the log's inode) followed by
+fixed-width records: the entry's local timestamp as a YYYYMMDDHHMMSS integer and its
+byte offset in the log. Because records are fixed-width and in time order, readers
+can memory-map both files and binary-search straight to a time window instead of
+scanning from the top.
+
+Writers append records as they append entries. On open, sync() checks the index
+against the log and catches it up, or rebuilds it when it is missing or stale (the
+log was rotated, truncated, or rewritten). Readers never modify the index: when it is
+missing or stale, entries() scans the log instead until the writer rebuilds it. This
+works for CSV rows and for the "--- Log entry from ... ---" blocks of the raw gateway
+log.
+"""
+
+import bisect
+import mmap
+import os
+import struct
+from datetime import datetime
+from typing import Iterator, Optional, Pattern
+
+import rotation
+
+MAGIC = b"SGLI"
+VERSION = 1
+_HEADER = struct.Struct("<4sB3xQ")
+_RECORD = struct.Struct("<qQ")
+
+
+def timestamp_key(timestamp: str | datetime) -> int:
+    """Sortable integer key for a "YYYY-MM-DD HH:MM:SS" timestamp (or a datetime)."""
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.strftime(rotation.TIMESTAMP_FORMAT)
+    return int(timestamp[:19].translate(str.maketrans("", "", "-: ")))
+
+
+def _key_datetime(key: int) -> datetime:
+    return datetime.strptime(str(key), "%Y%m%d%H%M%S")
+
+
+class _Records:
+    """Sequence view of the index records in a mapped index file, for bisect."""
+
+    def __init__(self, data: mmap.mmap | bytes) -> None:
+        self._data = data
+        self._count = (len(data) - _HEADER.size) // _RECORD.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> tuple[int, int]:
+        return _RECORD.unpack_from(self._data, _HEADER.size + i * _RECORD.size)
+
+
+class TimestampIndex:
+    """Maintains and searches the `.idx` sidecar of one log file."""
+
+    def __init__(self, log_path: str, entry_pattern: Pattern[str] = rotation.CSV_ENTRY) -> None:
+        self.log_path = log_path
+        self.index_path = f"{log_path}.idx"
+        self.entry_pattern = entry_pattern
+        self._pending: list[bytes] = []
+
+    # --- Writing ---
+    def append(self, timestamp: str, offset: int) -> None:
+        """Queues a record for an entry written at `offset`; written on flush()."""
+        self._pending.append(_RECORD.pack(timestamp_key(timestamp), offset))
+
+    def flush(self) -> None:
+        """Appends queued records; call after the log itself has been flushed."""
+        if self._pending:
+            with open(self.index_path, "ab") as f:
+                f.write(b"".join(self._pending))
+            self._pending.clear()
+
+    def _log_inode(self) -> Optional[int]:
+        try:
+            return os.stat(self.log_path).st_ino
+        except OSError:
+            return None
+
+    def _scan(self, start: int, skip_first: bool) -> list[bytes]:
+        """Index records for entries found from byte `start` of the log to EOF."""
+        records = []
+        offset = start
+        with open(self.log_path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                match = self.entry_pattern.match(line.decode("utf-8", "replace"))
+                if match:
+                    if skip_first:
+                        skip_first = False
+                    else:
+                        records.append(_RECORD.pack(timestamp_key(match.group(1)), offset))
+                offset += len(line)
+        return records
+
+    def rebuild(self) -> None:
+        """Rewrites the index from a full scan of the log."""
+        self._pending.clear()
+        inode = self._log_inode()
+        records = self._scan(0, skip_first=False) if inode is not None else []
+        staging = f"{self.index_path}.tmp"
+        with open(staging, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, inode or 0))
+            f.write(b"".join(records))
+        os.replace(staging, self.index_path)
+
+    def _check(self) -> Optional[tuple[int, Optional[tuple[int, int]]]]:
+        """
+        (complete record count, last record) when the index describes the current log,
+        or None when it is missing or stale. Reads only.
+        """
+        inode = self._log_inode()
+        try:
+            with open(self.index_path, "rb") as f:
+                data = f.read(_HEADER.size)
+                if len(data) < _HEADER.size:
+                    return None
+                header = _HEADER.unpack(data)
+                usable = (os.fstat(f.fileno()).st_size - _HEADER.size) // _RECORD.size
+                last = None
+                if usable:
+                    f.seek(_HEADER.size + (usable - 1) * _RECORD.size)
+                    last = _RECORD.unpack(f.read(_RECORD.size))
+            if header != (MAGIC, VERSION, inode or 0):
+                return None
+            if last is not None and not self._entry_matches(last[1], last[0]):
+                return None
+        except (OSError, ValueError):
+            return None
+        return usable, last
+
+    def sync(self) -> None:
+        """
+        For the writer: rebuilds the index if it is missing or stale, and indexes any
+        entries appended to the log since the last record.
+        """
+        self._pending.clear()
+        checked = self._check()
+        if checked is None:
+            self.rebuild()
+            return
+        usable, last = checked
+        if os.path.getsize(self.index_path) != _HEADER.size + usable * _RECORD.size:
+            # A torn record from an interrupted write: drop it.
+            with open(self.index_path, "r+b") as f:
+                f.truncate(_HEADER.size + usable * _RECORD.size)
+        if self._log_inode() is None:
+            return
+        start, skip_first = (0, False) if last is None else (last[1], True)
+        missing = self._scan(start, skip_first)
+        if missing:
+            with open(self.index_path, "ab") as f:
+                f.write(b"".join(missing))
+
+    def _scan_entries(
+        self, start: Optional[datetime], end: Optional[datetime]
+    ) -> Iterator[tuple[datetime, bytes]]:
+        """entries() without the index: reads the log from the top."""
+        start_key = timestamp_key(start) if start is not None else None
+        end_key = timestamp_key(end) if end is not None else None
+        key: Optional[int] = None
+        lines: list[bytes] = []
+        with open(self.log_path, "rb") as f:
+            for line in f:
+                match = self.entry_pattern.match(line.decode("utf-8", "replace"))
+                if match is None:
+                    lines.append(line)
+                    continue
+                if key is not None and (start_key is None or key >= start_key):
+                    yield _key_datetime(key), b"".join(lines)
+                key, lines = timestamp_key(match.group(1)), [line]
+                if end_key is not None and key >= end_key:
+                    return
+        if key is not None and (start_key is None or key >= start_key):
+            yield _key_datetime(key), b"".join(lines)
+
+    def _entry_matches(self, offset: int, key: int) -> bool:
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            line = f.readline().decode("utf-8", "replace")
+        match = self.entry_pattern.match(line)
+        return match is not None and timestamp_key(match.group(1)) == key
+
+    # --- Reading ---
+    def entries(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> Iterator[tuple[datetime, bytes]]:
+        """
+        Yields (timestamp, raw entry bytes) for entries with start <= timestamp < end,
+        binary-searching the mapped index for the first one. Never writes the index; if
+        it is missing or stale, the log is scanned instead.
+        """
+        if not os.path.exists(self.log_path) or not os.path.getsize(self.log_path):
+            return
+        checked = self._check()
+        if checked is None:
+            yield from self._scan_entries(start, end)
+            return
+        if checked[0] == 0:
+            return
+        with (
+            open(self.index_path, "rb") as index_file,
+            open(self.log_path, "rb") as log_file,
+            mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ) as index_map,
+            mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as log_map,
+        ):
+            records = _Records(index_map)
+            first = (
+                bisect.bisect_left(records, timestamp_key(start), key=lambda r: r[0])
+                if start is not None
+                else 0
+            )
+            end_key = timestamp_key(end) if end is not None else None
+            for i in range(first, len(records)):
+                key, offset = records[i]
+                if end_key is not None and key >= end_key:
+                    break
+                stop = records[i + 1][1] if i + 1 < len(records) else len(log_map)
+                yield _key_datetime(key), log_map[offset:stop]
@@ -1,39 +1,112 @@
 # /// script
 # dependencies = [
-#   "schedule>=1.2.2,<2.0.0",
 #   "selenium>=4.18.0,<5.0.0",
 #   "python-dotenv>=1.0.1"
 # ]
 # ///
 # main.py
+from __future__ import annotations
 
 # Standard library imports
-import csv
+import argparse
+import functools
 import getpass
+import importlib
 import json
-import logging
 import os
 import re
+import signal
+import sqlite3
 import subprocess
+import sys
+import threading
 import time
-from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import AbstractContextManager, ExitStack, contextmanager, redirect_stdout
 from datetime import datetime
-from typing import ClassVar, Literal, Mapping, Optional, TypedDict
-
-# Third-party imports
-import schedule
-from dotenv import load_dotenv
-from selenium import webdriver
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.common.by import By
-from selenium.webdriver.remote.webdriver import WebDriver
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ClassVar,
+    Generator,
+    Iterable,
+    Literal,
+    Mapping,
+    Optional,
+    TypedDict,
+    TypeVar,
+)
 
 # Local application imports
+import binlog
+import breaker
 import config
+import latency
+import logindex
+import metrics
+import ookla
+import probehistory
+import report
+import rotation
+import scheduler
+import statefile
+import storage
+import thresholds
+import tracing
+
+# Third-party imports, loaded on first use (see "Lazy Imports" below)
+if TYPE_CHECKING:
+    from selenium import webdriver
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.remote.webdriver import WebDriver
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    import gateway_http
+
+
+# --- Lazy Imports ---
+# Selenium takes most of this module's import time, which dominates one-shot runs on
+# small machines. Its names, and the HTTP gateway backend, are bound here the first
+# time a gateway probe that needs them runs, so local-only cycles never load them.
+LAZY_IMPORTS: dict[str, tuple[str, Optional[str]]] = {
+    "gateway_http": ("gateway_http", None),
+    "webdriver": ("selenium.webdriver", None),
+    "TimeoutException": ("selenium.common.exceptions", "TimeoutException"),
+    "Options": ("selenium.webdriver.chrome.options", "Options"),
+    "ChromeService": ("selenium.webdriver.chrome.service", "Service"),
+    "By": ("selenium.webdriver.common.by", "By"),
+    "EC": ("selenium.webdriver.support.expected_conditions", None),
+    "WebDriverWait": ("selenium.webdriver.support.ui", "WebDriverWait"),
+}
+# Seconds each lazily imported module took to load, for `main.py startup`.
+lazy_import_seconds: dict[str, float] = {}
+
+
+def load_lazy_imports(*names: str) -> None:
+    """Binds the given LAZY_IMPORTS names in this module, importing them if needed."""
+    for name in names:
+        if name in globals():
+            continue  # Already loaded, or replaced by a test double
+        module_name, attribute = LAZY_IMPORTS[name]
+        started = time.perf_counter()
+        with tracing.span(f"import {module_name}", "import"):
+            module = importlib.import_module(module_name)
+        lazy_import_seconds.setdefault(module_name, time.perf_counter() - started)
+        globals()[name] = module if attribute is None else getattr(module, attribute)
+
+
+def __getattr__(name: str) -> Any:
+    """Loads lazy names on attribute access, e.g. `main.webdriver` or patch("main.By")."""
+    if name in LAZY_IMPORTS:
+        load_lazy_imports(name)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # --- Debug Logger ---
@@ -87,12 +160,64 @@ def cleanup_old_processes() -> None:
     if not getattr(config, "CLEANUP_STALE_CHROMEDRIVER_PROCESSES", False):
         return
     try:
-        subprocess.run("pkill -f '[c]hromedriver'", shell=True, check=False)
+        with tracing.span("pkill chromedriver", "subprocess"):
+            subprocess.run("pkill -f '[c]hromedriver'", shell=True, check=False)
     except Exception:
         # Ignore any error; this is a best-effort cleanup.
         pass
 
 
+def _start_webdriver(
+    chrome_options: Options, debug_logger: DebugLogger
+) -> tuple[Optional[WebDriver], Optional[ChromeService]]:
+    """Launches chromedriver and Chrome, returning whatever got started.
+
+    The service is returned even if Chrome failed so the caller can still tear it down.
+    """
+    load_lazy_imports("webdriver", "ChromeService")
+    driver: Optional[WebDriver] = None
+    service: Optional[ChromeService] = None
+    try:
+        with tracing.span("start chromedriver and Chrome", "webdriver"):
+            service = ChromeService()
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+        if service and service.process and service.process.pid:
+            debug_logger.set_chromedriver_pid(service.process.pid)
+            debug_logger.log(f"WebDriver service started with PID: {service.process.pid}")
+    except Exception as e:
+        print(f"CRITICAL: Failed to initialize WebDriver session. Error: {e}")
+    return driver, service
+
+
+def _teardown_webdriver(
+    driver: Optional[WebDriver], service: Optional[ChromeService], debug_logger: DebugLogger
+) -> None:
+    """Quits the driver and force-kills the chromedriver service (best-effort)."""
+    print("Shutting down WebDriver session...")
+    if driver:
+        debug_logger.log("WebDriver quit: START")
+        try:
+            with tracing.span("driver.quit", "webdriver"):
+                driver.quit()
+        except Exception as e:
+            debug_logger.log(f"Ignoring error during driver.quit(): {e}")
+        finally:
+            debug_logger.log("WebDriver quit: END")
+    if service and getattr(service, "process", None):
+        try:
+            pid = getattr(service.process, "pid", None)
+            if pid:
+                print(f"Forcefully terminating chromedriver service (PID: {pid})...")
+            with tracing.span("kill chromedriver", "webdriver"):
+                service.process.kill()
+                service.process.wait(timeout=5)
+            print("Service terminated successfully.")
+        except Exception as e:
+            print(
+                f"Notice: Could not kill service process, it may have already exited. Error: {e}"
+            )
+
+
 @contextmanager
 def managed_webdriver_session(chrome_options: Options, debug_logger: DebugLogger):
     """A self-contained, resilient context manager for Selenium WebDriver.
@@ -106,43 +231,362 @@ def managed_webdriver_session(chrome_options: Options, debug_logger: DebugLogger
     service: Optional[ChromeService] = None
     print("Setting up WebDriver for gateway tests...")
     try:
-        service = ChromeService()
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        if service and service.process and service.process.pid:
-            debug_logger.set_chromedriver_pid(service.process.pid)
-            debug_logger.log(f"WebDriver service started with PID: {service.process.pid}")
+        driver, service = _start_webdriver(chrome_options, debug_logger)
         yield driver
-    except Exception as e:
-        print(f"CRITICAL: Failed to initialize WebDriver session. Error: {e}")
-        yield None
     finally:
-        print("Shutting down WebDriver session...")
-        if driver:
-            debug_logger.log("WebDriver quit: START")
-            try:
-                driver.quit()
-            except Exception as e:
-                debug_logger.log(f"Ignoring error during driver.quit(): {e}")
-            finally:
-                debug_logger.log("WebDriver quit: END")
-        if service and getattr(service, "process", None):
-            try:
-                pid = getattr(service.process, "pid", None)
-                if pid:
-                    print(f"Forcefully terminating chromedriver service (PID: {pid})...")
-                service.process.kill()
-                service.process.wait(timeout=5)
-                print("Service terminated successfully.")
-            except Exception as e:
-                print(
-                    "Notice: Could not kill service process, it may have already exited. "
-                    f"Error: {e}"
-                )
+        _teardown_webdriver(driver, service, debug_logger)
         debug_logger.log("managed_webdriver_session: END")
         # Verify process state after teardown
         log_running_chromedriver_processes(debug_logger)
 
 
+def process_tree_rss_mb(root_pid: int) -> Optional[float]:
+    """Returns the combined resident memory of a process and its descendants, in MB."""
+    try:
+        result = subprocess.run(
+            ["ps", "-A", "-o", "pid=,ppid=,rss="],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            check=True,
+        )
+    except Exception:
+        return None
+    children: dict[int, list[int]] = {}
+    rss_kb: dict[int, int] = {}
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) != 3 or not all(p.isdigit() for p in parts):
+            continue
+        pid, ppid, rss = (int(p) for p in parts)
+        children.setdefault(ppid, []).append(pid)
+        rss_kb[pid] = rss
+    if root_pid not in rss_kb:
+        return None
+    total_kb = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total_kb += rss_kb.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total_kb / 1024
+
+
+class PersistentWebDriverSession:
+    """Keeps one Chrome/chromedriver pair warm across check cycles.
+
+    The browser is health-checked before every use and recycled after a crash, after
+    config.WEBDRIVER_MAX_SESSION_USES cycles, or once the chromedriver process tree
+    grows past config.WEBDRIVER_MAX_MEMORY_MB. close() performs the same guaranteed
+    teardown as managed_webdriver_session.
+    """
+
+    def __init__(self) -> None:
+        self.driver: Optional[WebDriver] = None
+        self.service: Optional[ChromeService] = None
+        self.uses = 0
+        self._lock = threading.Lock()
+
+    def _recycle_reason(self) -> Optional[str]:
+        """Returns why the current browser must be replaced, or None if it is usable."""
+        if self.driver is None:
+            return None
+        process = getattr(self.service, "process", None)
+        if process is not None and process.poll() is not None:
+            return "chromedriver exited"
+        try:
+            self.driver.execute_script("return 1;")
+        except Exception as e:
+            return f"health check failed ({e})"
+        max_uses = getattr(config, "WEBDRIVER_MAX_SESSION_USES", None)
+        if max_uses and self.uses >= max_uses:
+            return f"reached {max_uses} uses"
+        max_memory_mb = getattr(config, "WEBDRIVER_MAX_MEMORY_MB", None)
+        pid = getattr(process, "pid", None)
+        if max_memory_mb and isinstance(pid, int):
+            rss_mb = process_tree_rss_mb(pid)
+            if rss_mb is not None and rss_mb > max_memory_mb:
+                return f"memory {rss_mb:.0f} MB over {max_memory_mb} MB ceiling"
+        return None
+
+    def acquire(
+        self, chrome_options: Options, debug_logger: DebugLogger
+    ) -> tuple[Optional[WebDriver], bool]:
+        """Returns a healthy driver and whether it was freshly started."""
+        with self._lock:
+            reason = self._recycle_reason()
+            if reason:
+                print(f"Recycling persistent WebDriver session: {reason}.")
+                self._close_locked(debug_logger)
+            fresh = self.driver is None
+            if fresh:
+                cleanup_old_processes()
+                print("Setting up persistent WebDriver for gateway tests...")
+                self.driver, self.service = _start_webdriver(chrome_options, debug_logger)
+                if self.driver is None:
+                    # Don't keep a half-started service around between cycles.
+                    self._close_locked(debug_logger)
+                    return None, False
+            else:
+                debug_logger.log(f"Reusing persistent WebDriver session (use #{self.uses + 1}).")
+            self.uses += 1
+            return self.driver, fresh
+
+    def close(self, debug_logger: Optional[DebugLogger] = None) -> None:
+        """Tears down the browser and chromedriver if they are running."""
+        with self._lock:
+            self._close_locked(debug_logger or DebugLogger(start_time=time.time()))
+
+    def _close_locked(self, debug_logger: DebugLogger) -> None:
+        if self.driver is None and self.service is None:
+            return
+        _teardown_webdriver(self.driver, self.service, debug_logger)
+        self.driver = None
+        self.service = None
+        self.uses = 0
+        log_running_chromedriver_processes(debug_logger)
+
+
+persistent_webdriver = PersistentWebDriverSession()
+
+
+@contextmanager
+def persistent_webdriver_session(chrome_options: Options, debug_logger: DebugLogger):
+    """Yields the shared warm driver; the browser outlives the block.
+
+    A freshly started browser loads GATEWAY_URL once to establish the gateway session;
+    warm reuses skip that page load entirely.
+    """
+    debug_logger.log("persistent_webdriver_session: START")
+    driver, fresh = persistent_webdriver.acquire(chrome_options, debug_logger)
+    if driver and fresh:
+        establish_gateway_session(driver)
+    try:
+        yield driver
+    finally:
+        debug_logger.log("persistent_webdriver_session: END")
+
+
+class BackgroundSession:
+    """Enters a WebDriver session context on a probe thread and exits it exactly once.
+
+    If the caller closes it while the start is still running (e.g. abandoned at the
+    cycle deadline), the start exits the session itself as soon as it finishes, so a
+    late Chrome is never left running.
+    """
+
+    def __init__(self, session: AbstractContextManager[Optional[WebDriver]]) -> None:
+        self._session = session
+        self._lock = threading.Lock()
+        self._entered = False
+        self._closed = False
+
+    def open(self) -> Optional[WebDriver]:
+        driver = self._session.__enter__()
+        with self._lock:
+            if not self._closed:
+                self._entered = True
+                return driver
+        self._session.__exit__(None, None, None)  # The cycle already ended without it
+        return None
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            entered = self._entered
+        if entered:
+            self._session.__exit__(None, None, None)
+
+
+# --- Probe Executor ---
+T = TypeVar("T")
+
+# How a probe uses the network link:
+#   "local"     - no meaningful traffic (e.g. Chrome startup); never waits for the link.
+#   "shared"    - light traffic (pings, Wi-Fi diagnostics); may overlap other shared probes.
+#   "exclusive" - saturates the link (speed tests, iperf3 load); runs alone.
+ProbeKind = Literal["local", "shared", "exclusive"]
+
+
+class LinkLock:
+    """Reader/writer lock guarding the network link.
+
+    Shared probes hold it concurrently, an exclusive probe holds it alone. A waiting
+    exclusive probe blocks new shared probes so pings cannot starve a speed test.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._shared_holders = 0
+        self._exclusive_held = False
+        self._exclusive_waiting = 0
+
+    @contextmanager
+    def hold(self, kind: ProbeKind) -> Generator[None, None, None]:
+        if kind == "local":
+            yield
+            return
+        with self._cond:
+            if kind == "exclusive":
+                self._exclusive_waiting += 1
+                self._cond.wait_for(lambda: not self._exclusive_held and self._shared_holders == 0)
+                self._exclusive_waiting -= 1
+                self._exclusive_held = True
+            else:
+                self._cond.wait_for(
+                    lambda: not self._exclusive_held and self._exclusive_waiting == 0
+                )
+                self._shared_holders += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                if kind == "exclusive":
+                    self._exclusive_held = False
+                else:
+                    self._shared_holders -= 1
+                self._cond.notify_all()
+
+
+class Deadline:
+    """Time budget for one check cycle, shared by every probe in it.
+
+    Probes cap their own timeouts with cap(), so a straggler gives up by itself once
+    the budget is spent instead of holding up the next scheduled cycle. A deadline
+    created without seconds never expires.
+    """
+
+    # Extra time a probe gets after the deadline to notice it and return.
+    GRACE_SECONDS: ClassVar[float] = 5.0
+
+    def __init__(self, seconds: Optional[float] = None) -> None:
+        self.seconds = seconds
+        self._expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None for an unlimited budget."""
+        if self._expires_at is None:
+            return None
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def cap(self, timeout: float) -> float:
+        """Limits a probe's own timeout to the time left in the cycle."""
+        remaining = self.remaining()
+        return timeout if remaining is None else min(timeout, remaining)
+
+    def wait_timeout(self) -> Optional[float]:
+        """How long to wait for a probe's result, including the grace period."""
+        remaining = self.remaining()
+        return None if remaining is None else remaining + self.GRACE_SECONDS
+
+
+class ProbeExecutor:
+    """Runs independent probes concurrently on a small thread pool.
+
+    Probes declare a ProbeKind so link-saturating work never overlaps other
+    measurements. With max_workers=1 probes run one at a time in submission order.
+    With `measure_usage`, each probe's peak RSS is sampled while it runs, and its child
+    CPU time is recorded too when probes run one at a time.
+    """
+
+    def __init__(
+        self, debug_logger: DebugLogger, max_workers: int = 1, measure_usage: bool = False
+    ) -> None:
+        self.debug_logger = debug_logger
+        self.measure_usage = measure_usage
+        self.sequential = max_workers <= 1
+        self.link = LinkLock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="probe"
+        )
+        self._names: dict[Future[Any], str] = {}
+        # Probes given up on at the cycle deadline; they finish in the background.
+        self.abandoned: set[Future[Any]] = set()
+        # Resources each finished probe used, by submitted name.
+        self.usage: dict[str, probehistory.ProbeUsage] = {}
+
+    def __enter__(self) -> "ProbeExecutor":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        # Never block the scheduler on a straggler that already missed the deadline.
+        self._pool.shutdown(wait=not self.abandoned, cancel_futures=bool(self.abandoned))
+
+    def submit(
+        self, name: str, func: Callable[..., T], *args: Any, kind: ProbeKind = "shared"
+    ) -> Future[T]:
+        """Schedules func(*args) under the link lock for the given kind."""
+        tracer, deadline = tracing.current(), current_deadline()
+
+        def call() -> T:
+            return self._run(name, kind, tracer, deadline, func, *args)
+
+        future = self._pool.submit(call)
+        self._names[future] = name
+        return future
+
+    def run(
+        self,
+        name: str,
+        func: Callable[..., T],
+        *args: Any,
+        kind: ProbeKind = "shared",
+        timeout: Optional[float] = None,
+    ) -> Optional[T]:
+        """Submits a probe and waits for its result."""
+        return self.result(self.submit(name, func, *args, kind=kind), timeout)
+
+    def result(self, future: Future[T], timeout: Optional[float] = None) -> Optional[T]:
+        """Waits for a probe, returning None if it raised instead of failing the cycle.
+
+        A probe still running after `timeout` seconds is abandoned and also yields None.
+        """
+        name = self._names.get(future, "probe")
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            print(f"{name} did not finish before the cycle deadline; abandoning it.")
+            self.abandoned.add(future)
+            return None
+        except Exception as e:
+            print(f"An error occurred during {name}: {e}")
+            return None
+
+    def usage_of(self, future: Future[Any]) -> Optional[probehistory.ProbeUsage]:
+        """What the probe behind `future` used, once it has finished."""
+        return self.usage.get(self._names.get(future, ""))
+
+    def _run(
+        self,
+        name: str,
+        kind: ProbeKind,
+        tracer: Optional[tracing.Tracer],
+        deadline: Deadline,
+        func: Callable[..., T],
+        *args: Any,
+    ) -> T:
+        with self.link.hold(kind):
+            self.debug_logger.log(f"{name}: START")
+            rss = functools.partial(process_tree_rss_mb, os.getpid())
+            meter = probehistory.UsageMeter(
+                # Overlapping probes' subprocesses would be counted against each other.
+                child_cpu=self.measure_usage and self.sequential,
+                rss=rss if self.measure_usage else None,
+            )
+            meter.start()
+            try:
+                # Spans go to the submitting cycle's trace, and timeouts stay capped by
+                # its deadline, even if the probe outlives the cycle.
+                with tracing.bind(tracer), bind_deadline(deadline), tracing.span(name, kind):
+                    return func(*args)
+            finally:
+                self.usage[name] = meter.stop()
+                self.debug_logger.log(f"{name}: END")
+
+
 # --- Typing Models ---
 class GatewayPingResults(TypedDict, total=False):
     """Structured results from gateway ping parsing."""
@@ -157,6 +601,10 @@ class LocalPingResults(TypedDict, total=False):
     loss_percentage: float
     rtt_avg_ms: float
     ping_stddev: float
+    # Per-packet RTT percentiles from a streaming quantile sketch
+    rtt_p50_ms: float
+    rtt_p95_ms: float
+    rtt_p99_ms: float
 
 
 class SpeedResults(TypedDict, total=False):
@@ -173,6 +621,34 @@ class SpeedResults(TypedDict, total=False):
     local_latency_down_load_ms: float
     local_latency_up_load_ms: float
     local_packet_loss_pct: float
+    # Local speed test throughput over time, from the streamed progress events
+    local_download_ramp_up_s: Optional[float]
+    local_download_stability_cv: Optional[float]
+    local_download_mbps_series: str
+    local_download_latency_series: str
+    local_upload_ramp_up_s: Optional[float]
+    local_upload_stability_cv: Optional[float]
+    local_upload_mbps_series: str
+    local_upload_latency_series: str
+    # Latency sampled during the local speed test, per target and Ookla phase
+    speedtest_wan_idle_rtt_p50_ms: Optional[float]
+    speedtest_wan_idle_rtt_p95_ms: Optional[float]
+    speedtest_wan_idle_loss_percentage: Optional[float]
+    speedtest_wan_download_rtt_p50_ms: Optional[float]
+    speedtest_wan_download_rtt_p95_ms: Optional[float]
+    speedtest_wan_download_loss_percentage: Optional[float]
+    speedtest_wan_upload_rtt_p50_ms: Optional[float]
+    speedtest_wan_upload_rtt_p95_ms: Optional[float]
+    speedtest_wan_upload_loss_percentage: Optional[float]
+    speedtest_gw_idle_rtt_p50_ms: Optional[float]
+    speedtest_gw_idle_rtt_p95_ms: Optional[float]
+    speedtest_gw_idle_loss_percentage: Optional[float]
+    speedtest_gw_download_rtt_p50_ms: Optional[float]
+    speedtest_gw_download_rtt_p95_ms: Optional[float]
+    speedtest_gw_download_loss_percentage: Optional[float]
+    speedtest_gw_upload_rtt_p50_ms: Optional[float]
+    speedtest_gw_upload_rtt_p95_ms: Optional[float]
+    speedtest_gw_upload_loss_percentage: Optional[float]
 
 
 class WifiDiagnostics(TypedDict, total=False):
@@ -197,16 +673,46 @@ class Colors:
     BOLD: ClassVar[str] = "\033[1m"
 
 
-# Load environment variables
-load_dotenv()
-
 # --- Globals for state management ---
 run_counter: int = 0
+# Budget of the check cycle in progress; probes cap their timeouts against it.
+cycle_deadline: Deadline = Deadline()
+# Deadline of the cycle that submitted the probe running on this thread.
+_bound_deadline = threading.local()
+# Marker written in place of a probe's values when it ran out of cycle budget.
+TIMED_OUT = "TIMEOUT"
+# Marker written in place of a probe's values while its circuit breaker is open.
+SKIPPED = "SKIPPED"
 DEVICE_ACCESS_CODE: str = ""
 
 
+def current_deadline() -> Deadline:
+    """
+    The deadline probes on this thread cap their timeouts against: the one bound by the
+    executor that runs them, else the cycle in progress.
+    """
+    return getattr(_bound_deadline, "deadline", cycle_deadline)
+
+
+@contextmanager
+def bind_deadline(deadline: Deadline) -> Generator[None, None, None]:
+    """Makes current_deadline() on this thread return `deadline` inside the block."""
+    previous = vars(_bound_deadline).get("deadline")
+    _bound_deadline.deadline = deadline
+    try:
+        yield
+    finally:
+        if previous is None:
+            del _bound_deadline.deadline
+        else:
+            _bound_deadline.deadline = previous
+
+
 def get_access_code() -> str:
     """Gets the device access code from an environment variable or prompts the user."""
+    from dotenv import load_dotenv  # Only the gateway speed test needs .env
+
+    load_dotenv()
     code = os.environ.get("GATEWAY_ACCESS_CODE")
     if code:
         print("Device Access Code found in environment variable.")
@@ -232,10 +738,91 @@ def parse_gateway_ping_results(full_results: str) -> GatewayPingResults:
     return results
 
 
+def parse_gateway_speed_rows(rows: Iterable[tuple[str, str]]) -> SpeedResults:
+    """Parses (direction, speed) cell pairs from the gateway speed test results table.
+
+    The newest result is listed first, so only the first downstream and upstream rows count.
+    `rows` may be lazy; iteration stops as soon as both directions are found.
+    """
+    results: SpeedResults = {}
+    for direction_text, speed_text in rows:
+        direction = direction_text.lower()
+        try:
+            speed = float(speed_text)
+        except ValueError:
+            continue
+        if "downstream" in direction and "downstream_speed" not in results:
+            results["downstream_speed"] = speed
+        if "upstream" in direction and "upstream_speed" not in results:
+            results["upstream_speed"] = speed
+        if "downstream_speed" in results and "upstream_speed" in results:
+            break
+    return results
+
+
+RAW_GATEWAY_LOG_FILE = "gateway_raw_output.log"
+
+
+def build_log_rotator(
+    path: str, entry_pattern: re.Pattern[str] = rotation.CSV_ENTRY
+) -> Optional[rotation.LogRotator]:
+    """Rotator for `path` per the LOG_ROTATE_* settings, or None when rotation is off."""
+    max_bytes = getattr(config, "LOG_ROTATE_MAX_BYTES", None)
+    daily = getattr(config, "LOG_ROTATE_DAILY", False)
+    if max_bytes is None and not daily:
+        return None
+    return rotation.LogRotator(path, max_bytes=max_bytes, daily=daily, entry_pattern=entry_pattern)
+
+
+def build_log_index(
+    path: str, entry_pattern: re.Pattern[str] = rotation.CSV_ENTRY
+) -> Optional[logindex.TimestampIndex]:
+    """Timestamp index sidecar for `path`, or None unless ENABLE_LOG_INDEX is set."""
+    if not getattr(config, "ENABLE_LOG_INDEX", False):
+        return None
+    return logindex.TimestampIndex(path, entry_pattern)
+
+
+def log_raw_gateway_output(results_text: str) -> None:
+    """Appends raw gateway ping output to gateway_raw_output.log when enabled."""
+    if not getattr(config, "LOG_RAW_GATEWAY_OUTPUT", False):
+        print("Successfully retrieved gateway ping results text.")
+        return
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rotator = build_log_rotator(RAW_GATEWAY_LOG_FILE, rotation.RAW_LOG_ENTRY)
+    if rotator is not None and rotator.due(timestamp):
+        rotator.rotate()
+    index = build_log_index(RAW_GATEWAY_LOG_FILE, rotation.RAW_LOG_ENTRY)
+    if index is not None:
+        index.sync()
+    with open(RAW_GATEWAY_LOG_FILE, "a", encoding="utf-8") as log_file:
+        if index is not None:
+            index.append(timestamp, log_file.tell())
+        log_file.write(f"--- Log entry from {timestamp} ---\n")
+        log_file.write(results_text + "\n\n")
+    if index is not None:
+        index.flush()
+    print("Successfully retrieved and logged raw gateway ping results text.")
+
+
+def add_rtt_percentiles(results: LocalPingResults, rtts_ms: list[float]) -> None:
+    """Adds p50/p95/p99 RTTs from per-packet samples, if there are any."""
+    if not rtts_ms:
+        return
+    sketch = latency.QuantileSketch()
+    for rtt in rtts_ms:
+        sketch.add(rtt)
+    for q, key in ((0.5, "rtt_p50_ms"), (0.95, "rtt_p95_ms"), (0.99, "rtt_p99_ms")):
+        value = sketch.quantile(q)
+        if value is not None:
+            results[key] = value
+
+
 def parse_local_ping_results(ping_output: str) -> LocalPingResults:
     """
     Parses local ping output, returning numerical values for key metrics.
-    Focuses on packet loss percentage, average RTT, and standard deviation.
+    Focuses on packet loss percentage, average RTT, standard deviation, and
+    percentiles of the per-packet `time=` values.
     """
     results: LocalPingResults = {}  # Changed for strict typing
     loss_match = re.search(r"(\d+(?:\.\d+)?)% packet loss", ping_output)
@@ -249,13 +836,18 @@ def parse_local_ping_results(ping_output: str) -> LocalPingResults:
             results["rtt_avg_ms"] = float(parts[1])
             results["ping_stddev"] = float(parts[3])
 
+    packet_rtts = [float(t) for t in re.findall(r"time[=<]([\d.]+)\s*ms", ping_output)]
+    add_rtt_percentiles(results, packet_rtts)
+
     return results
 
 
-def log_results(all_data: Mapping[str, str | float | int | None]) -> None:
+def log_results(
+    all_data: Mapping[str, str | float | int | None],
+) -> dict[str, str | float | int | None]:
     """
     Logs results to a CSV file and prints a color-coded summary to the console
-    based on configured anomaly thresholds.
+    based on configured anomaly thresholds. Returns the logged row, Timestamp first.
     """
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     data_points = {
@@ -288,23 +880,83 @@ def log_results(all_data: Mapping[str, str | float | int | None]) -> None:
         "LAN_Idle_RTT_ms": all_data.get("lan_idle_rtt_ms"),
         "LAN_Under_Load_RTT_ms": all_data.get("lan_under_load_rtt_ms"),
         "LAN_Bufferbloat_ms": all_data.get("lan_bufferbloat_ms"),
+        # Continuous latency stream, summarized over the whole interval
+        "Stream_WAN_LossPercentage": all_data.get("stream_wan_loss_percentage"),
+        "Stream_WAN_RTT_min_ms": all_data.get("stream_wan_rtt_min_ms"),
+        "Stream_WAN_RTT_avg_ms": all_data.get("stream_wan_rtt_avg_ms"),
+        "Stream_WAN_RTT_max_ms": all_data.get("stream_wan_rtt_max_ms"),
+        "Stream_WAN_RTT_StdDev": all_data.get("stream_wan_rtt_stddev_ms"),
+        "Stream_WAN_Outages": all_data.get("stream_wan_outages"),
+        "Stream_GW_LossPercentage": all_data.get("stream_gw_loss_percentage"),
+        "Stream_GW_RTT_min_ms": all_data.get("stream_gw_rtt_min_ms"),
+        "Stream_GW_RTT_avg_ms": all_data.get("stream_gw_rtt_avg_ms"),
+        "Stream_GW_RTT_max_ms": all_data.get("stream_gw_rtt_max_ms"),
+        "Stream_GW_RTT_StdDev": all_data.get("stream_gw_rtt_stddev_ms"),
+        "Stream_GW_Outages": all_data.get("stream_gw_outages"),
+        # Tail latency (per-packet RTT percentiles)
+        "Local_WAN_RTT_p50_ms": all_data.get("local_wan_rtt_p50_ms"),
+        "Local_WAN_RTT_p95_ms": all_data.get("local_wan_rtt_p95_ms"),
+        "Local_WAN_RTT_p99_ms": all_data.get("local_wan_rtt_p99_ms"),
+        "Local_GW_RTT_p50_ms": all_data.get("local_gw_rtt_p50_ms"),
+        "Local_GW_RTT_p95_ms": all_data.get("local_gw_rtt_p95_ms"),
+        "Local_GW_RTT_p99_ms": all_data.get("local_gw_rtt_p99_ms"),
+        "LAN_Under_Load_RTT_p50_ms": all_data.get("lan_under_load_rtt_p50_ms"),
+        "LAN_Under_Load_RTT_p95_ms": all_data.get("lan_under_load_rtt_p95_ms"),
+        "LAN_Under_Load_RTT_p99_ms": all_data.get("lan_under_load_rtt_p99_ms"),
+        "Stream_WAN_RTT_p50_ms": all_data.get("stream_wan_rtt_p50_ms"),
+        "Stream_WAN_RTT_p95_ms": all_data.get("stream_wan_rtt_p95_ms"),
+        "Stream_WAN_RTT_p99_ms": all_data.get("stream_wan_rtt_p99_ms"),
+        "Stream_GW_RTT_p50_ms": all_data.get("stream_gw_rtt_p50_ms"),
+        "Stream_GW_RTT_p95_ms": all_data.get("stream_gw_rtt_p95_ms"),
+        "Stream_GW_RTT_p99_ms": all_data.get("stream_gw_rtt_p99_ms"),
     }
+    # Latency sampled during the local speed test, per target and Ookla phase
+    for target, target_label in (("wan", "WAN"), ("gw", "GW")):
+        for phase, phase_label in (("idle", "Idle"), ("download", "Down"), ("upload", "Up")):
+            key = f"speedtest_{target}_{phase}"
+            column = f"Speedtest_{target_label}_{phase_label}"
+            data_points[f"{column}_RTT_p50_ms"] = all_data.get(f"{key}_rtt_p50_ms")
+            data_points[f"{column}_RTT_p95_ms"] = all_data.get(f"{key}_rtt_p95_ms")
+            data_points[f"{column}_LossPercentage"] = all_data.get(f"{key}_loss_percentage")
+    # Local speed test throughput over time, from the streamed progress events
+    for phase, label in (("download", "Download"), ("upload", "Upload")):
+        data_points[f"Local_{label}_RampUp_s"] = all_data.get(f"local_{phase}_ramp_up_s")
+        data_points[f"Local_{label}_Stability_CV"] = all_data.get(f"local_{phase}_stability_cv")
+        data_points[f"Local_{label}_Mbps_Series"] = all_data.get(f"local_{phase}_mbps_series")
+        data_points[f"Local_{label}_Latency_Series"] = all_data.get(
+            f"local_{phase}_latency_series"
+        )
+    # Circuit breaker state changes since the previous row
+    data_points["Breaker_Transitions"] = all_data.get("breaker_transitions")
 
     # --- CSV Logging ---
     csv_values = [
         f"{v:.3f}" if isinstance(v, float) else "N/A" if v is None else str(v)
         for v in data_points.values()
     ]
-    write_header = not os.path.exists(config.LOG_FILE) or os.path.getsize(config.LOG_FILE) == 0
-    with open(config.LOG_FILE, "a", newline="") as f:
-        writer = csv.writer(f)
-        if write_header:
-            writer.writerow(["Timestamp", *data_points.keys()])
-        writer.writerow([timestamp, *csv_values])
+    if getattr(config, "ENABLE_CSV_LOG", True):
+        get_csv_sink().write(["Timestamp", *data_points.keys()], [timestamp, *csv_values])
+    metrics_registry.update(timestamp, data_points)
+
+    # --- SQLite Store ---
+    store = get_result_store()
+    if store is not None:
+        try:
+            store.append(timestamp, data_points)
+        except sqlite3.Error as e:
+            print(f"Could not write results to {store.path}: {e}")
+
+    # --- Binary Log ---
+    binary_log = get_binary_log()
+    if binary_log is not None:
+        try:
+            binary_log.append(timestamp, data_points)
+        except OSError as e:
+            print(f"Could not write results to {binary_log.path}: {e}")
 
     # --- Console Output Formatting ---
     def format_value(
-        value: Optional[float],
+        value: Optional[float | str],
         unit: str,
         threshold: Optional[float],
         comparison: Literal["greater", "less"] = "greater",
@@ -314,6 +966,9 @@ def log_results(all_data: Mapping[str, str | float | int | None]) -> None:
         """Formats and colors a value based on a threshold."""
         if value is None:
             return f"{Colors.YELLOW}N/A{Colors.RESET}"
+        if isinstance(value, str):
+            # Status markers such as TIMED_OUT stand in for a value.
+            return f"{Colors.RED}{value}{Colors.RESET}"
 
         is_anomaly = False
         if config.ENABLE_ANOMALY_HIGHLIGHTING and threshold is not None:
@@ -329,6 +984,18 @@ def log_results(all_data: Mapping[str, str | float | int | None]) -> None:
             else f"{value:.{precision}f} {unit}"
         )
 
+    def format_percentiles(prefix: str, default_color: str = "") -> str:
+        """Formats `<prefix>_p50/p95/p99_ms` against their thresholds as `a / b / c`."""
+        return " / ".join(
+            format_value(
+                data_points[f"{prefix}_{key}_ms"],
+                "ms",
+                getattr(config, f"PING_RTT_{key.upper()}_THRESHOLD", None),
+                default_color=default_color,
+            )
+            for key in ("p50", "p95", "p99")
+        )
+
     # --- Print to Console ---
     print("\n--- Gateway Test Results ---")
     loss_pct = format_value(
@@ -371,6 +1038,8 @@ def log_results(all_data: Mapping[str, str | float | int | None]) -> None:
         precision=3,
     )
     print(f"  WAN Jitter (StdDev):          {wan_jitter}")
+    if data_points["Local_WAN_RTT_p50_ms"] is not None:
+        print(f"  WAN RTT (p50/p95/p99):      {format_percentiles('Local_WAN_RTT')}")
 
     gw_loss = format_value(
         data_points["Local_GW_LossPercentage"], "%", config.PACKET_LOSS_THRESHOLD
@@ -393,6 +1062,9 @@ def log_results(all_data: Mapping[str, str | float | int | None]) -> None:
         default_color=Colors.CYAN,
     )
     print(f"  Gateway Jitter (StdDev):    {gw_jitter}")
+    if data_points["Local_GW_RTT_p50_ms"] is not None:
+        gw_percentiles = format_percentiles("Local_GW_RTT", default_color=Colors.CYAN)
+        print(f"  Gateway RTT (p50/p95/p99):  {gw_percentiles}")
 
     local_down = format_value(
         data_points["Local_Downstream_Mbps"],
@@ -451,6 +1123,46 @@ def log_results(all_data: Mapping[str, str | float | int | None]) -> None:
     )
     print(f"  Speedtest Packet Loss:      {packet_loss_val}")
 
+    ramp_up = " / ".join(
+        format_value(data_points[f"Local_{label}_RampUp_s"], "s", None, precision=0)
+        for label in ("Download", "Upload")
+    )
+    print(f"  Ramp-up (down/up):          {ramp_up}")
+    stability = " / ".join(
+        format_value(
+            data_points[f"Local_{label}_Stability_CV"],
+            "CV",
+            getattr(config, "SPEEDTEST_STABILITY_CV_THRESHOLD", None),
+        )
+        for label in ("Download", "Upload")
+    )
+    print(f"  Throughput Stability:       {stability}")
+
+    # Our own probes during the speed test, idle / download / upload
+    if data_points["Speedtest_WAN_Idle_RTT_p50_ms"] is not None:
+        print("  Sampled During Speed Test (idle / download / upload):")
+        for label, prefix in (("WAN", "Speedtest_WAN"), ("Gateway", "Speedtest_GW")):
+            for key in ("p50", "p95"):
+                idle_threshold = getattr(config, f"PING_RTT_{key.upper()}_THRESHOLD", None)
+                phases = " / ".join(
+                    format_value(
+                        data_points[f"{prefix}_{phase}_RTT_{key}_ms"],
+                        "ms",
+                        idle_threshold if phase == "Idle" else config.LATENCY_UNDER_LOAD_THRESHOLD,
+                    )
+                    for phase in ("Idle", "Down", "Up")
+                )
+                print(f"  {f'  {label} RTT {key}:':<28}{phases}")
+            loss = " / ".join(
+                format_value(
+                    data_points[f"{prefix}_{phase}_LossPercentage"],
+                    "%",
+                    config.PACKET_LOSS_THRESHOLD,
+                )
+                for phase in ("Idle", "Down", "Up")
+            )
+            print(f"  {f'  {label} Packet Loss:':<28}{loss}")
+
     print("\n--- Wi-Fi Diagnostics ---")
     print(f"  Connected AP (BSSID):       {data_points['WiFi_BSSID']}")
     print(f"  Signal Strength (RSSI):     {data_points['WiFi_RSSI']}")
@@ -476,19 +1188,46 @@ def log_results(all_data: Mapping[str, str | float | int | None]) -> None:
         precision=2,
     )
     print(f"  LAN Bufferbloat Delta:      {lan_bloat}")
+    if data_points["LAN_Under_Load_RTT_p50_ms"] is not None:
+        print(f"  Loaded LAN RTT (p50/p95/p99): {format_percentiles('LAN_Under_Load_RTT')}")
+
+    # --- Continuous Latency Stream (only when sampling is enabled) ---
+    if data_points["Stream_WAN_Outages"] is not None:
+        print("\n--- Continuous Latency (since last run) ---")
+        for label, prefix in (("WAN", "Stream_WAN"), ("Gateway", "Stream_GW")):
+            stream_loss = format_value(
+                data_points[f"{prefix}_LossPercentage"], "%", config.PACKET_LOSS_THRESHOLD
+            )
+            stream_avg = format_value(
+                data_points[f"{prefix}_RTT_avg_ms"], "ms", config.PING_RTT_THRESHOLD
+            )
+            stream_max = format_value(data_points[f"{prefix}_RTT_max_ms"], "ms", None)
+            stream_jitter = format_value(
+                data_points[f"{prefix}_RTT_StdDev"], "ms", config.JITTER_THRESHOLD, precision=3
+            )
+            print(f"  {label + ' Packet Loss:':<28}{stream_loss}")
+            print(f"  {label + ' RTT (avg/max):':<28}{stream_avg} / {stream_max}")
+            print(f"  {label + ' Jitter (StdDev):':<28}{stream_jitter}")
+            print(f"  {label + ' RTT (p50/p95/p99):':<28}{format_percentiles(f'{prefix}_RTT')}")
+            print(f"  {label + ' Outages:':<28}{data_points[f'{prefix}_Outages']}")
     print("------------------------------------")
-    full_path = os.path.abspath(config.LOG_FILE)
-    print(f"Results appended to: {full_path}")
+    if getattr(config, "ENABLE_CSV_LOG", True):
+        full_path = os.path.abspath(config.LOG_FILE)
+        print(f"Results appended to: {full_path}")
+    return {"Timestamp": timestamp, **data_points}
 
 
 def run_ping_test_task(driver: WebDriver) -> Optional[GatewayPingResults]:
     """Runs the ping test on the gateway's diagnostics page and logs raw output."""
+    load_lazy_imports("WebDriverWait", "EC", "By")
     print("Navigating to gateway diagnostics page for ping test...")
-    driver.get(config.DIAG_URL)
+    with tracing.span("load diagnostics page", "page", url=config.DIAG_URL):
+        driver.get(config.DIAG_URL)
     try:
-        target_input = WebDriverWait(driver, 20).until(
-            EC.visibility_of_element_located((By.ID, "webaddress"))
-        )
+        with tracing.span("wait for ping form", "wait"):
+            target_input = WebDriverWait(driver, current_deadline().cap(20)).until(
+                EC.visibility_of_element_located((By.ID, "webaddress"))
+            )
         driver.execute_script(
             "arguments[0].value = arguments[1];",
             target_input,
@@ -498,23 +1237,19 @@ def run_ping_test_task(driver: WebDriver) -> Optional[GatewayPingResults]:
         driver.execute_script("arguments[0].click();", ping_button)
         print(f"Gateway ping test started for {config.PING_TARGET}.")
         print("Waiting for gateway ping results...")
-        wait = WebDriverWait(driver, 30)
-        wait.until(
-            lambda d: "ping statistics" in d.find_element(By.ID, "progress").get_attribute("value")
-        )
+        wait = WebDriverWait(driver, current_deadline().cap(30))
+        with tracing.span("wait for ping results", "wait"):
+            wait.until(
+                lambda d: (
+                    "ping statistics" in d.find_element(By.ID, "progress").get_attribute("value")
+                )
+            )
 
         # Re-find the element after the wait to avoid stale references
         results_element = driver.find_element(By.ID, "progress")
         results_text = (results_element.get_attribute("value") or "").strip()
         if results_text:
-            if getattr(config, "LOG_RAW_GATEWAY_OUTPUT", False):
-                with open("gateway_raw_output.log", "a") as log_file:
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    log_file.write(f"--- Log entry from {timestamp} ---\n")
-                    log_file.write(results_text + "\n\n")
-                print("Successfully retrieved and logged raw gateway ping results text.")
-            else:
-                print("Successfully retrieved gateway ping results text.")
+            log_raw_gateway_output(results_text)
         else:
             print("Warning: Gateway ping results text is empty.")
             return None
@@ -532,13 +1267,16 @@ def run_speed_test_task(driver: WebDriver, access_code: str) -> Optional[SpeedRe
     """
     Automates the gateway speed test, returning numerical values for speeds.
     """
+    load_lazy_imports("WebDriverWait", "EC", "By", "TimeoutException")
     print("Navigating to gateway speed test page...")
-    driver.get(config.SPEED_TEST_URL)
+    with tracing.span("load speed test page", "page", url=config.SPEED_TEST_URL):
+        driver.get(config.SPEED_TEST_URL)
     try:
         try:
-            password_input = WebDriverWait(driver, 5).until(
-                EC.visibility_of_element_located((By.ID, "password"))
-            )
+            with tracing.span("wait for access code prompt", "wait"):
+                password_input = WebDriverWait(driver, current_deadline().cap(5)).until(
+                    EC.visibility_of_element_located((By.ID, "password"))
+                )
             print("Device Access Code required. Attempting to log in...")
             password_input.send_keys(access_code)
 
@@ -549,47 +1287,265 @@ def run_speed_test_task(driver: WebDriver, access_code: str) -> Optional[SpeedRe
         except TimeoutException:
             print("Already logged in or no password required for gateway speed test.")
 
-        run_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.NAME, "run")))
+        with tracing.span("wait for run button", "wait"):
+            run_button = WebDriverWait(driver, current_deadline().cap(15)).until(
+                EC.element_to_be_clickable((By.NAME, "run"))
+            )
         run_button.click()
 
         print("Gateway speed test initiated. This will take up to 90 seconds...")
         print("Waiting for gateway results table to populate...")
-        WebDriverWait(driver, 90).until(
-            EC.text_to_be_present_in_element(
-                (By.CSS_SELECTOR, "table.grid.table100 tr:nth-child(2)"), "downstream"
+        with tracing.span("wait for speed test results", "wait"):
+            WebDriverWait(driver, current_deadline().cap(90)).until(
+                EC.text_to_be_present_in_element(
+                    (By.CSS_SELECTOR, "table.grid.table100 tr:nth-child(2)"), "downstream"
+                )
             )
-        )
 
         print("Gateway speed test complete. Parsing results...")
-        results: SpeedResults = {}
         table = driver.find_element(By.CSS_SELECTOR, "table.grid.table100")
         rows = table.find_elements(By.TAG_NAME, "tr")
-        for row in rows:
-            cols = row.find_elements(By.TAG_NAME, "td")
-            if len(cols) >= 3:
-                direction = cols[1].text.lower()
-                try:
-                    speed = float(cols[2].text)
-                    if "downstream" in direction and "downstream_speed" not in results:
-                        results["downstream_speed"] = speed
-                    if "upstream" in direction and "upstream_speed" not in results:
-                        results["upstream_speed"] = speed
-                except (ValueError, IndexError):
-                    continue
-            if "downstream_speed" in results and "upstream_speed" in results:
-                break
+        # Lazily read only the cells parse_gateway_speed_rows asks for.
+        cell_pairs = (
+            (cols[1].text, cols[2].text)
+            for cols in (row.find_elements(By.TAG_NAME, "td") for row in rows)
+            if len(cols) >= 3
+        )
+        with tracing.span("read results table", "page"):
+            results = parse_gateway_speed_rows(cell_pairs)
         return results if results else None
     except Exception as e:
         print(f"An error occurred during the task: {e}")
         return None
 
 
+# --- CSV Result Sink ---
+_csv_sink: Optional[storage.CsvResultSink] = None
+
+
+def get_csv_sink() -> storage.CsvResultSink:
+    """Returns the long-lived CSV sink for config.LOG_FILE, opening it on first use."""
+    global _csv_sink
+    if _csv_sink is not None and _csv_sink.path != config.LOG_FILE:
+        close_csv_sink()
+    if _csv_sink is None:
+        _csv_sink = storage.CsvResultSink(
+            config.LOG_FILE,
+            flush_every_rows=getattr(config, "CSV_FLUSH_EVERY_ROWS", 1),
+            flush_every_seconds=getattr(config, "CSV_FLUSH_EVERY_SECONDS", None),
+            fsync=getattr(config, "CSV_FSYNC", False),
+            rotator=build_log_rotator(config.LOG_FILE),
+            index=build_log_index(config.LOG_FILE),
+        )
+    return _csv_sink
+
+
+def close_csv_sink() -> None:
+    """Flushes and closes the CSV log file, if open."""
+    global _csv_sink
+    if _csv_sink is not None:
+        _csv_sink.close()
+        _csv_sink = None
+
+
+# --- SQLite Result Store (config.ENABLE_SQLITE_STORE) ---
+_result_store: Optional[storage.ResultStore] = None
+
+
+def get_result_store() -> Optional[storage.ResultStore]:
+    """Opens the shared SQLite store on first use, or returns None when it is disabled."""
+    global _result_store
+    if _result_store is None and getattr(config, "ENABLE_SQLITE_STORE", False):
+        try:
+            _result_store = storage.ResultStore(
+                getattr(config, "SQLITE_DB_FILE", "network_log.db"),
+                batch_rows=getattr(config, "SQLITE_BATCH_ROWS", 10),
+                batch_seconds=getattr(config, "SQLITE_BATCH_SECONDS", 30.0),
+            )
+        except sqlite3.Error as e:
+            print(f"Could not open the SQLite store: {e}")
+    return _result_store
+
+
+def close_result_store() -> None:
+    """Commits any batched rows and closes the SQLite store, if open."""
+    global _result_store
+    if _result_store is not None:
+        _result_store.close()
+        _result_store = None
+
+
+# --- Binary Results Log (config.ENABLE_BINARY_LOG) ---
+_binary_log: Optional[binlog.BinaryLogWriter] = None
+
+
+def get_binary_log() -> Optional[binlog.BinaryLogWriter]:
+    """Opens the compact binary log on first use, or returns None when it is disabled."""
+    global _binary_log
+    if _binary_log is None and getattr(config, "ENABLE_BINARY_LOG", False):
+        try:
+            _binary_log = binlog.BinaryLogWriter(
+                getattr(config, "BINARY_LOG_FILE", "network_log.sglb")
+            )
+        except OSError as e:
+            print(f"Could not open the binary log: {e}")
+    return _binary_log
+
+
+def close_binary_log() -> None:
+    """Closes the binary log, if open."""
+    global _binary_log
+    if _binary_log is not None:
+        _binary_log.close()
+        _binary_log = None
+
+
+# --- Probe History (config.PROBE_HISTORY_FILE) ---
+_probe_history: Optional[probehistory.ProbeHistory] = None
+
+
+def get_probe_history() -> Optional[probehistory.ProbeHistory]:
+    """Returns the probe run history log, or None if PROBE_HISTORY_FILE is unset."""
+    global _probe_history
+    path = getattr(config, "PROBE_HISTORY_FILE", None)
+    if _probe_history is not None and _probe_history.path != path:
+        close_probe_history()
+    if _probe_history is None and path:
+        _probe_history = probehistory.ProbeHistory(
+            path,
+            window=getattr(config, "PROBE_REGRESSION_WINDOW", 50),
+            factor=getattr(config, "PROBE_REGRESSION_FACTOR", 2.0),
+            min_samples=getattr(config, "PROBE_REGRESSION_MIN_SAMPLES", 10),
+        )
+    return _probe_history
+
+
+def close_probe_history() -> None:
+    """Closes the probe history log, if open."""
+    global _probe_history
+    if _probe_history is not None:
+        _probe_history.close()
+        _probe_history = None
+
+
+# --- HTTP Gateway Backend (config.GATEWAY_BACKEND = "http") ---
+_gateway_http_client: Optional[gateway_http.GatewayHttpClient] = None
+# Session cookies from the run-once state file, given to the client when it is created.
+saved_gateway_cookies: dict[str, str] = {}
+
+
+def get_gateway_http_client() -> gateway_http.GatewayHttpClient:
+    """Returns the shared keep-alive client so connections and cookies persist across runs."""
+    load_lazy_imports("gateway_http")
+    global _gateway_http_client
+    if _gateway_http_client is None:
+        _gateway_http_client = gateway_http.GatewayHttpClient()
+        _gateway_http_client.cookies.update(saved_gateway_cookies)
+    return _gateway_http_client
+
+
+def close_gateway_http_client() -> None:
+    """Closes the shared HTTP client's pooled connections, if any."""
+    global _gateway_http_client
+    if _gateway_http_client is not None:
+        _gateway_http_client.close()
+        _gateway_http_client = None
+
+
+def run_http_ping_test_task(access_code: str = "") -> Optional[GatewayPingResults]:
+    """Runs the gateway ping diagnostic over HTTP instead of through Chrome."""
+    load_lazy_imports("gateway_http")
+    print(f"Gateway ping test started for {config.PING_TARGET} (HTTP backend).")
+    try:
+        results_text = gateway_http.run_ping(
+            get_gateway_http_client(),
+            config.DIAG_URL,
+            config.PING_TARGET,
+            access_code,
+            timeout=current_deadline().cap(30),
+        )
+    except Exception as e:
+        print(f"An error occurred during the task: {e}")
+        return None
+    if not results_text:
+        print("Warning: Gateway ping results text is empty.")
+        return None
+    log_raw_gateway_output(results_text)
+    return parse_gateway_ping_results(results_text)
+
+
+def run_http_speed_test_task(access_code: str) -> Optional[SpeedResults]:
+    """Runs the gateway speed test over HTTP instead of through Chrome."""
+    load_lazy_imports("gateway_http")
+    print("Gateway speed test initiated (HTTP backend). This will take up to 90 seconds...")
+    try:
+        rows = gateway_http.run_speed_test(
+            get_gateway_http_client(),
+            config.SPEED_TEST_URL,
+            access_code,
+            timeout=current_deadline().cap(90),
+        )
+    except Exception as e:
+        print(f"An error occurred during the task: {e}")
+        return None
+    print("Gateway speed test complete. Parsing results...")
+    results = parse_gateway_speed_rows((row[1], row[2]) for row in rows if len(row) >= 3)
+    return results if results else None
+
+
+def use_native_prober() -> bool:
+    """True when local pings should use the in-process prober instead of `ping`."""
+    return getattr(config, "LOCAL_PING_BACKEND", "subprocess") == "native"
+
+
+def native_ping(target: str, count: int, interval: float) -> latency.ProbeRun:
+    """Sends `count` in-process probes to `target`, `interval` seconds apart.
+
+    Fewer are sent when the cycle deadline would pass before the last reply is due.
+    """
+    timeout = current_deadline().cap(getattr(config, "NATIVE_PING_TIMEOUT", 1.0))
+    remaining = current_deadline().remaining()
+    if remaining is not None and interval > 0:
+        count = min(count, max(1, int((remaining - timeout) / interval) + 1))
+    with latency.LatencyProber(target, timeout=timeout) as p:
+        return p.probe(count, interval)
+
+
+def summarize_probe_run(run: latency.ProbeRun) -> LocalPingResults:
+    """Reduces per-packet RTTs to the same fields parse_local_ping_results returns."""
+    results: LocalPingResults = {}
+    if run.loss_percentage is not None:
+        results["loss_percentage"] = run.loss_percentage
+    rtts = run.received_rtts_ms
+    if rtts:
+        _, avg, _, stddev = latency.summarize_rtts(rtts)
+        results["rtt_avg_ms"] = avg
+        results["ping_stddev"] = stddev
+        add_rtt_percentiles(results, rtts)
+    return results
+
+
 def run_local_ping_task(target: str) -> LocalPingResults:
     """Runs a ping test from the local OS to the specified target."""
     print(f"Running local ping test to {target}...")
+    if use_native_prober():
+        try:
+            run = native_ping(
+                target,
+                getattr(config, "NATIVE_PING_COUNT", 40),
+                getattr(config, "NATIVE_PING_INTERVAL_SECONDS", 0.05),
+            )
+            print(f"Local ping to {target} complete ({run.sent} {run.method} probes).")
+            return summarize_probe_run(run)
+        except Exception as e:
+            print(f"An error occurred during local ping test to {target}: {e}")
+            return {}
     try:
         command = ["ping", "-c", "4", target]
-        process = subprocess.run(command, capture_output=True, text=True, timeout=15)
+        with tracing.span("ping", "subprocess", target=target):
+            process = subprocess.run(
+                command, capture_output=True, text=True, timeout=current_deadline().cap(15)
+            )
         if process.returncode == 0:
             print(f"Local ping to {target} complete.")
             return parse_local_ping_results(process.stdout)
@@ -604,6 +1560,72 @@ def run_local_ping_task(target: str) -> LocalPingResults:
         return {}
 
 
+def start_speedtest_latency_sampler() -> Optional[latency.PhasedLatencySampler]:
+    """Starts probing PING_TARGET and the gateway for the speed test's duration, if enabled."""
+    if not getattr(config, "ENABLE_SPEEDTEST_LATENCY_SAMPLER", False):
+        return None
+    sampler = latency.PhasedLatencySampler(
+        {"wan": config.PING_TARGET, "gw": gateway_host()},
+        interval=getattr(config, "SPEEDTEST_LATENCY_SAMPLE_INTERVAL_SECONDS", 0.1),
+        timeout=getattr(config, "NATIVE_PING_TIMEOUT", 1.0),
+    )
+    sampler.set_phase("idle")
+    sampler.start()
+    return sampler
+
+
+def collect_speedtest_latency_results(
+    summaries: Mapping[tuple[str, str], latency.LatencySummary],
+) -> SpeedResults:
+    """Flattens per-(target, phase) summaries into `speedtest_<target>_<phase>_*` results."""
+    if not summaries:
+        return {}  # Sampler off
+
+    def stat(name: str, phase: str, field: str) -> Optional[float]:
+        summary = summaries.get((name, phase))
+        return None if summary is None else getattr(summary, field)
+
+    return {
+        "speedtest_wan_idle_rtt_p50_ms": stat("wan", "idle", "rtt_p50_ms"),
+        "speedtest_wan_idle_rtt_p95_ms": stat("wan", "idle", "rtt_p95_ms"),
+        "speedtest_wan_idle_loss_percentage": stat("wan", "idle", "loss_percentage"),
+        "speedtest_wan_download_rtt_p50_ms": stat("wan", "download", "rtt_p50_ms"),
+        "speedtest_wan_download_rtt_p95_ms": stat("wan", "download", "rtt_p95_ms"),
+        "speedtest_wan_download_loss_percentage": stat("wan", "download", "loss_percentage"),
+        "speedtest_wan_upload_rtt_p50_ms": stat("wan", "upload", "rtt_p50_ms"),
+        "speedtest_wan_upload_rtt_p95_ms": stat("wan", "upload", "rtt_p95_ms"),
+        "speedtest_wan_upload_loss_percentage": stat("wan", "upload", "loss_percentage"),
+        "speedtest_gw_idle_rtt_p50_ms": stat("gw", "idle", "rtt_p50_ms"),
+        "speedtest_gw_idle_rtt_p95_ms": stat("gw", "idle", "rtt_p95_ms"),
+        "speedtest_gw_idle_loss_percentage": stat("gw", "idle", "loss_percentage"),
+        "speedtest_gw_download_rtt_p50_ms": stat("gw", "download", "rtt_p50_ms"),
+        "speedtest_gw_download_rtt_p95_ms": stat("gw", "download", "rtt_p95_ms"),
+        "speedtest_gw_download_loss_percentage": stat("gw", "download", "loss_percentage"),
+        "speedtest_gw_upload_rtt_p50_ms": stat("gw", "upload", "rtt_p50_ms"),
+        "speedtest_gw_upload_rtt_p95_ms": stat("gw", "upload", "rtt_p95_ms"),
+        "speedtest_gw_upload_loss_percentage": stat("gw", "upload", "loss_percentage"),
+    }
+
+
+def collect_speedtest_progress_results(tracker: ookla.ProgressTracker) -> SpeedResults:
+    """Ramp-up, stability, and per-second series as `local_<phase>_*` results."""
+    download, upload = tracker.series["download"], tracker.series["upload"]
+    return {
+        "local_download_ramp_up_s": download.ramp_up_seconds(),
+        "local_download_stability_cv": download.stability_cv(),
+        "local_download_mbps_series": ookla.format_series(download.mbps),
+        "local_download_latency_series": ookla.format_series(download.latency_ms),
+        "local_upload_ramp_up_s": upload.ramp_up_seconds(),
+        "local_upload_stability_cv": upload.stability_cv(),
+        "local_upload_mbps_series": ookla.format_series(upload.mbps),
+        "local_upload_latency_series": ookla.format_series(upload.latency_ms),
+    }
+
+
+# Where Homebrew installs the Ookla CLI on Apple silicon and Intel Macs.
+SPEEDTEST_PATHS: tuple[str, ...] = ("/opt/homebrew/bin/speedtest", "/usr/local/bin/speedtest")
+
+
 def run_local_speed_test_task() -> Optional[SpeedResults]:
     """
     Runs a local speed test with a retry mechanism, returning numerical
@@ -614,7 +1636,7 @@ def run_local_speed_test_task() -> Optional[SpeedResults]:
     retry_delay_seconds = 10
 
     ookla_path = None
-    possible_paths = ["/opt/homebrew/bin/speedtest", "/usr/local/bin/speedtest"]
+    possible_paths = SPEEDTEST_PATHS
     for path in possible_paths:
         if os.path.exists(path):
             ookla_path = path
@@ -637,20 +1659,20 @@ def run_local_speed_test_task() -> Optional[SpeedResults]:
                 "--accept-gdpr",
                 "--format=json",
             ]
-            process = subprocess.run(
-                command, capture_output=True, text=True, timeout=120, check=True
+            sampler = start_speedtest_latency_sampler()
+            tracker = ookla.ProgressTracker(
+                getattr(config, "SPEEDTEST_STALL_SECONDS", 10.0),
+                on_phase=sampler.set_phase if sampler is not None else None,
             )
+            try:
+                with tracing.span("speedtest", "subprocess", attempt=attempt + 1):
+                    results = ookla.stream_speedtest(
+                        command, tracker, timeout=current_deadline().cap(120)
+                    )
+            finally:
+                if sampler is not None:
+                    sampler.stop()
 
-            json_output = None
-            for line in process.stdout.splitlines():
-                if line.strip().startswith("{"):
-                    json_output = line
-                    break
-
-            if not json_output:
-                raise json.JSONDecodeError("No JSON found in speedtest output", process.stdout, 0)
-
-            results = json.loads(json_output)
             # Check for explicit error messages from the speedtest CLI
             if "error" in results:
                 raise Exception(f"Speedtest CLI returned an error: {results['error']}")
@@ -665,7 +1687,7 @@ def run_local_speed_test_task() -> Optional[SpeedResults]:
             packet_loss = results.get("packetLoss", 0.0)
 
             print("Local speed test complete.")
-            return {
+            speed_results: SpeedResults = {
                 "local_downstream_speed": download_speed,
                 "local_upstream_speed": upload_speed,
                 "local_speedtest_jitter": jitter,
@@ -673,6 +1695,14 @@ def run_local_speed_test_task() -> Optional[SpeedResults]:
                 "local_latency_up_load_ms": latency_up,
                 "local_packet_loss_pct": packet_loss,
             }
+            # Throughput time series, plus self-measured per-phase latency when sampled.
+            speed_results.update(collect_speedtest_progress_results(tracker))
+            speed_results.update(
+                collect_speedtest_latency_results(
+                    sampler.phase_summaries() if sampler is not None else {}
+                )
+            )
+            return speed_results
 
         except subprocess.CalledProcessError as e:
             msg = (
@@ -682,6 +1712,8 @@ def run_local_speed_test_task() -> Optional[SpeedResults]:
             print(msg)
             print(f"Stdout: {e.stdout}")
             print(f"Stderr: {e.stderr}")
+        except ookla.SpeedtestStalled as e:
+            print(f"Warning (Attempt {attempt + 1}/{max_retries}): Speed test stalled. {e}")
         except json.JSONDecodeError as e:
             msg = (
                 f"Warning (Attempt {attempt + 1}/{max_retries}): "
@@ -696,9 +1728,13 @@ def run_local_speed_test_task() -> Optional[SpeedResults]:
             )
             print(msg)
 
+        if current_deadline().expired():
+            print("Cycle deadline reached; not retrying the local speed test.")
+            return None
         if attempt < max_retries - 1:
             print(f"Waiting {retry_delay_seconds} seconds before retrying...")
-            time.sleep(retry_delay_seconds)
+            with tracing.span("speedtest retry delay", "sleep"):
+                time.sleep(current_deadline().cap(retry_delay_seconds))
 
     print("Error: Local speed test failed after multiple attempts.")
     return None
@@ -745,21 +1781,36 @@ def run_lan_bufferbloat_task() -> dict[str, float | None]:
         )
 
         # Give iperf a moment to start before pinging
-        time.sleep(1)
+        time.sleep(current_deadline().cap(1))
 
         # 3. Measure Latency Under Load (for the remaining duration)
         print("Measuring LAN latency under load...")
         ping_duration = max(1, duration - 1)
-        # We use a different ping command here to control duration
-        ping_command = ["ping", "-c", str(ping_duration), "-i", "1", target_ip]
-        under_load_ping_process = subprocess.run(
-            ping_command, capture_output=True, text=True, timeout=duration + 5
-        )
-        under_load_ping_results = parse_local_ping_results(under_load_ping_process.stdout)
+        if use_native_prober():
+            # Sample at the native rate for the same window instead of once per second.
+            interval = getattr(config, "NATIVE_PING_INTERVAL_SECONDS", 0.05)
+            under_load_run = native_ping(
+                target_ip, max(1, int(ping_duration / interval)), interval
+            )
+            under_load_ping_results = summarize_probe_run(under_load_run)
+        else:
+            # We use a different ping command here to control duration
+            ping_command = ["ping", "-c", str(ping_duration), "-i", "1", target_ip]
+            with tracing.span("ping under load", "subprocess", target=target_ip):
+                under_load_ping_process = subprocess.run(
+                    ping_command,
+                    capture_output=True,
+                    text=True,
+                    timeout=current_deadline().cap(duration + 5),
+                )
+            under_load_ping_results = parse_local_ping_results(under_load_ping_process.stdout)
         results["lan_under_load_rtt_ms"] = under_load_ping_results.get("rtt_avg_ms")
+        for key in ("p50", "p95", "p99"):
+            results[f"lan_under_load_rtt_{key}_ms"] = under_load_ping_results.get(f"rtt_{key}_ms")
 
         # 4. Wait for iperf3 to finish
-        iperf_process.wait(timeout=duration + 5)
+        with tracing.span("wait for iperf3", "subprocess"):
+            iperf_process.wait(timeout=current_deadline().cap(duration + 5))
         print("LAN load test finished.")
 
         # 5. Calculate LAN Bufferbloat
@@ -800,7 +1851,9 @@ def run_wifi_diagnostics_task() -> WifiDiagnostics:
     try:
         # `-n` fails fast instead of prompting if passwordless sudo is not configured.
         command = ["sudo", "-n", "wdutil", "info"]
-        process = subprocess.run(command, capture_output=True, text=True, timeout=10, check=True)
+        process = subprocess.run(
+            command, capture_output=True, text=True, timeout=current_deadline().cap(10), check=True
+        )
         output = process.stdout
 
         def find_value(key: str, text: str) -> str:
@@ -834,7 +1887,11 @@ def run_wifi_diagnostics_task() -> WifiDiagnostics:
     try:
         route_command = ["route", "-n", "get", "default"]
         route_process = subprocess.run(
-            route_command, capture_output=True, text=True, timeout=10, check=True
+            route_command,
+            capture_output=True,
+            text=True,
+            timeout=current_deadline().cap(10),
+            check=True,
         )
         gateway_match = re.search(r"^\s*gateway:\s*(\S+)", route_process.stdout, re.MULTILINE)
 
@@ -842,11 +1899,21 @@ def run_wifi_diagnostics_task() -> WifiDiagnostics:
             raise Exception("Could not determine default gateway IP.")
 
         gateway_ip = gateway_match.group(1)
-        ping_command = ["ping", "-c", "1", gateway_ip]
-        subprocess.run(ping_command, capture_output=True, text=True, timeout=10)
+        # One packet to the gateway makes sure its MAC is in the ARP cache.
+        if use_native_prober():
+            native_ping(gateway_ip, 1, 0)
+        else:
+            ping_command = ["ping", "-c", "1", gateway_ip]
+            subprocess.run(
+                ping_command, capture_output=True, text=True, timeout=current_deadline().cap(10)
+            )
         arp_command = ["arp", "-n", gateway_ip]
         arp_process = subprocess.run(
-            arp_command, capture_output=True, text=True, timeout=10, check=True
+            arp_command,
+            capture_output=True,
+            text=True,
+            timeout=current_deadline().cap(10),
+            check=True,
         )
         arp_match = re.search(r"at\s+([0-9a-fA-F:]+)", arp_process.stdout)
 
@@ -871,145 +1938,976 @@ def run_wifi_diagnostics_task() -> WifiDiagnostics:
     return results
 
 
-def perform_checks() -> None:
-    """Main automation function to run all configured tests and log results."""
-    global run_counter, DEVICE_ACCESS_CODE
-    run_counter += 1
+def gateway_host() -> str:
+    """Returns the gateway's host/IP taken from GATEWAY_URL."""
+    return config.GATEWAY_URL.split("//")[-1].split("/")[0]
+
+
+# --- Continuous Latency Stream ---
+latency_stream: Optional[latency.LatencyStream] = None
+
+
+def start_latency_stream() -> None:
+    """Starts background sampling of PING_TARGET and the gateway, if enabled."""
+    global latency_stream
+    if not getattr(config, "ENABLE_LATENCY_STREAM", False) or latency_stream is not None:
+        return
+    interval = getattr(config, "LATENCY_STREAM_INTERVAL_SECONDS", 1.0)
+    capacity = getattr(config, "LATENCY_STREAM_BUFFER_SIZE", 3600)
+    if capacity * interval < config.RUN_INTERVAL_MINUTES * 60:
+        print(
+            f"Warning: LATENCY_STREAM_BUFFER_SIZE holds {capacity * interval:g}s of samples, "
+            "less than RUN_INTERVAL_MINUTES; rows will summarize only the end of each interval."
+        )
+    latency_stream = latency.LatencyStream(
+        {"wan": config.PING_TARGET, "gw": gateway_host()},
+        interval=interval,
+        capacity=capacity,
+        outage_min_losses=getattr(config, "LATENCY_STREAM_OUTAGE_MIN_LOSSES", 3),
+        timeout=min(interval, getattr(config, "NATIVE_PING_TIMEOUT", 1.0)),
+    )
+    latency_stream.start()
+    print(f"Continuous latency sampling started (every {interval:g}s).")
+
+
+def stop_latency_stream() -> None:
+    """Stops background latency sampling."""
+    global latency_stream
+    if latency_stream is not None:
+        latency_stream.stop()
+        latency_stream = None
+
+
+# --- Metrics Exporter (config.METRICS_EXPORTER_PORT) ---
+metrics_registry = metrics.MetricsRegistry()
+_metrics_server: Optional[metrics.MetricsServer] = None
+
+
+def start_metrics_exporter() -> None:
+    """Serves the latest cycle's metrics over HTTP in OpenMetrics format, if enabled."""
+    global _metrics_server
+    port = getattr(config, "METRICS_EXPORTER_PORT", None)
+    if port is None or _metrics_server is not None:
+        return
+    host = getattr(config, "METRICS_EXPORTER_HOST", "127.0.0.1")
+    try:
+        _metrics_server = metrics.MetricsServer(metrics_registry, host, port)
+    except OSError as e:
+        print(f"Could not start the metrics exporter on {host}:{port}: {e}")
+        return
+    _metrics_server.start()
+    print(f"Metrics exporter listening on http://{host}:{_metrics_server.port}/metrics")
+
+
+def stop_metrics_exporter() -> None:
+    """Stops the metrics HTTP endpoint."""
+    global _metrics_server
+    if _metrics_server is not None:
+        _metrics_server.stop()
+        _metrics_server = None
+
+
+def collect_latency_stream_results() -> dict[str, float | int | None]:
+    """Summarizes the stream since the previous cycle as `stream_<target>_*` results."""
+    if latency_stream is None:
+        return {}
+    results: dict[str, float | int | None] = {}
+    for name, summary in latency_stream.snapshot().items():
+        results.update(
+            {
+                f"stream_{name}_loss_percentage": summary.loss_percentage,
+                f"stream_{name}_rtt_min_ms": summary.rtt_min_ms,
+                f"stream_{name}_rtt_avg_ms": summary.rtt_avg_ms,
+                f"stream_{name}_rtt_max_ms": summary.rtt_max_ms,
+                f"stream_{name}_rtt_stddev_ms": summary.rtt_stddev_ms,
+                f"stream_{name}_outages": summary.outages,
+                f"stream_{name}_rtt_p50_ms": summary.rtt_p50_ms,
+                f"stream_{name}_rtt_p95_ms": summary.rtt_p95_ms,
+                f"stream_{name}_rtt_p99_ms": summary.rtt_p99_ms,
+            }
+        )
+    return results
+
+
+def build_chrome_options() -> Options:
+    """Builds the Chrome options used for gateway sessions."""
+    load_lazy_imports("Options")
+    chrome_options = Options()
+    if config.HEADLESS_MODE:
+        chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--window-size=1280,1024")
+    if getattr(config, "ENABLE_CHROME_NO_SANDBOX", False):
+        chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    return chrome_options
+
+
+def establish_gateway_session(driver: WebDriver) -> None:
+    """Loads the main gateway page so later diagnostic pages share its session."""
+    print(f"Navigating to main gateway page to establish session: {config.GATEWAY_URL}")
+    with tracing.span("load gateway main page", "page", url=config.GATEWAY_URL):
+        driver.get(config.GATEWAY_URL)
+        time.sleep(3)  # Wait for main page to load
+
+
+# Result keys each probe fills. A probe that runs out of cycle budget gets TIMED_OUT in
+# all of them instead of silently missing values.
+PROBE_RESULT_KEYS: dict[str, tuple[str, ...]] = {
+    "wifi": tuple(WifiDiagnostics.__annotations__),
+    "local_ping": tuple(f"local_wan_{key}" for key in LocalPingResults.__annotations__),
+    "local_gateway_ping": tuple(f"local_gw_{key}" for key in LocalPingResults.__annotations__),
+    "local_speed": tuple(
+        key for key in SpeedResults.__annotations__ if key.startswith(("local_", "speedtest_"))
+    ),
+    "lan_bufferbloat": ("lan_idle_rtt_ms", "lan_under_load_rtt_ms", "lan_bufferbloat_ms"),
+    "gateway_ping": tuple(GatewayPingResults.__annotations__),
+    "gateway_speed": ("downstream_speed", "upstream_speed"),
+}
+# Probe names usable in config.PROBE_SCHEDULES and perform_checks(probes=...).
+PROBES = tuple(PROBE_RESULT_KEYS)
+# Probes that saturate the link or load the gateway; adaptive cadence never speeds them up.
+EXPENSIVE_PROBES = frozenset({"local_speed", "lan_bufferbloat", "gateway_speed"})
+
+
+def cycle_budget_seconds(interval_seconds: Optional[float]) -> Optional[float]:
+    """CYCLE_DEADLINE_SECONDS if set, else CYCLE_DEADLINE_FRACTION of the job's interval.
+
+    None (both settings unset, or no interval) leaves the run unbounded.
+    """
+    configured = getattr(config, "CYCLE_DEADLINE_SECONDS", None)
+    if configured is not None:
+        return configured
+    fraction = getattr(config, "CYCLE_DEADLINE_FRACTION", None)
+    return None if fraction is None or interval_seconds is None else fraction * interval_seconds
+
+
+def numeric_value(value: object) -> Optional[float]:
+    """Returns value as a float, or None for missing values and markers like TIMED_OUT."""
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+# Full cycle in which each conditional expensive probe last ran.
+expensive_probe_last_run: dict[str, int] = {}
+
+
+def probe_rule_reason(probe: str, results: Mapping[str, object]) -> Optional[str]:
+    """The first CONDITIONAL_PROBE_RULES rule for `probe` that this cycle's results meet."""
+    for key, op, limit in getattr(config, "CONDITIONAL_PROBE_RULES", {}).get(probe, ()):
+        threshold = getattr(config, limit, None) if isinstance(limit, str) else limit
+        value = numeric_value(results.get(key))
+        if value is None or threshold is None:
+            continue
+        if (op == ">" and value > threshold) or (op == "<" and value < threshold):
+            return f"{key} {value:g} {op} {threshold:g}"
+    return None
+
+
+def baseline_runs(probe: str) -> int:
+    """Full cycles after which a conditional probe runs anyway (0: only on its rules)."""
+    return getattr(config, "CONDITIONAL_PROBE_BASELINE_RUNS", {}).get(probe, 0)
+
+
+def should_run_expensive_probe(probe: str, results: Mapping[str, object]) -> bool:
+    """Rule layer for conditional mode: run if a cheap result calls for it or a baseline is due."""
+    reason = probe_rule_reason(probe, results)
+    every = baseline_runs(probe)
+    last = expensive_probe_last_run.get(probe)
+    if reason is None and every > 0 and (last is None or run_counter - last >= every):
+        reason = f"baseline, every {every} cycles"
+    if reason is None:
+        print(f"Skipping {probe}: no rule fired on this cycle's cheap results.")
+        return False
+    print(f"Running {probe} ({reason}).")
+    return True
+
+
+# --- Circuit Breakers (config.ENABLE_CIRCUIT_BREAKER) ---
+probe_breakers: dict[str, breaker.CircuitBreaker] = {}
+# Transitions since the last logged row, written to its Breaker_Transitions column.
+breaker_transitions: list[str] = []
+
+
+def log_breaker_transition(probe: str, previous: str, state: str, reason: str) -> None:
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] Circuit breaker for {probe}: {previous} -> {state} ({reason}).")
+    breaker_transitions.append(f"{probe} {previous}->{state} ({reason})")
+
+
+def get_probe_breaker(probe: str) -> Optional[breaker.CircuitBreaker]:
+    """The probe's circuit breaker, created on first use (None when breakers are off)."""
+    if not getattr(config, "ENABLE_CIRCUIT_BREAKER", False):
+        return None
+    if probe not in probe_breakers:
+        probe_breakers[probe] = breaker.CircuitBreaker(
+            probe,
+            failure_threshold=getattr(config, "CIRCUIT_BREAKER_FAILURES", 3),
+            base_cooldown=getattr(config, "CIRCUIT_BREAKER_BASE_COOLDOWN_SECONDS", 300),
+            max_cooldown=getattr(config, "CIRCUIT_BREAKER_MAX_COOLDOWN_SECONDS", 3600),
+            on_transition=log_breaker_transition,
+        )
+    return probe_breakers[probe]
+
+
+def record_probe_history(name: str, usage: probehistory.ProbeUsage, failed: bool) -> None:
+    """Appends a probe or cycle run to PROBE_HISTORY_FILE, warning on a regression."""
+    history = get_probe_history()
+    if history is None:
+        return
+    try:
+        regression = history.record(name, usage, failed)
+    except OSError as e:
+        print(f"Could not write probe history to {history.path}: {e}")
+    else:
+        if regression:
+            print(f"Warning: {regression}.")
+
+
+def record_probe_outcome(
+    probe: str, usage: Optional[probehistory.ProbeUsage], failed: bool
+) -> None:
+    """Reports a finished (or failed to start) probe to the metrics, history and breaker."""
+    metrics_registry.record_probe(
+        probe, usage.wall_seconds if usage is not None else None, failed=failed
+    )
+    if usage is not None:
+        record_probe_history(probe, usage, failed)
+    probe_breaker = get_probe_breaker(probe)
+    if probe_breaker is not None:
+        probe_breaker.record(not failed)
+
+
+def export_cycle_trace(started_at: str, probes: Optional[Iterable[str]] = None) -> None:
+    """Ends the cycle's trace and writes it to TRACE_DIR as trace-<start time>.json."""
+    tracer = tracing.finish()
+    if tracer is None:
+        return
+    stamp = datetime.strptime(started_at, "%Y-%m-%d %H:%M:%S").strftime("%Y%m%d-%H%M%S")
+    suffix = f"-{'+'.join(sorted(probes))}" if probes else ""
+    path = os.path.join(config.TRACE_DIR, f"trace-{stamp}{suffix}.json")
+    try:
+        os.makedirs(config.TRACE_DIR, exist_ok=True)
+        tracer.export(path)
+    except OSError as e:
+        print(f"Warning: Could not write cycle trace to {path}: {e}")
+
+
+def probe_schedules() -> dict[str, float | str]:
+    """Per-probe cadences from config.PROBE_SCHEDULES, ignoring unknown probe names."""
+    schedules: dict[str, float | str] = {}
+    for probe, cadence in getattr(config, "PROBE_SCHEDULES", {}).items():
+        if probe in PROBES:
+            schedules[probe] = cadence
+        else:
+            print(f"Warning: Ignoring schedule for unknown probe '{probe}'.")
+    return schedules
+
+
+class CycleSummary(TypedDict):
+    """What one perform_checks run logged and how it went."""
+
+    row: dict[str, str | float | int | None]
+    anomalies: list[str]
+    failed_probes: list[str]
+
+
+def perform_checks(
+    probes: Optional[Iterable[str]] = None, budget_seconds: Optional[float] = None
+) -> CycleSummary:
+    """Main automation function to run all configured tests and log results.
+
+    Independent probes run concurrently when ENABLE_CONCURRENT_PROBES is set; speed tests
+    and the iperf3 load are exclusive and never overlap another measurement.
+
+    `probes` limits the run to those probe names (still subject to their RUN_* toggles);
+    by default a full cycle runs every probe that has no cadence of its own.
+    `budget_seconds` bounds the whole run (see cycle_budget_seconds for the default);
+    probes still running when it is spent are abandoned and logged as TIMED_OUT.
+    Returns the logged row, the columns over their thresholds, and the probes that failed.
+    """
+    global run_counter, DEVICE_ACCESS_CODE, cycle_deadline
+    full_cycle = probes is None
+    selected = set(PROBES) - set(probe_schedules()) if probes is None else set(probes)
     master_results: dict[str, str | float | int | None] = {}
     debug_log = DebugLogger(start_time=time.time())
     debug_log.log("perform_checks: START")
-    print(
-        f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] "
-        f"Starting checks (Run #{run_counter})..."
-    )
-
-    # --- Run Local Tests (No Browser Required) ---
-    if getattr(config, "RUN_WIFI_DIAGNOSTICS_TEST", False):
-        debug_log.log("run_wifi_diagnostics_task: START")
-        wifi_results = run_wifi_diagnostics_task()
-        debug_log.log("run_wifi_diagnostics_task: END")
-        if wifi_results:
-            master_results.update(wifi_results)
-
-    if config.RUN_LOCAL_PING_TEST:
-        debug_log.log("run_local_ping_task (WAN): START")
-        wan_ping_results = run_local_ping_task(config.PING_TARGET)
-        debug_log.log("run_local_ping_task (WAN): END")
-        master_results.update({f"local_wan_{k}": v for k, v in wan_ping_results.items()})
-    if config.RUN_LOCAL_GATEWAY_PING_TEST:
-        debug_log.log("run_local_ping_task (Gateway): START")
-        gateway_ip = config.GATEWAY_URL.split("//")[-1].split("/")[0]
-        gw_ping_results = run_local_ping_task(gateway_ip)
-        debug_log.log("run_local_ping_task (Gateway): END")
-        master_results.update({f"local_gw_{k}": v for k, v in gw_ping_results.items()})
-    if config.RUN_LOCAL_SPEED_TEST:
-        debug_log.log("run_local_speed_test_task: START")
-        local_speed_results = run_local_speed_test_task()
-        debug_log.log("run_local_speed_test_task: END")
-        if local_speed_results:
-            master_results.update(local_speed_results)
-    if getattr(config, "RUN_LAN_BUFFERBLOAT_TEST", False):
-        debug_log.log("run_lan_bufferbloat_task: START")
-        lan_bloat_results = run_lan_bufferbloat_task()
-        debug_log.log("run_lan_bufferbloat_task: END")
-        if lan_bloat_results:
-            master_results.update(lan_bloat_results)
-
-    # --- Run Gateway Tests (Selenium Required) in a single session ---
-    should_run_gateway_speed_test = (
-        config.RUN_GATEWAY_SPEED_TEST_INTERVAL > 0
-        and run_counter % config.RUN_GATEWAY_SPEED_TEST_INTERVAL == 0
-    )
-
-    should_run_gateway_ping_test = getattr(config, "RUN_GATEWAY_PING_TEST", True)
-
-    if should_run_gateway_ping_test or should_run_gateway_speed_test:
+    if getattr(config, "TRACE_DIR", None):
+        tracing.start()
+    # Peak RSS comes from the probes' samples; see ProbeExecutor.
+    cycle_usage = probehistory.UsageMeter()
+    cycle_usage.start()
+    started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if full_cycle:
+        run_counter += 1
+        print(f"\n[{started_at}] Starting checks (Run #{run_counter})...")
+    else:
+        print(f"\n[{started_at}] Starting scheduled checks: {', '.join(sorted(selected))}...")
+
+    try:
+        # Probes skipped because their circuit breaker is open.
+        skipped: set[str] = set()
+
+        def breaker_allows(probe: str) -> bool:
+            """False, noting the probe as skipped, while its circuit breaker is open.
+
+            Call it only where the probe is submitted: once a cooldown has elapsed this
+            starts the half-open trial, which the probe's outcome then resolves.
+            """
+            probe_breaker = get_probe_breaker(probe)
+            if probe_breaker is None or probe_breaker.allow():
+                return True
+            skipped.add(probe)
+            return False
+
+        def breaker_blocks(probe: str) -> bool:
+            """Like `not breaker_allows(probe)`, but leaves an elapsed cooldown for later."""
+            probe_breaker = get_probe_breaker(probe)
+            if probe_breaker is None or not probe_breaker.blocking():
+                return False
+            skipped.add(probe)
+            return True
+
+        # In conditional mode, expensive probes run only when the rule layer calls for them.
+        conditional = full_cycle and getattr(config, "ENABLE_CONDITIONAL_PROBES", False)
+        should_run_gateway_speed_test = (
+            "gateway_speed" in selected
+            and (
+                not full_cycle
+                or (
+                    config.RUN_GATEWAY_SPEED_TEST_INTERVAL > 0
+                    and (conditional or run_counter % config.RUN_GATEWAY_SPEED_TEST_INTERVAL == 0)
+                )
+            )
+            # Decides whether to start Chrome for it; the breaker is asked on submission.
+            and not breaker_blocks("gateway_speed")
+        )
+        should_run_gateway_ping_test = (
+            "gateway_ping" in selected
+            and getattr(config, "RUN_GATEWAY_PING_TEST", True)
+            and breaker_allows("gateway_ping")
+        )
+        # Prompt on the main thread before any probe starts.
         if should_run_gateway_speed_test and not DEVICE_ACCESS_CODE:
             DEVICE_ACCESS_CODE = get_access_code()
 
-        chrome_options = Options()
-        if config.HEADLESS_MODE:
-            chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--window-size=1280,1024")
-        if getattr(config, "ENABLE_CHROME_NO_SANDBOX", False):
-            chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-
-        with managed_webdriver_session(chrome_options, debug_log) as driver:
-            if driver:
-                # --- Establish session on the main page FIRST ---
-                print(
-                    f"Navigating to main gateway page to establish session: {config.GATEWAY_URL}"
+        # The budget starts after the prompt so typing the access code does not use it up.
+        if budget_seconds is None:
+            budget_seconds = cycle_budget_seconds(
+                config.RUN_INTERVAL_MINUTES * 60 if full_cycle else None
+            )
+        cycle_deadline = Deadline(budget_seconds)
+        timed_out: set[str] = set()
+        failed: set[str] = set()
+
+        max_workers = (
+            getattr(config, "MAX_CONCURRENT_PROBES", 4)
+            if getattr(config, "ENABLE_CONCURRENT_PROBES", False)
+            else 1
+        )
+        # Sessions close only after the executor has drained every probe.
+        measure_usage = bool(getattr(config, "PROBE_HISTORY_FILE", None))
+        with (
+            ExitStack() as sessions,
+            ProbeExecutor(debug_log, max_workers, measure_usage) as executor,
+        ):
+
+            def collect(probe: str, future: Future[T]) -> Optional[T]:
+                """Waits for a probe within the budget, noting it if it ran out of time."""
+                result = executor.result(future, cycle_deadline.wait_timeout())
+                if not result and (future in executor.abandoned or cycle_deadline.expired()):
+                    timed_out.add(probe)
+                record_probe_outcome(probe, executor.usage_of(future), failed=not result)
+                if conditional and probe in EXPENSIVE_PROBES:
+                    expensive_probe_last_run[probe] = run_counter
+                if not result:
+                    failed.add(probe)
+                return result
+
+            # --- Local Tests (No Browser Required) ---
+            # Each entry is (probe name, result key prefix, future).
+            local_futures: list[tuple[str, str, Future[Any]]] = []
+
+            def merge_local_results() -> None:
+                """Waits for the local probes submitted so far and merges their results."""
+                for probe, prefix, future in local_futures:
+                    task_results = collect(probe, future)
+                    if task_results:
+                        master_results.update({f"{prefix}{k}": v for k, v in task_results.items()})
+                local_futures.clear()
+
+            if (
+                "wifi" in selected
+                and getattr(config, "RUN_WIFI_DIAGNOSTICS_TEST", False)
+                and breaker_allows("wifi")
+            ):
+                local_futures.append(
+                    (
+                        "wifi",
+                        "",
+                        executor.submit("run_wifi_diagnostics_task", run_wifi_diagnostics_task),
+                    )
+                )
+            if (
+                "local_ping" in selected
+                and config.RUN_LOCAL_PING_TEST
+                and breaker_allows("local_ping")
+            ):
+                local_futures.append(
+                    (
+                        "local_ping",
+                        "local_wan_",
+                        executor.submit(
+                            "run_local_ping_task (WAN)", run_local_ping_task, config.PING_TARGET
+                        ),
+                    )
+                )
+            if (
+                "local_gateway_ping" in selected
+                and config.RUN_LOCAL_GATEWAY_PING_TEST
+                and breaker_allows("local_gateway_ping")
+            ):
+                gateway_ip = gateway_host()
+                local_futures.append(
+                    (
+                        "local_gateway_ping",
+                        "local_gw_",
+                        executor.submit(
+                            "run_local_ping_task (Gateway)", run_local_ping_task, gateway_ip
+                        ),
+                    )
                 )
-                driver.get(config.GATEWAY_URL)
-                time.sleep(3)  # Wait for main page to load
 
-                if should_run_gateway_ping_test:
-                    debug_log.log("run_ping_test_task: START")
-                    master_results.update(run_ping_test_task(driver) or {})
-                    debug_log.log("run_ping_test_task: END")
-
-                # --- Task 2: Gateway Speed Test ---
-                if should_run_gateway_speed_test:
-                    debug_log.log("run_speed_test_task: START")
-                    master_results.update(run_speed_test_task(driver, DEVICE_ACCESS_CODE) or {})
-                    debug_log.log("run_speed_test_task: END")
-            else:
-                print("Skipping gateway tests because WebDriver session failed to start.")
+            # --- Chrome starts alongside the pings; it does not touch the link ---
+            use_http_backend = getattr(config, "GATEWAY_BACKEND", "selenium") == "http"
+            reuse_driver = getattr(config, "REUSE_WEBDRIVER_SESSION", False)
+            driver_future: Optional[Future[Optional[WebDriver]]] = None
+            if (
+                should_run_gateway_ping_test or should_run_gateway_speed_test
+            ) and not use_http_backend:
+                session_factory = (
+                    persistent_webdriver_session if reuse_driver else managed_webdriver_session
+                )
+                driver_session = BackgroundSession(
+                    session_factory(build_chrome_options(), debug_log)
+                )
+                sessions.callback(driver_session.close)
+                driver_future = executor.submit(
+                    session_factory.__name__, driver_session.open, kind="local"
+                )
 
-    # --- Bufferbloat calculation (download/upload deltas relative to idle WAN RTT) ---
-    idle_latency = master_results.get("local_wan_rtt_avg_ms")
-    down_latency = master_results.get("local_latency_down_load_ms")
-    up_latency = master_results.get("local_latency_up_load_ms")
+            if conditional:
+                # The rules below need this cycle's ping results.
+                merge_local_results()
+            if (
+                "local_speed" in selected
+                and config.RUN_LOCAL_SPEED_TEST
+                and (not conditional or should_run_expensive_probe("local_speed", master_results))
+                and breaker_allows("local_speed")
+            ):
+                local_futures.append(
+                    (
+                        "local_speed",
+                        "",
+                        executor.submit(
+                            "run_local_speed_test_task",
+                            run_local_speed_test_task,
+                            kind="exclusive",
+                        ),
+                    )
+                )
+            if (
+                "lan_bufferbloat" in selected
+                and getattr(config, "RUN_LAN_BUFFERBLOAT_TEST", False)
+                and (
+                    not conditional
+                    or should_run_expensive_probe("lan_bufferbloat", master_results)
+                )
+                and breaker_allows("lan_bufferbloat")
+            ):
+                local_futures.append(
+                    (
+                        "lan_bufferbloat",
+                        "",
+                        executor.submit(
+                            "run_lan_bufferbloat_task", run_lan_bufferbloat_task, kind="exclusive"
+                        ),
+                    )
+                )
 
-    master_results["download_bufferbloat_ms"] = (
-        (down_latency - idle_latency)
-        if (idle_latency is not None and down_latency is not None)
-        else None
-    )
-    master_results["upload_bufferbloat_ms"] = (
-        (up_latency - idle_latency)
-        if (idle_latency is not None and up_latency is not None)
-        else None
-    )
+            # --- Gateway Tests (Selenium Required) in a single session ---
+            gateway_results: dict[str, str | float | int | None] = {}
+
+            def gateway_speed_wanted() -> bool:
+                """Rule layer (in conditional mode), then the breaker, just before submission."""
+                if conditional:
+                    merge_local_results()  # Includes this cycle's local speed test, if it ran
+                    if not should_run_expensive_probe("gateway_speed", master_results):
+                        return False
+                return breaker_allows("gateway_speed")
+
+            if use_http_backend:
+                if should_run_gateway_ping_test:
+                    gateway_results.update(
+                        collect(
+                            "gateway_ping",
+                            executor.submit(
+                                "run_http_ping_test_task",
+                                run_http_ping_test_task,
+                                DEVICE_ACCESS_CODE,
+                            ),
+                        )
+                        or {}
+                    )
+                if should_run_gateway_speed_test and gateway_speed_wanted():
+                    gateway_results.update(
+                        collect(
+                            "gateway_speed",
+                            executor.submit(
+                                "run_http_speed_test_task",
+                                run_http_speed_test_task,
+                                DEVICE_ACCESS_CODE,
+                                kind="exclusive",
+                            ),
+                        )
+                        or {}
+                    )
+            elif driver_future is not None:
+                driver = executor.result(driver_future, cycle_deadline.wait_timeout())
+                if driver:
+                    if not reuse_driver:
+                        executor.run(
+                            "establish_gateway_session",
+                            establish_gateway_session,
+                            driver,
+                            kind="local",
+                            timeout=cycle_deadline.wait_timeout(),
+                        )
+                    if should_run_gateway_ping_test:
+                        gateway_results.update(
+                            collect(
+                                "gateway_ping",
+                                executor.submit("run_ping_test_task", run_ping_test_task, driver),
+                            )
+                            or {}
+                        )
+                    if should_run_gateway_speed_test and gateway_speed_wanted():
+                        gateway_results.update(
+                            collect(
+                                "gateway_speed",
+                                executor.submit(
+                                    "run_speed_test_task",
+                                    run_speed_test_task,
+                                    driver,
+                                    DEVICE_ACCESS_CODE,
+                                    kind="exclusive",
+                                ),
+                            )
+                            or {}
+                        )
+                else:
+                    print("Skipping gateway tests because WebDriver session failed to start.")
+                    for probe, wanted in (
+                        ("gateway_ping", should_run_gateway_ping_test),
+                        (
+                            "gateway_speed",
+                            should_run_gateway_speed_test and breaker_allows("gateway_speed"),
+                        ),
+                    ):
+                        if wanted:
+                            record_probe_outcome(probe, None, failed=True)
+                            failed.add(probe)
+                    if cycle_deadline.expired():
+                        if should_run_gateway_ping_test:
+                            timed_out.add("gateway_ping")
+                        if should_run_gateway_speed_test:
+                            timed_out.add("gateway_speed")
+
+            merge_local_results()
+            master_results.update(gateway_results)
+
+        if executor.abandoned and reuse_driver and not use_http_backend:
+            # A straggler may still be driving the warm browser; start fresh next cycle.
+            persistent_webdriver.close(debug_log)
+        for probe in sorted(timed_out):
+            print(
+                f"Warning: {probe} ran out of cycle budget; its values are logged as {TIMED_OUT}."
+            )
+            master_results.update(dict.fromkeys(PROBE_RESULT_KEYS[probe], TIMED_OUT))
+        for probe in sorted(skipped):
+            print(
+                f"Skipping {probe}: its circuit breaker is open; values are logged as {SKIPPED}."
+            )
+            master_results.update(dict.fromkeys(PROBE_RESULT_KEYS[probe], SKIPPED))
+        cycle_deadline = Deadline()
+
+        if full_cycle:
+            # The stream summary covers the interval between full check cycles.
+            master_results.update(collect_latency_stream_results())
+
+        # --- Bufferbloat calculation (download/upload deltas relative to idle WAN RTT) ---
+        if master_results.get("speedtest_wan_idle_rtt_p50_ms") is not None:
+            # Idle and loaded medians sampled during the same speed test run.
+            idle_latency = numeric_value(master_results.get("speedtest_wan_idle_rtt_p50_ms"))
+            down_latency = numeric_value(master_results.get("speedtest_wan_download_rtt_p50_ms"))
+            up_latency = numeric_value(master_results.get("speedtest_wan_upload_rtt_p50_ms"))
+        else:
+            idle_latency = numeric_value(master_results.get("local_wan_rtt_avg_ms"))
+            down_latency = numeric_value(master_results.get("local_latency_down_load_ms"))
+            up_latency = numeric_value(master_results.get("local_latency_up_load_ms"))
+
+        master_results["download_bufferbloat_ms"] = (
+            (down_latency - idle_latency)
+            if (idle_latency is not None and down_latency is not None)
+            else None
+        )
+        master_results["upload_bufferbloat_ms"] = (
+            (up_latency - idle_latency)
+            if (idle_latency is not None and up_latency is not None)
+            else None
+        )
 
-    debug_log.log("perform_checks: END")
-    log_results(master_results)
+        if breaker_transitions:
+            master_results["breaker_transitions"] = " | ".join(breaker_transitions)
+            breaker_transitions.clear()
+
+        debug_log.log("perform_checks: END")
+        usage = cycle_usage.stop()
+        peaks = [u.peak_rss_mb for u in executor.usage.values() if u.peak_rss_mb is not None]
+        usage.peak_rss_mb = max(peaks, default=None)
+        record_probe_history(
+            "cycle" if full_cycle else f"cycle ({'+'.join(sorted(selected))})",
+            usage,
+            failed=bool(failed),
+        )
+        with tracing.span("log_results", "sink"):
+            row = log_results(master_results)
+        anomalies = thresholds.find_anomalies(row)
+        if adaptive_cadence is not None:
+            adaptive_cadence.observe(anomalies)
+    finally:
+        # Also closes the trace of a cycle that raised, so the next one starts clean.
+        export_cycle_trace(started_at, None if full_cycle else selected)
     print("\n" + "=" * 60 + "\n")
+    return {"row": row, "anomalies": anomalies, "failed_probes": sorted(failed)}
 
 
 # --- Scheduler ---
+adaptive_cadence: Optional[scheduler.AdaptiveCadence] = None
+
+
+def build_adaptive_cadence(sched: scheduler.Scheduler) -> Optional[scheduler.AdaptiveCadence]:
+    """Fast cheap-probe job for anomalies, per the ADAPTIVE_* settings (None when off)."""
+    if not getattr(config, "ENABLE_ADAPTIVE_CADENCE", False):
+        return None
+    probes = []
+    for probe in getattr(config, "ADAPTIVE_PROBES", ("local_ping", "local_gateway_ping")):
+        if probe not in PROBES or probe in EXPENSIVE_PROBES:
+            print(f"Warning: '{probe}' cannot run on the adaptive cadence; ignoring it.")
+        else:
+            probes.append(probe)
+    if not probes:
+        return None
+    interval = float(getattr(config, "ADAPTIVE_FAST_INTERVAL_SECONDS", 30))
+    return scheduler.AdaptiveCadence(
+        sched,
+        "adaptive",
+        functools.partial(
+            perform_checks, probes=tuple(probes), budget_seconds=cycle_budget_seconds(interval)
+        ),
+        fast_interval=interval,
+        hold_seconds=getattr(config, "ADAPTIVE_HOLD_MINUTES", 15) * 60,
+    )
+
+
+def build_scheduler() -> scheduler.Scheduler:
+    """Schedules the full check cycle plus any per-probe cadences from PROBE_SCHEDULES."""
+    global adaptive_cadence
+    sched = scheduler.Scheduler()
+    adaptive_cadence = build_adaptive_cadence(sched)
+    overrun = getattr(config, "SCHEDULER_OVERRUN_POLICY", "skip")
+    # Full cycles fall on wall-clock multiples of the interval, like the start of a minute.
+    sched.every(config.RUN_INTERVAL_MINUTES * 60, "checks", perform_checks, overrun, align=True)
+    for probe, cadence in probe_schedules().items():
+        interval = None if isinstance(cadence, str) else float(cadence)
+        run_probe = functools.partial(
+            perform_checks, probes=(probe,), budget_seconds=cycle_budget_seconds(interval)
+        )
+        if interval is None:
+            sched.daily(str(cadence), probe, run_probe)
+        else:
+            sched.every(interval, probe, run_probe, overrun, run_now=True)
+    return sched
+
+
 def main() -> None:
     """Sets up the schedule and runs the main application loop."""
     print("--- Simple Gateway Logger Starting ---")
 
-    # 1. Schedule the job to run every X minutes at the start of the minute.
-    #    This ensures a consistent, fixed-rate interval.
-    schedule.every(config.RUN_INTERVAL_MINUTES).minutes.at(":00").do(perform_checks)
+    # 1. Build the timer heap: full cycles every RUN_INTERVAL_MINUTES, plus per-probe jobs.
+    sched = build_scheduler()
 
-    # 2. Manually run the job once immediately at startup.
-    perform_checks()
+    # Turn SIGTERM (e.g. from launchd or systemd) into a normal exit so teardown runs.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
 
-    last_printed_next_run: Optional[datetime] = None
+    try:
+        start_latency_stream()
+        start_metrics_exporter()
 
-    # 3. Start the main loop to handle all subsequent scheduled runs.
-    while True:
-        schedule.run_pending()
+        # 2. Manually run the full cycle once immediately at startup.
+        perform_checks()
 
-        # Check the scheduler's next run time and print it if it has changed.
-        # This ensures the printed time is always the correct, future-scheduled time.
-        current_next_run = schedule.next_run()
-        if current_next_run and current_next_run != last_printed_next_run:
-            print(f"Next test is scheduled for: {current_next_run.strftime('%Y-%m-%d %H:%M:%S')}")
-            last_printed_next_run = current_next_run
+        last_printed_next_run: Optional[str] = None
 
-        time.sleep(1)
+        # 3. Sleep until the next job is due, run it, repeat.
+        while True:
+            sched.run_pending()
 
+            # Print the next full cycle time whenever it changes.
+            next_run = sched.next_run("checks")
+            current_next_run = next_run.strftime("%Y-%m-%d %H:%M:%S") if next_run else None
+            if current_next_run and current_next_run != last_printed_next_run:
+                print(f"Next test is scheduled for: {current_next_run}")
+                last_printed_next_run = current_next_run
+
+            sched.wait()
+    finally:
+        shutdown()
+
+
+def shutdown() -> None:
+    """Releases the browser, connections, background threads and open logs."""
+    # A warm browser must not outlive the logger.
+    persistent_webdriver.close()
+    close_gateway_http_client()
+    stop_latency_stream()
+    stop_metrics_exporter()
+    close_result_store()
+    close_binary_log()
+    close_probe_history()
+    close_csv_sink()
+
+
+# --- Startup Profile (`main.py startup`) ---
+# Run in a fresh interpreter so the import is measured cold, as a cron job pays it.
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+print(json.dumps({
+    "import_seconds": time.perf_counter() - started,
+    "preloaded": sorted({m for m, _ in main.LAZY_IMPORTS.values() if m in sys.modules}),
+}))
+"""
+
+
+def run_startup_profile() -> int:
+    """Reports interpreter startup plus import time, then runs and times one check cycle."""
+    started = time.perf_counter()
+    probe = subprocess.run(
+        [sys.executable, "-c", STARTUP_PROBE],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    process_seconds = time.perf_counter() - started
+    if probe.returncode != 0:
+        print(f"Error: Could not import main in a fresh interpreter: {probe.stderr.strip()}")
+        return 1
+    measured = json.loads(probe.stdout.splitlines()[-1])
+    if measured["preloaded"]:
+        print(f"Warning: {', '.join(measured['preloaded'])} loaded at import, not on first use.")
+
+    started = time.perf_counter()
+    try:
+        perform_checks()
+    finally:
+        shutdown()
+    cycle_seconds = time.perf_counter() - started
+
+    deferred = ", ".join(f"{name} {sec:.3f} s" for name, sec in lazy_import_seconds.items())
+    print("--- Startup Profile Results ---")
+    print(f"  Interpreter + import:     {process_seconds:.3f} s")
+    print(f"  Import main:              {measured['import_seconds']:.3f} s")
+    print(f"  First cycle:              {cycle_seconds:.3f} s")
+    print(f"  Deferred imports:         {deferred or 'none needed'}")
+    return 0
+
+
+# --- One-Shot Runs (`main.py run-once`) ---
+# Exit statuses for external schedulers. argparse already exits with 2 on a usage error and
+# Python with 1 on an uncaught exception, so neither is used here.
+EXIT_OK = 0
+EXIT_PROBE_FAILED = 3
+EXIT_ERROR = 4
+EXIT_ANOMALY = 10
+# Config toggle behind each probe, switched on for probes picked with --probe.
+PROBE_TOGGLES: dict[str, str] = {
+    "wifi": "RUN_WIFI_DIAGNOSTICS_TEST",
+    "local_ping": "RUN_LOCAL_PING_TEST",
+    "local_gateway_ping": "RUN_LOCAL_GATEWAY_PING_TEST",
+    "local_speed": "RUN_LOCAL_SPEED_TEST",
+    "lan_bufferbloat": "RUN_LAN_BUFFERBLOAT_TEST",
+    "gateway_ping": "RUN_GATEWAY_PING_TEST",
+}
+# Config flag behind each --sink; "json" prints the row to stdout instead.
+SINK_FLAGS: dict[str, str] = {
+    "csv": "ENABLE_CSV_LOG",
+    "sqlite": "ENABLE_SQLITE_STORE",
+    "binary": "ENABLE_BINARY_LOG",
+}
+SINKS = (*SINK_FLAGS, "json")
+
+
+@contextmanager
+def config_overrides(values: Mapping[str, object]) -> Generator[None, None, None]:
+    """Sets config attributes for the duration of the block, then restores them."""
+    missing = object()
+    previous = {name: getattr(config, name, missing) for name in values}
+    for name, value in values.items():
+        setattr(config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is missing:
+                delattr(config, name)
+            else:
+                setattr(config, name, value)
+
+
+def restore_run_state(state: Mapping[str, Any]) -> None:
+    """Seeds the gateway cookies and run counters from a saved state."""
+    global run_counter
+    saved_gateway_cookies.update(state.get("gateway_cookies", {}))
+    run_counter = state.get("run_counter", run_counter)
+    expensive_probe_last_run.update(state.get("expensive_probe_last_run", {}))
 
-if __name__ == "__main__":
-    if getattr(config, "ENABLE_DEBUG_LOGGING", False):
-        logging.basicConfig()
-        schedule_logger = logging.getLogger("schedule")
-        schedule_logger.setLevel(level=logging.DEBUG)
 
+def capture_run_state(state: dict[str, Any]) -> dict[str, Any]:
+    """
+    Updates a saved state with this run's cookies and run counters. The access code is
+    never saved (it belongs in .env), and one left by an older version is dropped.
+    """
+    state.pop("access_code", None)
+    if _gateway_http_client is not None:
+        state["gateway_cookies"] = dict(_gateway_http_client.cookies)
+    state["run_counter"] = run_counter
+    state["expensive_probe_last_run"] = dict(expensive_probe_last_run)
+    return state
+
+
+def add_run_once_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the `run-once` options to its subcommand parser."""
+    parser.add_argument(
+        "--probe",
+        dest="probes",
+        action="append",
+        choices=PROBES,
+        help="Run only this probe, even if its RUN_* toggle is off (repeatable). "
+        "By default the same full cycle as the resident loop runs.",
+    )
+    parser.add_argument(
+        "--sink",
+        dest="sinks",
+        action="append",
+        choices=SINKS,
+        help="Write the row only here (repeatable); json prints it to stdout and moves "
+        "the console summary to stderr. By default the configured sinks are used.",
+    )
+    parser.add_argument(
+        "--state-file",
+        default=getattr(config, "RUN_ONCE_STATE_FILE", None),
+        help="JSON file (mode 0600) that carries the gateway session cookies and run "
+        "counters between runs (default: config.RUN_ONCE_STATE_FILE).",
+    )
+    parser.add_argument(
+        "--no-state", action="store_true", help="Neither read nor write the state file."
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        metavar="SECONDS",
+        help="Time budget for the run (default: CYCLE_DEADLINE_SECONDS, else none).",
+    )
+
+
+def run_once(args: argparse.Namespace) -> int:
+    """
+    Runs one check cycle for an external scheduler and returns its exit status: EXIT_OK,
+    EXIT_ANOMALY when a result crossed its threshold, EXIT_PROBE_FAILED, or EXIT_ERROR when
+    the cycle itself failed (e.g. no terminal to prompt for the access code).
+    """
+    state_path = None if args.no_state else args.state_file
+    state = statefile.load(state_path) if state_path else {}
+    restore_run_state(state)
+
+    overrides: dict[str, object] = {
+        PROBE_TOGGLES[p]: True for p in args.probes or () if p in PROBE_TOGGLES
+    }
+    if args.sinks:
+        overrides.update({flag: sink in args.sinks for sink, flag in SINK_FLAGS.items()})
+    json_output = args.sinks is not None and "json" in args.sinks
+
+    with ExitStack() as stack:
+        stack.enter_context(config_overrides(overrides))
+        if json_output:
+            # Keep stdout for the JSON row; the console summary goes to stderr.
+            stack.enter_context(redirect_stdout(sys.stderr))
+        try:
+            summary = perform_checks(probes=args.probes, budget_seconds=args.budget)
+        except Exception as e:
+            print(f"Error: Check cycle failed: {type(e).__name__}: {e}", file=sys.stderr)
+            return EXIT_ERROR
+        finally:
+            if state_path:
+                try:
+                    statefile.save(state_path, capture_run_state(state))
+                except OSError as e:
+                    print(f"Warning: Could not write state file {state_path}: {e}")
+            shutdown()
+
+    if json_output:
+        row = {**summary["row"], "Anomalies": summary["anomalies"]}
+        print(json.dumps({**row, "Failed_Probes": summary["failed_probes"]}))
+    if summary["failed_probes"]:
+        print(f"Failed probes: {', '.join(summary['failed_probes'])}", file=sys.stderr)
+        return EXIT_PROBE_FAILED
+    if summary["anomalies"]:
+        print(f"Over threshold: {', '.join(summary['anomalies'])}", file=sys.stderr)
+        return EXIT_ANOMALY
+    return EXIT_OK
+
+
+def cli(argv: Optional[list[str]] = None) -> int:
+    """
+    Parses the command line: no subcommand runs the logger; `run-once` runs one cycle for
+    an external scheduler, `report` queries the log and `startup` profiles startup time.
+    """
+    parser = argparse.ArgumentParser(description="Simple Gateway Logger")
+    subcommands = parser.add_subparsers(dest="command")
+    report.add_arguments(
+        subcommands.add_parser(
+            "report",
+            aliases=["query"],
+            help="Summarize the results log per time bucket without loading it into memory.",
+        )
+    )
+    subcommands.add_parser("startup", help="Time a cold import and one check cycle, then exit.")
+    add_run_once_arguments(
+        subcommands.add_parser(
+            "run-once",
+            help="Run one check cycle and exit with a status reflecting anomalies and failures.",
+        )
+    )
+    args = parser.parse_args(argv)
+    if args.command in ("report", "query"):
+        return report.run(args)
+    if args.command == "run-once":
+        return run_once(args)
+    if args.command == "startup":
+        return run_startup_profile()
     main()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
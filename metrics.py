@@ -0,0 +1,155 @@
+# metrics.py
+"""In-memory latest metrics and an optional OpenMetrics HTTP endpoint.
+
+`log_results` pushes each cycle's `data_points` into a MetricsRegistry and probes
+report their durations and failures to it. A column with no value in a cycle (a probe
+that was skipped, timed out or is on a slower schedule) keeps its last value, and
+`sgl_metric_timestamp_seconds` says when each one was measured. The registry
+re-renders its OpenMetrics text on every update, so a scrape of `/metrics` only hands
+back a cached byte string and never reads the CSV.
+"""
+
+import math
+import re
+import threading
+from datetime import datetime
+from typing import Mapping, Optional
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+_METRIC_NAME = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$")
+
+
+def _number(value: object) -> Optional[float]:
+    """Numeric value of a logged cell; None for gaps, markers and free text."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value))  # Numeric strings such as Wi-Fi RSSI "-55"
+    except ValueError:
+        return None
+
+
+def _format(value: float) -> str:
+    value = float(value)  # int has no is_integer() before Python 3.12
+    if math.isnan(value):
+        return "NaN"
+    return repr(value) if not value.is_integer() else str(int(value))
+
+
+def _escape(label: str) -> str:
+    return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Latest cycle values plus per-probe counters, rendered as OpenMetrics text."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Column -> (latest value, timestamp of the cycle that logged it)
+        self._values: dict[str, tuple[float, float]] = {}
+        self._cycle_timestamp: Optional[float] = None
+        self._probe_duration: dict[str, float] = {}
+        self._probe_runs: dict[str, int] = {}
+        self._probe_failures: dict[str, int] = {}
+        self._exposition = b"# EOF\n"
+
+    def update(self, timestamp: str, data_points: Mapping[str, object]) -> None:
+        """Merges one cycle's numeric data points (column names as is) into the latest values."""
+        cycle_timestamp = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").timestamp()
+        values = {}
+        for name, value in data_points.items():
+            number = _number(value)
+            if number is not None and _METRIC_NAME.match(name):
+                values[name] = (number, cycle_timestamp)
+        with self._lock:
+            self._values.update(values)
+            self._cycle_timestamp = cycle_timestamp
+            self._render()
+
+    def record_probe(self, probe: str, duration: Optional[float], failed: bool) -> None:
+        """Counts one probe run; `duration` is None when it never finished."""
+        with self._lock:
+            self._probe_runs[probe] = self._probe_runs.get(probe, 0) + 1
+            self._probe_failures.setdefault(probe, 0)
+            if failed:
+                self._probe_failures[probe] += 1
+            if duration is not None:
+                self._probe_duration[probe] = duration
+            self._render()
+
+    def _render(self) -> None:
+        lines = []
+        for name, (value, _) in self._values.items():
+            lines += [f"# TYPE {name} gauge", f"{name} {_format(value)}"]
+        if self._cycle_timestamp is not None:
+            lines += [
+                "# TYPE sgl_last_cycle_timestamp_seconds gauge",
+                f"sgl_last_cycle_timestamp_seconds {_format(self._cycle_timestamp)}",
+            ]
+        if self._values:
+            lines.append("# TYPE sgl_metric_timestamp_seconds gauge")
+            lines += [
+                f'sgl_metric_timestamp_seconds{{metric="{name}"}} {_format(measured_at)}'
+                for name, (_, measured_at) in sorted(self._values.items())
+            ]
+        for family, kind, suffix, samples in (
+            ("sgl_probe_duration_seconds", "gauge", "", self._probe_duration),
+            ("sgl_probe_runs", "counter", "_total", self._probe_runs),
+            ("sgl_probe_failures", "counter", "_total", self._probe_failures),
+        ):
+            if samples:
+                lines.append(f"# TYPE {family} {kind}")
+                lines += [
+                    f'{family}{suffix}{{probe="{_escape(probe)}"}} {_format(float(value))}'
+                    for probe, value in sorted(samples.items())
+                ]
+        lines.append("# EOF")
+        self._exposition = ("\n".join(lines) + "\n").encode()
+
+    def exposition(self) -> bytes:
+        """The current OpenMetrics text, pre-rendered."""
+        return self._exposition
+
+
+class MetricsServer:
+    """Serves a registry at GET /metrics from a daemon thread."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464):
+        # Imported here so cycles without an exporter never load the HTTP stack.
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.exposition()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass  # Scrapes every few seconds would drown the console
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-exporter", daemon=True
+        )
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,256 @@
+# ookla.py
+"""Streaming reader for the Ookla `speedtest` CLI's `--progress` JSON output.
+
+With `--format=json --progress=yes` the CLI prints one JSON event per line as the
+test runs (testStart, ping, download, upload) and a final `result` event. Reading
+those lines as they arrive gives a per-second throughput and latency time series,
+and lets a stalled transfer be aborted long before the overall timeout.
+"""
+
+import json
+import math
+import queue
+import statistics
+import subprocess
+import threading
+import time
+from typing import IO, Callable, Optional, Sequence
+
+# Progress event types and the load phase each one represents.
+LOAD_PHASES = {
+    "testStart": "idle",
+    "ping": "idle",
+    "download": "download",
+    "upload": "upload",
+}
+TRANSFER_PHASES = ("download", "upload")
+
+# A trailing partial second shorter than this is too noisy to report.
+_MIN_BUCKET_MS = 250
+# Per-second throughput at or above this share of the final bandwidth ends the ramp-up.
+RAMP_UP_FRACTION = 0.9
+
+
+class SpeedtestStalled(Exception):
+    """Raised when a transfer phase stops making progress."""
+
+
+class PhaseSeries:
+    """Per-second throughput (Mbps) and loaded latency (ms) for one transfer phase."""
+
+    def __init__(self) -> None:
+        self.mbps: list[float] = []
+        self.latency_ms: list[Optional[float]] = []
+        # Bandwidth from the final result event, used as the ramp-up target.
+        self.final_mbps: Optional[float] = None
+        # Open one-second bucket: (index, start bytes, start elapsed ms).
+        self._bucket: Optional[tuple[int, int, int]] = None
+        self._last = (0, 0)  # (bytes, elapsed ms) of the latest event
+        self._last_latency: Optional[float] = None
+
+    def add(self, transferred: int, elapsed_ms: int, latency_ms: Optional[float]) -> None:
+        """Adds one progress event; closes the current second when a new one starts."""
+        index = elapsed_ms // 1000
+        if self._bucket is None:
+            self._bucket = (index, *self._last)
+        elif index > self._bucket[0]:
+            self._close_bucket()
+            self._bucket = (index, *self._last)
+        self._last = (transferred, elapsed_ms)
+        if latency_ms is not None:
+            self._last_latency = latency_ms
+
+    def finish(self) -> None:
+        """Closes the trailing partial second if it is long enough to be meaningful."""
+        if self._bucket is not None and self._last[1] - self._bucket[2] >= _MIN_BUCKET_MS:
+            self._close_bucket()
+        self._bucket = None
+
+    def _close_bucket(self) -> None:
+        assert self._bucket is not None
+        _, start_bytes, start_ms = self._bucket
+        end_bytes, end_ms = self._last
+        if end_ms <= start_ms:
+            return
+        self.mbps.append((end_bytes - start_bytes) * 8 / ((end_ms - start_ms) / 1000) / 1e6)
+        self.latency_ms.append(self._last_latency)
+
+    def ramp_up_seconds(self) -> Optional[float]:
+        """Seconds until per-second throughput first reaches 90% of the final bandwidth."""
+        target = self.final_mbps or (max(self.mbps) if self.mbps else None)
+        if not target:
+            return None
+        for second, mbps in enumerate(self.mbps, start=1):
+            if mbps >= RAMP_UP_FRACTION * target:
+                return float(second)
+        return None
+
+    def stability_cv(self) -> Optional[float]:
+        """Coefficient of variation of per-second throughput after ramp-up."""
+        ramp_up = self.ramp_up_seconds()
+        steady = self.mbps[int(ramp_up) - 1 :] if ramp_up else []
+        if len(steady) < 2:
+            return None
+        mean = statistics.fmean(steady)
+        return statistics.pstdev(steady) / mean if mean else None
+
+
+class ProgressTracker:
+    """Incrementally folds `--progress` events into per-phase time series.
+
+    `on_phase` is called whenever the load phase changes (None once the final result
+    arrives). A transfer phase whose byte count has not advanced for `stall_seconds`
+    is reported as stalled.
+    """
+
+    def __init__(
+        self,
+        stall_seconds: Optional[float] = 10.0,
+        on_phase: Optional[Callable[[Optional[str]], None]] = None,
+    ) -> None:
+        self.stall_seconds = stall_seconds
+        self.on_phase = on_phase
+        self.phase: Optional[str] = None
+        self.series = {phase: PhaseSeries() for phase in TRANSFER_PHASES}
+        self.result: Optional[dict] = None
+        self._last_progress = time.monotonic()
+        self._last_bytes = -1
+
+    def feed(self, event: dict, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        event_type = event.get("type")
+        if event_type == "result":
+            self._set_phase(None, now)
+            self.result = event
+            for phase, series in self.series.items():
+                bandwidth = (event.get(phase) or {}).get("bandwidth")
+                if bandwidth is not None:
+                    series.final_mbps = bandwidth * 8 / 1e6
+            return
+        phase = LOAD_PHASES.get(str(event_type))
+        if phase is None:
+            return
+        self._set_phase(phase, now)
+        if phase in self.series:
+            data = event.get(phase) or {}
+            transferred = int(data.get("bytes", 0))
+            latency_ms = (data.get("latency") or {}).get("iqm")
+            self.series[phase].add(transferred, int(data.get("elapsed", 0)), latency_ms)
+            if transferred > self._last_bytes:
+                self._last_bytes = transferred
+                self._last_progress = now
+
+    def _set_phase(self, phase: Optional[str], now: float) -> None:
+        if phase == self.phase:
+            return
+        if self.phase in self.series:
+            self.series[self.phase].finish()
+        self.phase = phase
+        self._last_progress = now
+        self._last_bytes = -1
+        if self.on_phase is not None:
+            self.on_phase(phase)
+
+    def stalled(self, now: Optional[float] = None) -> bool:
+        """True when a transfer phase has made no byte progress for `stall_seconds`."""
+        if self.stall_seconds is None or self.phase not in TRANSFER_PHASES:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - self._last_progress > self.stall_seconds
+
+
+def _pump_lines(stream: IO[str], lines: "queue.Queue[Optional[str]]") -> None:
+    """Copies lines from `stream` into `lines`, then a None sentinel at EOF."""
+    try:
+        for line in stream:
+            lines.put(line)
+    finally:
+        lines.put(None)
+
+
+def _read_all(stream: IO[str], chunks: list[str]) -> None:
+    """Reads `stream` to EOF into `chunks`, so its pipe never fills up."""
+    chunks.append(stream.read())
+
+
+def stream_speedtest(command: list[str], tracker: ProgressTracker, timeout: float = 120.0) -> dict:
+    """
+    Runs the CLI with `--progress=yes`, feeding each JSON event to `tracker` as it is
+    printed, and returns the final result event. Only non-JSON lines are kept, for
+    error reporting. Raises TimeoutExpired, SpeedtestStalled, CalledProcessError, or
+    JSONDecodeError like the blocking `subprocess.run` call it replaces.
+    """
+    process = subprocess.Popen(
+        [*command, "--progress=yes"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    assert process.stdout is not None and process.stderr is not None
+    lines: "queue.Queue[Optional[str]]" = queue.Queue()
+    reader = threading.Thread(
+        target=_pump_lines, args=(process.stdout, lines), name="speedtest-reader", daemon=True
+    )
+    reader.start()
+    # Drained alongside stdout: a CLI that fills the stderr pipe would otherwise block.
+    stderr_chunks: list[str] = []
+    stderr_reader = threading.Thread(
+        target=_read_all,
+        args=(process.stderr, stderr_chunks),
+        name="speedtest-stderr",
+        daemon=True,
+    )
+    stderr_reader.start()
+    deadline = time.monotonic() + timeout
+    other_output: list[str] = []
+    try:
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                raise subprocess.TimeoutExpired(command, timeout)
+            if tracker.stalled(now):
+                raise SpeedtestStalled(
+                    f"No {tracker.phase} progress for {tracker.stall_seconds:g}s; aborting."
+                )
+            try:
+                line = lines.get(timeout=min(0.5, deadline - now))
+            except queue.Empty:
+                continue
+            if line is None:
+                break
+            stripped = line.strip()
+            try:
+                event = json.loads(stripped) if stripped.startswith("{") else None
+            except json.JSONDecodeError:
+                event = None
+            if isinstance(event, dict):
+                tracker.feed(event)
+                # An unexpected JSON line (e.g. an error) stands in until a result arrives.
+                if tracker.result is None and str(event.get("type")) not in LOAD_PHASES:
+                    tracker.result = event
+            else:
+                other_output.append(line)
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    returncode = process.wait()
+    stderr_reader.join()
+    stderr = "".join(stderr_chunks)
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(
+            returncode, command, output="".join(other_output), stderr=stderr
+        )
+    if tracker.result is None:
+        raise json.JSONDecodeError("No JSON found in speedtest output", "".join(other_output), 0)
+    for series in tracker.series.values():
+        series.finish()
+    return tracker.result
+
+
+def format_series(values: Sequence[Optional[float]]) -> Optional[str]:
+    """Compact `a;b;c` rendering of a per-second series for one CSV cell."""
+    if not values:
+        return None
+    return ";".join("" if v is None or math.isnan(v) else f"{v:.1f}" for v in values)
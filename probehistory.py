@@ -0,0 +1,170 @@
+# probehistory.py
+"""Per-probe and per-cycle run history (wall time, CPU, memory) with regression checks.
+
+Every probe run, and every check cycle as a whole, is appended to a side CSV next to
+the results log. For each name, the wall times of its recent successful runs form a
+rolling baseline, reloaded from the file on startup. A run that takes more than
+`factor` times the baseline median is reported as a regression, e.g. after a gateway
+firmware update slows down diag.ha or a new Ookla CLI release changes how long a test
+runs.
+
+Child CPU time is the change in resource.getrusage(RUSAGE_CHILDREN) over the run. It
+counts every waited-for subprocess of whichever probe started it (and never Chrome's
+renderers, which chromedriver reaps), so probe rows only carry it when probes run one
+at a time; cycle rows always do. Peak RSS is the largest of the samples a background
+thread takes of the logger's process tree every RSS_SAMPLE_SECONDS while the probe
+runs, Chrome and the speed test CLIs included. A cycle's peak is the largest of its
+probes' peaks.
+"""
+
+import csv
+import os
+import resource
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+import storage
+
+HEADER = ["Timestamp", "Probe", "Wall_s", "Child_CPU_s", "Peak_RSS_MB", "Failed"]
+# How often UsageMeter samples resident memory while a run is in progress.
+RSS_SAMPLE_SECONDS = 1.0
+
+
+@dataclass
+class ProbeUsage:
+    """Resources a probe run or cycle used; None where it was not measured."""
+
+    wall_seconds: float
+    child_cpu_seconds: Optional[float] = None
+    peak_rss_mb: Optional[float] = None
+
+
+def child_cpu_seconds() -> float:
+    """User plus system CPU time of all waited-for child processes so far."""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class UsageMeter:
+    """Measures one probe run or cycle: start() before it, stop() after it.
+
+    With `child_cpu`, the run's child CPU time is recorded. With `rss`, a callable
+    returning the current resident memory in MB, the largest of its samples is.
+    """
+
+    def __init__(
+        self,
+        child_cpu: bool = True,
+        rss: Optional[Callable[[], Optional[float]]] = None,
+        rss_interval: float = RSS_SAMPLE_SECONDS,
+    ) -> None:
+        self.child_cpu = child_cpu
+        self.rss = rss
+        self.rss_interval = rss_interval
+        self._peak: Optional[float] = None
+        self._stopped = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def _sample_rss(self) -> None:
+        assert self.rss is not None
+        value = self.rss()
+        if value is not None and (self._peak is None or value > self._peak):
+            self._peak = value
+
+    def _sample_until_stopped(self) -> None:
+        while not self._stopped.wait(self.rss_interval):
+            self._sample_rss()
+
+    def start(self) -> None:
+        self._started = time.monotonic()
+        self._cpu = child_cpu_seconds() if self.child_cpu else None
+        if self.rss is not None:
+            self._sample_rss()
+            self._sampler = threading.Thread(
+                target=self._sample_until_stopped, name="rss-sampler", daemon=True
+            )
+            self._sampler.start()
+
+    def stop(self) -> ProbeUsage:
+        wall_seconds = time.monotonic() - self._started
+        cpu = None if self._cpu is None else max(0.0, child_cpu_seconds() - self._cpu)
+        if self._sampler is not None:
+            self._stopped.set()
+            self._sampler.join()
+            self._sample_rss()
+        return ProbeUsage(wall_seconds, child_cpu_seconds=cpu, peak_rss_mb=self._peak)
+
+
+class ProbeHistory:
+    """Appends probe runs to `path` and compares each one with its rolling baseline."""
+
+    def __init__(
+        self, path: str, window: int = 50, factor: float = 2.0, min_samples: int = 10
+    ) -> None:
+        self.path = path
+        self.window = window
+        self.factor = factor
+        self.min_samples = min_samples
+        self._baselines: dict[str, deque[float]] = {}
+        self._load()
+        self._sink = storage.CsvResultSink(path)
+
+    def _baseline(self, probe: str) -> deque[float]:
+        return self._baselines.setdefault(probe, deque(maxlen=self.window))
+
+    def _load(self) -> None:
+        """Rebuilds the baselines from the successful runs already in the file."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    if row["Failed"] == "0":
+                        self._baseline(row["Probe"]).append(float(row["Wall_s"]))
+                except (KeyError, TypeError, ValueError):
+                    continue  # Skip malformed rows, such as one cut off by a crash
+
+    def median(self, probe: str) -> Optional[float]:
+        """Median wall time of the probe's baseline, once it has `min_samples` runs."""
+        baseline = self._baselines.get(probe)
+        if not baseline or len(baseline) < self.min_samples:
+            return None
+        return statistics.median(baseline)
+
+    def record(self, probe: str, usage: ProbeUsage, failed: bool) -> Optional[str]:
+        """
+        Logs one run and returns a description of the regression if a successful run
+        took more than `factor` times the baseline median. Failed runs are logged but
+        never join the baseline, since timeouts and early errors skew it.
+        """
+        regression = None
+        median = self.median(probe)
+        if not failed and median is not None and usage.wall_seconds > self.factor * median:
+            regression = (
+                f"{probe} took {usage.wall_seconds:.1f}s, "
+                f"{usage.wall_seconds / median:.1f}x its median of {median:.1f}s "
+                f"over the last {len(self._baselines[probe])} runs"
+            )
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._sink.write(
+            HEADER,
+            [
+                timestamp,
+                probe,
+                f"{usage.wall_seconds:.3f}",
+                "" if usage.child_cpu_seconds is None else f"{usage.child_cpu_seconds:.3f}",
+                "" if usage.peak_rss_mb is None else f"{usage.peak_rss_mb:.1f}",
+                "1" if failed else "0",
+            ],
+        )
+        if not failed:
+            self._baseline(probe).append(usage.wall_seconds)
+        return regression
+
+    def close(self) -> None:
+        self._sink.close()
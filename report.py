@@ -0,0 +1,269 @@
+# report.py
+"""`report`/`query` subcommand: streaming per-bucket aggregates over the results log.
+
+The CSV log, and any rotated segments the manifest says overlap the time range, are
+read row by row. When the live log has a `.idx` sidecar (ENABLE_LOG_INDEX), reading
+starts at the first row at or after --since instead of the top of the file. Every
+column keeps only running aggregates (count, sum, min, max, anomaly count, P²
+percentile sketches). Each time bucket is emitted as soon as the next one starts, so
+memory use stays the same however large the history is.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import IO, Generator, Iterator, Optional, Sequence
+
+import config
+import latency
+import logindex
+import rotation
+import thresholds
+
+DEFAULT_COLUMNS = (
+    "Gateway_RTT_avg_ms",
+    "Local_WAN_RTT_avg_ms",
+    "Local_WAN_LossPercentage",
+    "Local_Downstream_Mbps",
+    "Local_Upstream_Mbps",
+)
+DEFAULT_PERCENTILES = (50.0, 95.0, 99.0)
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)\s*([smhdw])$")
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_duration(value: str) -> float:
+    """Parses "30s", "15m", "1h", "7d", "2w" into seconds."""
+    match = _DURATION.match(value.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid duration: {value!r} (use e.g. 15m, 1h, 7d)")
+    return float(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+
+
+def parse_time(value: str, now: Optional[datetime] = None) -> datetime:
+    """Parses an absolute time ("2026-10-17", "2026-10-17 08:30") or an age ("24h")."""
+    try:
+        return (now or datetime.now()) - timedelta(seconds=parse_duration(value))
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid time: {value!r}") from None
+
+
+def bucket_start(ts: datetime, bucket_seconds: Optional[float]) -> Optional[datetime]:
+    """Start of the bucket holding `ts`. Buckets that divide a day align to local midnight."""
+    if bucket_seconds is None:
+        return None
+    if 86400 % bucket_seconds == 0:
+        midnight = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+        offset = (ts - midnight).total_seconds() // bucket_seconds * bucket_seconds
+        return midnight + timedelta(seconds=offset)
+    return datetime.fromtimestamp(ts.timestamp() // bucket_seconds * bucket_seconds)
+
+
+def _csv_records(path: str) -> Generator[list[str], None, None]:
+    with rotation.open_log(path) as f:
+        yield from csv.reader(f)
+
+
+def _indexed_csv_records(path: str, since: datetime) -> Generator[list[str], None, None]:
+    """The live log's header, then its rows from `since` on, found through its index."""
+    with open(path, newline="", encoding="utf-8") as f:
+        yield next(csv.reader([f.readline()]), [])
+    for _, entry in logindex.TimestampIndex(path).entries(since):
+        # The last entry runs to EOF, so it may hold rows appended since the last flush.
+        yield from csv.reader(io.StringIO(entry.decode("utf-8", "replace"), newline=""))
+
+
+def iter_rows(
+    path: str, since: Optional[datetime] = None, until: Optional[datetime] = None
+) -> Iterator[tuple[datetime, dict[str, str]]]:
+    """
+    Streams (timestamp, row) pairs in [since, until) from the live CSV and the rotated
+    segments that overlap the range. Segments may have different headers.
+    """
+    for file_path in rotation.LogRotator(path).files_for_range(since, until):
+        indexed = file_path == path and since is not None and os.path.exists(f"{path}.idx")
+        records = _indexed_csv_records(path, since) if indexed else _csv_records(file_path)
+        with closing(records):
+            header: list[str] = []
+            for record in records:
+                if not record:
+                    continue
+                if record[0] == "Timestamp":
+                    header = record
+                    continue
+                try:
+                    ts = datetime.strptime(record[0], rotation.TIMESTAMP_FORMAT)
+                except ValueError:
+                    continue
+                if since is not None and ts < since:
+                    continue
+                if until is not None and ts >= until:
+                    break  # Each file is in time order
+                yield ts, dict(zip(header, record))
+
+
+class ColumnStats:
+    """Running aggregates for one column in one bucket."""
+
+    def __init__(self, percentiles: Sequence[float]) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.anomalies = 0
+        # Non-numeric cells other than N/A, e.g. TIMEOUT markers.
+        self.markers = 0
+        self.percentiles = tuple(percentiles)
+        self._sketch = latency.QuantileSketch(tuple(p / 100 for p in self.percentiles))
+
+    def add(self, raw: str, threshold: Optional[tuple[float, thresholds.Comparison]]) -> None:
+        if raw in ("", "N/A"):
+            return
+        try:
+            value = float(raw)
+        except ValueError:
+            self.markers += 1
+            return
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._sketch.add(value)
+        if threshold is not None and thresholds.crosses(value, threshold):
+            self.anomalies += 1
+
+    def summary(self) -> dict[str, float | int | None]:
+        result: dict[str, float | int | None] = {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+        }
+        for p in self.percentiles:
+            result[f"p{p:g}"] = self._sketch.quantile(p / 100)
+        result["anomalies"] = self.anomalies
+        result["markers"] = self.markers
+        return result
+
+
+def _format_cell(value: float | int | None) -> str:
+    if value is None:
+        return "N/A"
+    return str(value) if isinstance(value, int) else f"{value:.2f}"
+
+
+def run_report(
+    path: str,
+    columns: Sequence[str] = DEFAULT_COLUMNS,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bucket_seconds: Optional[float] = 3600,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    as_json: bool = False,
+    out: Optional[IO[str]] = None,
+) -> int:
+    """
+    Streams the log and writes one table line (or JSON object per line) per bucket and
+    column. Returns the number of rows aggregated.
+    """
+    out = out or sys.stdout
+    limits = {column: thresholds.anomaly_threshold(column) for column in columns}
+    stat_names = ["count", "mean", "min", "max", *(f"p{p:g}" for p in percentiles)]
+    stat_names += ["anomalies", "markers"]
+    if not as_json:
+        out.write(
+            f"{'Bucket':<19}  {'Column':<28}"
+            + "".join(f"{name:>10}" for name in stat_names)
+            + "\n"
+        )
+
+    def emit(start: Optional[datetime], stats: dict[str, ColumnStats]) -> None:
+        label = start.strftime(rotation.TIMESTAMP_FORMAT) if start else "all"
+        for column in columns:
+            summary = stats[column].summary()
+            if as_json:
+                out.write(json.dumps({"bucket": label, "column": column, **summary}) + "\n")
+            else:
+                cells = "".join(f"{_format_cell(summary[name]):>10}" for name in stat_names)
+                out.write(f"{label:<19}  {column:<28}{cells}\n")
+
+    rows = 0
+    current: Optional[datetime] = None
+    stats: Optional[dict[str, ColumnStats]] = None
+    for ts, row in iter_rows(path, since, until):
+        start = bucket_start(ts, bucket_seconds)
+        if stats is None or start != current:
+            if stats is not None:
+                emit(current, stats)
+            current = start
+            stats = {column: ColumnStats(percentiles) for column in columns}
+        for column in columns:
+            if column in row:
+                stats[column].add(row[column], limits[column])
+        rows += 1
+    if stats is not None:
+        emit(current, stats)
+    return rows
+
+
+# --- CLI ---
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--file", default=None, help="CSV log to read (default: LOG_FILE).")
+    parser.add_argument("--since", help='Start time ("2026-10-17 08:00") or age ("24h", "7d").')
+    parser.add_argument("--until", help="End time (exclusive), same formats as --since.")
+    parser.add_argument(
+        "--columns",
+        nargs="+",
+        default=list(DEFAULT_COLUMNS),
+        help="CSV columns to aggregate.",
+    )
+    parser.add_argument(
+        "--bucket", default="1h", help='Bucket size ("15m", "1h", "1d") or "all" for one bucket.'
+    )
+    parser.add_argument(
+        "--percentiles",
+        nargs="+",
+        type=float,
+        default=list(DEFAULT_PERCENTILES),
+        help="Percentiles to estimate per bucket.",
+    )
+    parser.add_argument("--json", action="store_true", help="Emit one JSON object per line.")
+
+
+def run(args: argparse.Namespace) -> int:
+    """Runs the report for parsed CLI arguments; returns a process exit code."""
+    try:
+        now = datetime.now()
+        since = parse_time(args.since, now) if args.since else None
+        until = parse_time(args.until, now) if args.until else None
+        bucket = None if args.bucket == "all" else parse_duration(args.bucket)
+        if bucket is not None and bucket <= 0:
+            raise ValueError(f"Invalid bucket: {args.bucket!r} (must be longer than 0s)")
+        for p in args.percentiles:
+            if not 0 < p < 100:
+                raise ValueError(f"Invalid percentile: {p:g} (must be between 0 and 100)")
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    rows = run_report(
+        args.file or config.LOG_FILE,
+        columns=args.columns,
+        since=since,
+        until=until,
+        bucket_seconds=bucket,
+        percentiles=args.percentiles,
+        as_json=args.json,
+    )
+    if rows == 0:
+        print("No rows matched.", file=sys.stderr)
+    return 0
@@ -0,0 +1,172 @@
+# rotation.py
+"""Size/day-based rotation of append-only logs into gzip-compressed segments.
+
+A closed segment is written next to the live file, e.g. `network_log.csv` becomes
+`network_log.20261017-000000.csv.gz`, named after its first entry. A small JSON
+manifest (`network_log.csv.manifest.json`) records each segment's first and last
+entry timestamps and its entry count. Date-range readers use it to open only the
+segments that overlap the range.
+"""
+
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+from typing import IO, Optional, Pattern
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+_TIMESTAMP = r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})"
+# One entry per CSV data row (the header does not start with a timestamp).
+CSV_ENTRY = re.compile(rf"^{_TIMESTAMP}(?:,|$)")
+# One entry per "--- Log entry from <timestamp> ---" block in the raw gateway log.
+RAW_LOG_ENTRY = re.compile(rf"^--- Log entry from {_TIMESTAMP} ---")
+
+
+def open_log(path: str) -> IO[str]:
+    """Opens a live log or a compressed segment for reading text."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    return open(path, newline="")
+
+
+class LogRotator:
+    """Decides when a log is due for rotation and turns it into a compressed segment.
+
+    The file rotates once it reaches `max_bytes`, or with `daily` once an entry for a
+    new calendar day arrives. `entry_pattern` finds the start of each entry and
+    captures its timestamp.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: Optional[int] = None,
+        daily: bool = False,
+        entry_pattern: Pattern[str] = CSV_ENTRY,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.daily = daily
+        self.entry_pattern = entry_pattern
+        self.manifest_path = f"{path}.manifest.json"
+        # Day of the live file's first entry, cached per file identity.
+        self._first_day: Optional[tuple[tuple[int, int], Optional[str]]] = None
+
+    def _first_entry_day(self, identity: tuple[int, int]) -> Optional[str]:
+        if self._first_day is None or self._first_day[0] != identity:
+            day = None
+            with open_log(self.path) as f:
+                for line in f:
+                    match = self.entry_pattern.match(line)
+                    if match:
+                        day = match.group(1)[:10]
+                        break
+            self._first_day = (identity, day)
+        return self._first_day[1]
+
+    def due(self, timestamp: str, size: Optional[int] = None) -> bool:
+        """
+        True when the entry stamped `timestamp` should start a new file. `size` is the
+        live file's size if the caller already knows it (e.g. including buffered rows).
+        """
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        size = st.st_size if size is None else size
+        if size == 0:
+            return False
+        if self.max_bytes is not None and size >= self.max_bytes:
+            return True
+        if self.daily:
+            first_day = self._first_entry_day((st.st_dev, st.st_ino))
+            return first_day is not None and first_day != timestamp[:10]
+        return False
+
+    def _segment_path(self, first: Optional[str]) -> str:
+        directory, name = os.path.split(self.path)
+        stem, ext = os.path.splitext(name)
+        stamp = (
+            datetime.strptime(first, TIMESTAMP_FORMAT).strftime("%Y%m%d-%H%M%S")
+            if first
+            else datetime.now().strftime("%Y%m%d-%H%M%S")
+        )
+        candidate = os.path.join(directory, f"{stem}.{stamp}{ext}.gz")
+        suffix = 1
+        while os.path.exists(candidate):
+            candidate = os.path.join(directory, f"{stem}.{stamp}-{suffix}{ext}.gz")
+            suffix += 1
+        return candidate
+
+    def rotate(self) -> Optional[dict]:
+        """
+        Compresses the live file into a segment, records it in the manifest, and
+        removes the live file. Returns the manifest entry, or None if there was
+        nothing to rotate. The caller must have closed its handle first.
+        """
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return None
+        first: Optional[str] = None
+        last: Optional[str] = None
+        entries = 0
+        staging = f"{self.path}.rotating.gz"
+        with open(self.path, "rb") as src, gzip.open(staging, "wb") as dst:
+            for raw in src:
+                dst.write(raw)
+                match = self.entry_pattern.match(raw.decode("utf-8", "replace"))
+                if match:
+                    entries += 1
+                    first = first or match.group(1)
+                    last = match.group(1)
+        segment = self._segment_path(first)
+        os.replace(staging, segment)
+        os.remove(self.path)
+        self._first_day = None
+        entry = {
+            "file": os.path.basename(segment),
+            "start": first,
+            "end": last,
+            "rows": entries,
+            "bytes": os.path.getsize(segment),
+        }
+        manifest = self.manifest()
+        manifest.append(entry)
+        self._write_manifest(manifest)
+        return entry
+
+    def manifest(self) -> list[dict]:
+        """Segment entries, oldest first (empty if nothing has been rotated yet)."""
+        try:
+            with open(self.manifest_path) as f:
+                return list(json.load(f).get("segments", []))
+        except (OSError, ValueError):
+            return []
+
+    def _write_manifest(self, segments: list[dict]) -> None:
+        staging = f"{self.manifest_path}.tmp"
+        with open(staging, "w") as f:
+            json.dump({"segments": segments}, f, indent=2)
+        os.replace(staging, self.manifest_path)
+
+    def files_for_range(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> list[str]:
+        """
+        Paths of the segments overlapping [start, end), oldest first, followed by the
+        live file if it exists. Segments without a recorded range are always included.
+        """
+        lo = start.strftime(TIMESTAMP_FORMAT) if start else None
+        hi = end.strftime(TIMESTAMP_FORMAT) if end else None
+        directory = os.path.dirname(self.path)
+        paths = []
+        for segment in self.manifest():
+            if segment.get("start") and segment.get("end"):
+                if (hi is not None and segment["start"] >= hi) or (
+                    lo is not None and segment["end"] < lo
+                ):
+                    continue
+            paths.append(os.path.join(directory, segment["file"]))
+        if os.path.exists(self.path):
+            paths.append(self.path)
+        return paths
@@ -0,0 +1,253 @@
+# scheduler.py
+"""Monotonic timer-heap scheduler for the check cycle and per-probe cadences.
+
+Jobs sit in a heap keyed by their next due time on time.monotonic(), and the loop
+sleeps exactly until the earliest one instead of polling. Interval jobs keep a fixed
+grid of slots; when a run finishes after its next slot has already passed, the job's
+overrun policy decides what happens to the missed slots:
+
+- "skip": drop them and wait for the next slot on the grid.
+- "coalesce": run once immediately for all of them, then rejoin the grid.
+- "queue": run every missed slot back to back until the job catches up.
+
+Daily jobs run at a wall-clock time of day and always move to the next day.
+AdaptiveCadence adds a fast job while anomalies persist and cancels it once things
+have been healthy for a while.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Literal, Optional, Sequence
+
+OverrunPolicy = Literal["skip", "coalesce", "queue"]
+OVERRUN_POLICIES: tuple[OverrunPolicy, ...] = ("skip", "coalesce", "queue")
+
+
+@dataclass
+class Job:
+    """A scheduled callable and its bookkeeping."""
+
+    name: str
+    func: Callable[[], object]
+    # Seconds between slots for interval jobs.
+    interval: Optional[float] = None
+    # (hour, minute) for daily jobs.
+    daily_at: Optional[tuple[int, int]] = None
+    overrun: OverrunPolicy = "skip"
+    # Monotonic time of the grid slot being served and of the next run.
+    slot: float = 0.0
+    due: float = 0.0
+    runs: int = 0
+    # Slots that passed while the job (or another one) was still running.
+    missed: int = 0
+    last_duration: Optional[float] = field(default=None, repr=False)
+
+
+def parse_time_of_day(value: str) -> tuple[int, int]:
+    """Parses "HH:MM" into (hour, minute)."""
+    hour, _, minute = value.partition(":")
+    parsed = (int(hour), int(minute or 0))
+    if not (0 <= parsed[0] < 24 and 0 <= parsed[1] < 60):
+        raise ValueError(f"Invalid time of day: {value!r}")
+    return parsed
+
+
+class Scheduler:
+    """Runs jobs from a monotonic timer heap, sleeping until the next one is due."""
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.jobs: dict[str, Job] = {}
+        self._heap: list[tuple[float, int, Job]] = []
+        self._sequence = itertools.count()
+        self._wake = threading.Event()
+
+    # --- Registration ---
+    def every(
+        self,
+        seconds: float,
+        name: str,
+        func: Callable[[], object],
+        overrun: OverrunPolicy = "skip",
+        align: bool = False,
+        run_now: bool = False,
+    ) -> Job:
+        """
+        Runs `func` every `seconds`. With `align`, slots fall on wall-clock multiples of
+        the interval (a 5-minute job fires at :00, :05, ...); with `run_now`, the first
+        run is immediate.
+        """
+        if seconds <= 0:
+            raise ValueError(f"Interval for {name!r} must be positive, got {seconds}")
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy {overrun!r} for {name!r}")
+        now = self.clock()
+        if run_now:
+            first = now
+        elif align:
+            wall = self.wall_clock()
+            first = now + (seconds - wall % seconds)
+        else:
+            first = now + seconds
+        job = Job(name, func, interval=seconds, overrun=overrun, slot=first, due=first)
+        self._add(job)
+        return job
+
+    def daily(self, at: str, name: str, func: Callable[[], object]) -> Job:
+        """Runs `func` once a day at local time `at` ("HH:MM")."""
+        daily_at = parse_time_of_day(at)
+        job = Job(name, func, daily_at=daily_at)
+        job.slot = job.due = self.clock() + self._seconds_until(daily_at)
+        self._add(job)
+        return job
+
+    def _add(self, job: Job) -> None:
+        if job.name in self.jobs:
+            raise ValueError(f"A job named {job.name!r} is already scheduled")
+        self.jobs[job.name] = job
+        self._push(job)
+        self._wake.set()  # Let a sleeping wait() pick up the new deadline
+
+    def cancel(self, name: str) -> Optional[Job]:
+        """Removes job `name` (even from inside its own run); returns it, if it existed."""
+        job = self.jobs.pop(name, None)
+        if job is not None:
+            self._heap = [entry for entry in self._heap if entry[2] is not job]
+            heapq.heapify(self._heap)
+            self._wake.set()
+        return job
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(self._heap, (job.due, next(self._sequence), job))
+
+    def _seconds_until(self, time_of_day: tuple[int, int]) -> float:
+        now = datetime.fromtimestamp(self.wall_clock())
+        target = now.replace(hour=time_of_day[0], minute=time_of_day[1], second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        return (target - now).total_seconds()
+
+    # --- Running ---
+    def idle_seconds(self) -> Optional[float]:
+        """Seconds until the earliest job is due (0 if overdue), or None when empty."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - self.clock())
+
+    def next_run(self, name: Optional[str] = None) -> Optional[datetime]:
+        """Wall-clock estimate of the next run of job `name`, or of any job."""
+        if name is not None:
+            job = self.jobs.get(name)
+            due = job.due if job is not None else None
+        else:
+            due = self._heap[0][0] if self._heap else None
+        if due is None:
+            return None
+        return datetime.fromtimestamp(self.wall_clock() + (due - self.clock()))
+
+    def run_pending(self) -> int:
+        """Runs every job that is due now, earliest first. Returns how many ran."""
+        ran = 0
+        while self._heap and self._heap[0][0] <= self.clock():
+            _, _, job = heapq.heappop(self._heap)
+            started = self.clock()
+            try:
+                job.func()
+            except Exception as e:
+                print(f"An error occurred during scheduled job {job.name}: {e}")
+            finished = self.clock()
+            job.runs += 1
+            job.last_duration = finished - started
+            ran += 1
+            if self.jobs.get(job.name) is not job:
+                continue  # Cancelled while it ran
+            self._reschedule(job, finished)
+            self._push(job)
+        return ran
+
+    def _reschedule(self, job: Job, now: float) -> None:
+        if job.daily_at is not None:
+            job.slot = job.due = now + self._seconds_until(job.daily_at)
+            return
+        assert job.interval is not None
+        next_slot = job.slot + job.interval
+        if next_slot > now or job.overrun == "queue":
+            if next_slot <= now:
+                job.missed += 1
+            job.slot = job.due = next_slot
+            return
+        # How many slots passed while we ran, and the first slot still ahead of us.
+        missed = int((now - next_slot) // job.interval) + 1
+        upcoming = next_slot + missed * job.interval
+        job.missed += missed
+        print(
+            f"Scheduled job {job.name} overran its {job.interval:g}s interval "
+            f"({missed} slot(s) missed, policy: {job.overrun})."
+        )
+        if job.overrun == "coalesce":
+            # One catch-up run now stands in for the latest missed slot.
+            job.slot, job.due = upcoming - job.interval, now
+        else:
+            job.slot = job.due = upcoming
+
+    def wait(self) -> None:
+        """Sleeps until the next job is due or the scheduler is woken."""
+        self._wake.clear()
+        self._wake.wait(self.idle_seconds())
+
+    def wake(self) -> None:
+        """Interrupts wait(), e.g. to stop the loop from another thread."""
+        self._wake.set()
+
+
+class AdaptiveCadence:
+    """Runs `func` every `fast_interval` seconds while anomalies are being observed.
+
+    observe() is fed each cycle's anomalies. The first one adds the fast job; every
+    further one extends the escalation to `hold_seconds` from now. Once a healthy
+    cycle is observed after that window, the fast job is cancelled and the regular
+    jobs carry on at their base rate.
+    """
+
+    def __init__(
+        self,
+        sched: Scheduler,
+        name: str,
+        func: Callable[[], object],
+        fast_interval: float,
+        hold_seconds: float,
+    ) -> None:
+        self.sched = sched
+        self.name = name
+        self.func = func
+        self.fast_interval = fast_interval
+        self.hold_seconds = hold_seconds
+        self.escalated_until: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.name in self.sched.jobs
+
+    def observe(self, anomalies: Sequence[str]) -> None:
+        now = self.sched.clock()
+        if anomalies:
+            if not self.active:
+                print(
+                    f"Anomaly detected ({', '.join(anomalies)}); running {self.name} every "
+                    f"{self.fast_interval:g}s for at least {self.hold_seconds / 60:g} min."
+                )
+                self.sched.every(self.fast_interval, self.name, self.func)
+            self.escalated_until = now + self.hold_seconds
+        elif self.active and (self.escalated_until is None or now >= self.escalated_until):
+            print(f"Healthy again; stopping {self.name} and returning to the base cadence.")
+            self.sched.cancel(self.name)
+            self.escalated_until = None
@@ -0,0 +1,40 @@
+# statefile.py
+"""Small JSON state file carried from one `main.py run-once` invocation to the next.
+
+An external scheduler such as a systemd timer starts a fresh process for every run, so
+what the resident loop keeps in memory (the HTTP backend's gateway session cookies, the
+run counters behind the expensive probes' cadence) is saved here instead. The cookies
+log in to the gateway, so the file is only ever written with owner-only permissions,
+and it is replaced atomically so a killed run cannot leave half a file behind.
+"""
+
+import json
+import os
+import stat
+from typing import Any
+
+
+def load(path: str) -> dict[str, Any]:
+    """Returns the saved state, or an empty one if the file is missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read state file {path}: {e}")
+        return {}
+    if mode & (stat.S_IRWXG | stat.S_IRWXO):
+        print(f"Warning: State file {path} is accessible to other users; run chmod 600 on it.")
+    return state if isinstance(state, dict) else {}
+
+
+def save(path: str, state: dict[str, Any]) -> None:
+    """Writes the state to `path` with mode 0600 via a temporary file and a rename."""
+    temp_path = f"{path}.tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        os.fchmod(f.fileno(), 0o600)  # O_CREAT's mode does not apply to an existing file
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
@@ -0,0 +1,288 @@
+# storage.py
+"""Result sinks: the CSV log writer and a SQLite store written alongside it.
+
+The CSV sink keeps one handle open for the life of the logger. In the SQLite store,
+each cycle becomes one row in the `results` table. The database runs in WAL mode,
+so readers (reports, ad-hoc queries) never block the logger. The table is indexed
+on `timestamp`, which makes range queries cheap however long the history grows.
+Column types come from the values logged: numbers get REAL/INTEGER affinity and
+text gets TEXT. Columns that appear in later versions are added on the fly.
+"""
+
+import csv
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import IO, Iterable, Mapping, Optional, Sequence
+
+import logindex
+import rotation
+
+TABLE = "results"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Markers logged in place of a value; they say nothing about a column's type.
+_MARKERS = frozenset({"N/A", "TIMEOUT", "SKIPPED"})
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# How often the CSV sink checks for external rotation when it has no flush interval.
+REOPEN_CHECK_SECONDS = 5.0
+
+
+def column_type(value: object) -> Optional[str]:
+    """SQLite type for a logged value, or None when the value does not say."""
+    if isinstance(value, bool) or isinstance(value, int):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    if isinstance(value, str) and value not in _MARKERS:
+        return "TEXT"
+    return None
+
+
+def _quote(name: str) -> str:
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Unsupported column name: {name!r}")
+    return f'"{name}"'
+
+
+class ResultStore:
+    """Appends result rows to SQLite in batched transactions.
+
+    Rows are committed once `batch_rows` are pending or the oldest pending row is
+    `batch_seconds` old, whichever comes first, and on flush()/close(). The age limit
+    runs on a timer, so a lone row is committed on time even if no other row follows.
+    """
+
+    def __init__(self, path: str, batch_rows: int = 10, batch_seconds: float = 30.0) -> None:
+        self.path = path
+        self.batch_rows = max(1, batch_rows)
+        self.batch_seconds = batch_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL plus NORMAL still survives application crashes; only power loss can
+        # drop the last commits.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} (timestamp TEXT NOT NULL)")
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_timestamp ON {TABLE} (timestamp)"
+        )
+        self._conn.commit()
+        self._columns = self._existing_columns()
+        self._pending: list[tuple[str, Mapping[str, object]]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def _existing_columns(self) -> dict[str, str]:
+        rows = self._conn.execute(f"PRAGMA table_info({TABLE})").fetchall()
+        return {row[1]: row[2] for row in rows}
+
+    def _ensure_columns(self, row: Mapping[str, object]) -> None:
+        for name, value in row.items():
+            if name not in self._columns:
+                declared = column_type(value) or "REAL"
+                self._conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {_quote(name)} {declared}")
+                self._columns[name] = declared
+
+    def append(self, timestamp: str, row: Mapping[str, object]) -> None:
+        """Queues one row; commits when the batch is full or old enough."""
+        with self._lock:
+            self._pending.append((timestamp, dict(row)))
+            if len(self._pending) >= self.batch_rows or self.batch_seconds <= 0:
+                self._commit_pending()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.batch_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Commits any pending rows."""
+        with self._lock:
+            self._commit_pending()
+
+    def _commit_pending(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        with self._conn:  # One transaction for the whole batch
+            for timestamp, row in self._pending:
+                self._ensure_columns(row)
+                names = ["timestamp", *row]
+                placeholders = ", ".join("?" for _ in names)
+                self._conn.execute(
+                    f"INSERT INTO {TABLE} ({', '.join(_quote(n) for n in names)}) "
+                    f"VALUES ({placeholders})",
+                    [timestamp, *(None if v == "N/A" else v for v in row.values())],
+                )
+        self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+    def query_range(
+        self,
+        start: datetime,
+        end: datetime,
+        columns: Optional[Iterable[str]] = None,
+    ) -> list[dict[str, object]]:
+        """Rows with start <= timestamp < end, oldest first, as dicts."""
+        wanted = ["timestamp", *(columns or [c for c in self._columns if c != "timestamp"])]
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT {', '.join(_quote(c) for c in wanted)} FROM {TABLE} "
+                "WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+                (start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT)),
+            )
+            return [dict(zip(wanted, row)) for row in cursor.fetchall()]
+
+
+class CsvResultSink:
+    """Long-lived CSV writer that owns the log file handle.
+
+    The header check happens once per open instead of on every row. Rows go through
+    the file's buffer and are flushed after `flush_every_rows` rows or once
+    `flush_every_seconds` have passed since the last flush, whichever comes first;
+    with `fsync`, each flush is also forced to disk. Before a batch the path is
+    re-checked, at most once per `flush_every_seconds` (or REOPEN_CHECK_SECONDS), so a
+    file moved away or deleted by an external rotation is reopened.
+    With a `rotator`, the file is rotated into a compressed segment when it is due;
+    with an `index`, each row's byte offset goes to its timestamp index on flush.
+    If the existing file's header differs from the one being written (columns added
+    or removed by an upgrade), the old file is rotated into a segment and a new file
+    is started, so every row sits under the header that describes it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_every_rows: int = 1,
+        flush_every_seconds: Optional[float] = None,
+        fsync: bool = False,
+        rotator: Optional[rotation.LogRotator] = None,
+        index: Optional[logindex.TimestampIndex] = None,
+    ) -> None:
+        self.path = path
+        self.flush_every_rows = max(1, flush_every_rows)
+        self.flush_every_seconds = flush_every_seconds
+        self.fsync = fsync
+        self.rotator = rotator
+        self.index = index
+        self._file: Optional[IO[str]] = None
+        # Rows are formatted here first so their encoded size (and so the byte offset of
+        # the next row) is known without tell(), which would flush the buffer.
+        self._line = io.StringIO()
+        self._writer = csv.writer(self._line)
+        self._offset = 0
+        self._identity: Optional[tuple[int, int]] = None
+        self._needs_header = False
+        self._header: Optional[list[str]] = None
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._last_reopen_check = self._last_flush
+        self._lock = threading.Lock()
+
+    def _file_identity(self) -> Optional[tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino)
+
+    def _open(self) -> None:
+        exists = os.path.exists(self.path)
+        self._offset = os.path.getsize(self.path) if exists else 0
+        self._needs_header = self._offset == 0
+        self._header = None if self._needs_header else self._read_header()
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._identity = self._file_identity()
+        if self.index is not None:
+            self.index.sync()
+
+    def _read_header(self) -> Optional[list[str]]:
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), None)
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._flush_file()
+            self._file.close()
+        self._file = self._identity = None
+
+    def _write_line(self, fields: Sequence[str]) -> None:
+        assert self._file is not None
+        self._line.seek(0)
+        self._line.truncate()
+        self._writer.writerow(fields)
+        line = self._line.getvalue()
+        self._file.write(line)
+        self._offset += len(line.encode("utf-8"))
+
+    def _rotated(self) -> bool:
+        """True if the path no longer leads to the open file; stats it once per interval."""
+        now = time.monotonic()
+        interval = self.flush_every_seconds or REOPEN_CHECK_SECONDS
+        if now - self._last_reopen_check < interval:
+            return False
+        self._last_reopen_check = now
+        identity = self._file_identity()
+        return identity is None or identity != self._identity
+
+    def write(self, header: Sequence[str], row: Sequence[str]) -> None:
+        """Writes one row, preceded by `header` when the file is new or empty."""
+        with self._lock:
+            if self.rotator is not None:
+                size = self._offset if self._file is not None else None
+                if self.rotator.due(row[0], size):
+                    self._close_file()
+                    self.rotator.rotate()
+            if self._file is not None and self._unflushed == 0 and self._rotated():
+                self._close_file()
+            if self._file is None:
+                self._open()
+            if self._header is not None and self._header != list(header):
+                print(
+                    f"Warning: {self.path} has a different column header; "
+                    "starting a new file and keeping the old one as a segment."
+                )
+                self._close_file()
+                (self.rotator or rotation.LogRotator(self.path)).rotate()
+                self._open()
+            if self._needs_header:
+                self._write_line(header)
+                self._needs_header = False
+                self._header = list(header)
+            if self.index is not None:
+                self.index.append(row[0], self._offset)
+            self._write_line(row)
+            self._unflushed += 1
+            overdue = (
+                self.flush_every_seconds is not None
+                and time.monotonic() - self._last_flush >= self.flush_every_seconds
+            )
+            if self._unflushed >= self.flush_every_rows or overdue:
+                self._flush_file()
+
+    def _flush_file(self) -> None:
+        assert self._file is not None
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        if self.index is not None:
+            self.index.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self) -> None:
+        """Flushes (and optionally fsyncs) any buffered rows."""
+        with self._lock:
+            if self._file is not None:
+                self._flush_file()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_file()
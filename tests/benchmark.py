@@ -0,0 +1,367 @@
+"""Offline benchmarks for the check cycle, log_results and the parsers.
+
+Everything runs against deterministic fakes: canned `ping`/`speedtest`/`wdutil`/
+`iperf3` output (tests/fake_tools.py) and the local stand-in gateway
+(tests/fake_gateway.py) on the HTTP backend. Deliberate waits such as poll intervals
+and settle sleeps are skipped, so the numbers show the logger's own overhead.
+
+Each benchmark reports time per operation and throughput (the median of several
+repeats), the peak traced allocation, and the bytes still allocated per operation.
+The full-cycle benchmark also breaks the cycle into per-stage latencies, taken from
+its span traces. Results can be saved and compared between commits:
+
+    python -m tests.benchmark --save before.json
+    python -m tests.benchmark --compare before.json   # exits 1 on a regression
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack, redirect_stdout
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+import gateway_http
+import main
+import ookla
+from tests import fake_gateway, fake_tools
+
+
+@dataclass
+class BenchResult:
+    name: str
+    # What one operation is, e.g. "parse", "row", "cycle".
+    unit: str
+    iterations: int
+    per_op_us: float
+    ops_per_second: float
+    peak_alloc_kib: float
+    retained_bytes_per_op: float
+    # Median milliseconds per stage, for benchmarks that are traced.
+    stages: dict[str, float] = field(default_factory=dict)
+
+
+def measure(
+    name: str,
+    unit: str,
+    func: Callable[[], object],
+    iterations: int,
+    repeats: int = 5,
+) -> BenchResult:
+    """Times `iterations` calls of func per repeat, then measures one pass under tracemalloc."""
+    func()  # Warm-up: imports, regex compilation, file creation
+    per_op_ns = []
+    for _ in range(repeats):
+        started = time.perf_counter_ns()
+        for _ in range(iterations):
+            func()
+        per_op_ns.append((time.perf_counter_ns() - started) / iterations)
+    per_op_us = statistics.median(per_op_ns) / 1000
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for _ in range(iterations):
+            func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return BenchResult(
+        name=name,
+        unit=unit,
+        iterations=iterations,
+        per_op_us=per_op_us,
+        ops_per_second=1e6 / per_op_us if per_op_us else float("inf"),
+        peak_alloc_kib=(peak - baseline) / 1024,
+        retained_bytes_per_op=(current - baseline) / iterations,
+    )
+
+
+# --- Benchmarks ---
+def bench_parsers(scale: int, repeats: int) -> list[BenchResult]:
+    local_ping = fake_tools.ping_output("google.com", count=40)
+    gateway_ping = fake_gateway.PING_OUTPUT
+    speed_page = fake_gateway.SPEED_PAGE.format(
+        nonce="n", rows=fake_gateway.SPEED_ROWS, refresh=""
+    )
+    speed_cells = [("downstream", "941.23"), ("upstream", "812.40")] * 2
+    progress = [json.loads(line) for line in fake_tools.speedtest_progress_lines()]
+
+    def track_speedtest() -> None:
+        tracker = ookla.ProgressTracker()
+        for event in progress:
+            tracker.feed(event, now=0.0)
+
+    return [
+        measure(
+            "parse_local_ping_results",
+            "parse",
+            lambda: main.parse_local_ping_results(local_ping),
+            200 * scale,
+            repeats,
+        ),
+        measure(
+            "parse_gateway_ping_results",
+            "parse",
+            lambda: main.parse_gateway_ping_results(gateway_ping),
+            1000 * scale,
+            repeats,
+        ),
+        measure(
+            "parse_gateway_speed_rows",
+            "parse",
+            lambda: main.parse_gateway_speed_rows(iter(speed_cells)),
+            1000 * scale,
+            repeats,
+        ),
+        measure(
+            "parse_gateway_page",
+            "parse",
+            lambda: gateway_http.parse_gateway_page(speed_page, "http://gw/cgi-bin/speed.ha"),
+            200 * scale,
+            repeats,
+        ),
+        measure(
+            f"speedtest_progress ({len(progress)} events)",
+            "speedtest",
+            track_speedtest,
+            20 * scale,
+            repeats,
+        ),
+    ]
+
+
+def sample_row() -> dict[str, str | float | int | None]:
+    """A full cycle's worth of data points, shaped like perform_checks builds them."""
+    row: dict[str, str | float | int | None] = {}
+    for index, key in enumerate(k for keys in main.PROBE_RESULT_KEYS.values() for k in keys):
+        row[key] = 10.0 + index * 1.25
+    row.update(
+        wifi_rssi="-55",
+        wifi_noise="-92",
+        wifi_channel="149",
+        wifi_tx_rate="864.0",
+        wifi_bssid="11:22:33:44:55:66",
+        download_bufferbloat_ms=6.5,
+        upload_bufferbloat_ms=None,
+    )
+    return row
+
+
+def bench_log_results(directory: str, scale: int, repeats: int) -> BenchResult:
+    row = sample_row()
+    with (
+        patch.object(config, "LOG_FILE", os.path.join(directory, "bench_log.csv")),
+        open(os.devnull, "w") as devnull,
+        redirect_stdout(devnull),
+    ):
+        try:
+            return measure(
+                "log_results", "row", lambda: main.log_results(row), 100 * scale, repeats
+            )
+        finally:
+            main.close_csv_sink()
+
+
+CYCLE_CONFIG: dict[str, Any] = {
+    "GATEWAY_BACKEND": "http",
+    "RUN_GATEWAY_PING_TEST": True,
+    "RUN_GATEWAY_SPEED_TEST_INTERVAL": 1,
+    "RUN_LOCAL_PING_TEST": True,
+    "RUN_LOCAL_GATEWAY_PING_TEST": True,
+    "RUN_LOCAL_SPEED_TEST": True,
+    "RUN_WIFI_DIAGNOSTICS_TEST": True,
+    "RUN_LAN_BUFFERBLOAT_TEST": True,
+    "LAN_TEST_TARGET_IP": "192.168.1.50",
+    "LAN_BUFFERBLOAT_TEST_DURATION": 2,
+    "LOCAL_PING_BACKEND": "subprocess",
+    "ENABLE_SPEEDTEST_LATENCY_SAMPLER": False,
+    "ENABLE_LATENCY_STREAM": False,
+    "ENABLE_CONDITIONAL_PROBES": False,
+    "ENABLE_CIRCUIT_BREAKER": False,
+    "ENABLE_ADAPTIVE_CADENCE": False,
+    "PROBE_SCHEDULES": {},
+    "PROBE_HISTORY_FILE": None,
+    "TRACE_DIR": None,
+    "LOG_RAW_GATEWAY_OUTPUT": False,
+    "ENABLE_SQLITE_STORE": False,
+    "ENABLE_BINARY_LOG": False,
+    "CYCLE_DEADLINE_SECONDS": None,
+}
+
+
+def _stage_medians(trace_dir: str) -> dict[str, float]:
+    durations: dict[str, list[float]] = {}
+    for name in os.listdir(trace_dir):
+        with open(os.path.join(trace_dir, name)) as f:
+            for event in json.load(f)["traceEvents"]:
+                if event["ph"] == "X":
+                    durations.setdefault(event["name"], []).append(event["dur"] / 1000)
+    return {name: statistics.median(values) for name, values in sorted(durations.items())}
+
+
+def bench_perform_checks(directory: str, scale: int, repeats: int) -> BenchResult:
+    speedtest = os.path.join(directory, "speedtest")
+    open(speedtest, "w").close()
+    trace_dir = os.path.join(directory, "traces")
+    with ExitStack() as stack:
+        gateway = stack.enter_context(fake_gateway.FakeGateway(access_code="bench"))
+        stack.enter_context(
+            patch.multiple(
+                config,
+                create=True,
+                **CYCLE_CONFIG,
+                LOG_FILE=os.path.join(directory, "bench_cycle_log.csv"),
+                GATEWAY_URL=gateway.base_url,
+                DIAG_URL=gateway.diag_url,
+                SPEED_TEST_URL=gateway.speed_url,
+            )
+        )
+        stack.enter_context(patch.object(main, "DEVICE_ACCESS_CODE", "bench"))
+        stack.enter_context(patch("time.sleep"))  # Poll intervals and settle delays
+        stack.enter_context(fake_tools.fake_tools(speedtest))
+        stack.enter_context(redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        stack.callback(main.close_gateway_http_client)
+        stack.callback(main.close_csv_sink)
+
+        result = measure("perform_checks", "cycle", main.perform_checks, 2 * scale, repeats)
+        # A separate traced pass, so writing traces does not count toward the timings.
+        with patch.object(config, "TRACE_DIR", trace_dir):
+            for _ in range(2 * scale):
+                main.perform_checks()
+        result.stages = _stage_medians(trace_dir)
+    return result
+
+
+BENCHMARKS = ("parsers", "log_results", "perform_checks")
+
+
+def run_benchmarks(
+    only: Optional[Sequence[str]] = None, scale: int = 1, repeats: int = 5
+) -> list[BenchResult]:
+    """Runs the selected benchmark groups (all by default) in a scratch directory."""
+    results: list[BenchResult] = []
+    with tempfile.TemporaryDirectory() as directory:
+        for group in only or BENCHMARKS:
+            if group == "parsers":
+                results += bench_parsers(scale, repeats)
+            elif group == "log_results":
+                results.append(bench_log_results(directory, scale, repeats))
+            elif group == "perform_checks":
+                results.append(bench_perform_checks(directory, scale, repeats))
+            else:
+                raise ValueError(f"Unknown benchmark group: {group}")
+    return results
+
+
+# --- Reporting ---
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path: str, results: Sequence[BenchResult]) -> None:
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": [asdict(result) for result in results],
+            },
+            f,
+            indent=2,
+        )
+
+
+def format_results(results: Sequence[BenchResult]) -> str:
+    out = io.StringIO()
+    out.write(f"{'Benchmark':<38}{'us/op':>12}{'ops/s':>12}{'peak KiB':>10}{'kept B/op':>11}\n")
+    for r in results:
+        out.write(
+            f"{r.name:<38}{r.per_op_us:>12.1f}{r.ops_per_second:>12.1f}"
+            f"{r.peak_alloc_kib:>10.1f}{r.retained_bytes_per_op:>11.1f}\n"
+        )
+        for stage, ms in r.stages.items():
+            out.write(f"    {stage:<46}{ms:>10.3f} ms\n")
+    return out.getvalue()
+
+
+def compare_results(
+    baseline_path: str, results: Sequence[BenchResult], tolerance: float
+) -> tuple[str, list[str]]:
+    """A comparison table against saved results and the names of regressed benchmarks."""
+    with open(baseline_path) as f:
+        saved = json.load(f)
+    baseline = {r["name"]: r for r in saved["results"]}
+    out = io.StringIO()
+    out.write(f"Compared with {baseline_path} (commit {saved.get('commit') or 'unknown'}):\n")
+    regressions = []
+    for r in results:
+        before = baseline.get(r.name)
+        if before is None or not before["per_op_us"]:
+            continue
+        change = r.per_op_us / before["per_op_us"] - 1
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(r.name)
+        out.write(
+            f"{r.name:<38}{before['per_op_us']:>12.1f} -> {r.per_op_us:>10.1f} us/op"
+            f"{change:>+9.1%}{flag}\n"
+        )
+    return out.getvalue(), regressions
+
+
+def cli(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for Simple Gateway Logger.")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Benchmark groups to run.")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply iteration counts.")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repeats per benchmark.")
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Compare with results saved by --save.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Slowdown (fraction) beyond which --compare reports a regression.",
+    )
+    args = parser.parse_args(argv)
+    results = run_benchmarks(args.only, args.scale, args.repeats)
+    print(format_results(results), end="")
+    if args.save:
+        save_results(args.save, results)
+        print(f"Saved results to {args.save}")
+    if args.compare:
+        table, regressions = compare_results(args.compare, results, args.tolerance)
+        print(table, end="")
+        if regressions:
+            print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main
+
+
+@pytest.fixture(autouse=True)
+def close_result_sinks():
+    """Each test starts with fresh result sinks, so patched `open` calls take effect."""
+    yield
+    main.close_csv_sink()
+    main.close_result_store()
+    main.close_binary_log()
+    main.close_probe_history()
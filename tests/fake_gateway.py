@@ -0,0 +1,222 @@
+"""Local stand-in for the gateway's diag.ha and speed.ha pages.
+
+Serves canned pages that mimic the real gateway's forms so the HTTP backend can be
+tested and benchmarked offline. Run it standalone to point either backend at it:
+
+    python -m tests.fake_gateway --port 8254
+"""
+
+import argparse
+import hashlib
+import secrets
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+PING_OUTPUT = """PING google.com (142.250.191.174): 56 data bytes
+64 bytes from 142.250.191.174: icmp_seq=0 ttl=115 time=14.8 ms
+64 bytes from 142.250.191.174: icmp_seq=1 ttl=115 time=15.2 ms
+64 bytes from 142.250.191.174: icmp_seq=2 ttl=115 time=15.5 ms
+
+--- google.com ping statistics ---
+3 packets transmitted, 3 packets received, 0% packet loss
+round-trip min/avg/max = 14.8/15.2/15.5 ms"""
+
+# Pages still "in progress" auto-refresh like the real gateway, so a browser also polls.
+REFRESH = '<meta http-equiv="refresh" content="1">'
+
+DIAG_PAGE = """<html><head><title>Diagnostics</title>{refresh}</head><body>
+<form name="pform" action="/cgi-bin/diag.ha" method="post">
+<input type="hidden" name="nonce" value="{nonce}">
+<label for="webaddress">IP Address or Host Name</label>
+<input type="text" id="webaddress" name="webaddress" value="{target}">
+<input type="submit" name="Ping" value="Ping">
+<input type="submit" name="Traceroute" value="Traceroute">
+<textarea id="progress" name="progress" rows="20" cols="80" readonly>{progress}</textarea>
+</form></body></html>"""
+
+LOGIN_PAGE = """<html><head><title>Login</title></head><body>
+<form name="pform" action="/cgi-bin/speed.ha" method="post">
+<input type="hidden" name="nonce" value="{nonce}">
+<label for="password">Device Access Code</label>
+<input type="password" id="password" name="password" value="">
+<input type="hidden" name="hashpassword" value="">
+<input type="submit" name="Continue" value="Continue">
+</form></body></html>"""
+
+SPEED_PAGE = """<html><head><title>Speed Test</title>{refresh}</head><body>
+<form name="pform" action="/cgi-bin/speed.ha" method="post">
+<input type="hidden" name="nonce" value="{nonce}">
+<input type="submit" name="run" value="Run Speed Test">
+</form>
+<table class="grid table100">
+<tr><th>Test Date</th><th>Direction</th><th>Speed (Mbps)</th></tr>
+{rows}
+</table></body></html>"""
+
+SPEED_ROWS = """<tr><td>10/17/2026 10:00:00</td><td>downstream</td><td>941.23</td></tr>
+<tr><td>10/17/2026 10:00:00</td><td>upstream</td><td>812.40</td></tr>"""
+
+
+class FakeGateway:
+    """Threaded HTTP server imitating the gateway diagnostic pages.
+
+    `ping_polls` / `speed_polls` set how many page loads a test stays "in progress",
+    which exercises the backend's polling loop.
+    """
+
+    def __init__(
+        self,
+        access_code: str = "test-code",
+        ping_polls: int = 1,
+        speed_polls: int = 1,
+        port: int = 0,
+    ) -> None:
+        self.access_code = access_code
+        self.ping_polls = ping_polls
+        self.speed_polls = speed_polls
+        self.nonce = secrets.token_hex(8)
+        self.sessions: set[str] = set()
+        self.requests: list[tuple[str, str]] = []
+        self.connections = 0
+        self._ping_remaining: Optional[int] = None
+        self._ping_target = ""
+        self._speed_remaining: Optional[int] = None
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def diag_url(self) -> str:
+        return f"{self.base_url}/cgi-bin/diag.ha"
+
+    @property
+    def speed_url(self) -> str:
+        return f"{self.base_url}/cgi-bin/speed.ha"
+
+    def start(self) -> "FakeGateway":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "FakeGateway":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    # --- Page logic ---
+    def _diag(self, form: dict[str, str]) -> str:
+        with self._lock:
+            if "Ping" in form:
+                self._ping_target = form.get("webaddress", "")
+                self._ping_remaining = self.ping_polls
+            refresh = ""
+            if self._ping_remaining is None:
+                progress = ""
+            elif self._ping_remaining > 0:
+                self._ping_remaining -= 1
+                progress = f"PING {self._ping_target}: 56 data bytes"
+                refresh = REFRESH
+            else:
+                progress = PING_OUTPUT.replace("google.com", self._ping_target or "google.com")
+        return DIAG_PAGE.format(
+            nonce=self.nonce, target=self._ping_target, progress=progress, refresh=refresh
+        )
+
+    def _speed(self, form: dict[str, str], session: Optional[str]) -> tuple[str, Optional[str]]:
+        new_session = None
+        if session not in self.sessions:
+            expected = hashlib.md5((self.access_code + self.nonce).encode()).hexdigest()
+            if form.get("hashpassword") != expected:
+                return LOGIN_PAGE.format(nonce=self.nonce), None
+            new_session = secrets.token_hex(8)
+            self.sessions.add(new_session)
+        with self._lock:
+            if "run" in form:
+                self._speed_remaining = self.speed_polls
+            refresh = ""
+            if self._speed_remaining is None:
+                rows = ""
+            elif self._speed_remaining > 0:
+                self._speed_remaining -= 1
+                rows = '<tr><td colspan="3">Test in progress...</td></tr>'
+                refresh = REFRESH
+            else:
+                rows = SPEED_ROWS
+        return SPEED_PAGE.format(nonce=self.nonce, rows=rows, refresh=refresh), new_session
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real gateway
+
+            def setup(self) -> None:
+                super().setup()
+                with gateway._lock:
+                    gateway.connections += 1
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+            def _respond(self, form: dict[str, str]) -> None:
+                path = urllib.parse.urlsplit(self.path).path
+                gateway.requests.append((self.command, path))
+                cookie = self.headers.get("Cookie", "")
+                session = dict(
+                    part.strip().split("=", 1) for part in cookie.split(";") if "=" in part
+                ).get("SESSION")
+                new_session = None
+                if path == "/cgi-bin/diag.ha":
+                    body = gateway._diag(form)
+                elif path == "/cgi-bin/speed.ha":
+                    body, new_session = gateway._speed(form, session)
+                elif path == "/":
+                    body = "<html><body>Home</body></html>"
+                else:
+                    self.send_error(404)
+                    return
+                payload = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                if new_session:
+                    self.send_header("Set-Cookie", f"SESSION={new_session}; Path=/")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self) -> None:
+                query = urllib.parse.urlsplit(self.path).query
+                self._respond(dict(urllib.parse.parse_qsl(query, keep_blank_values=True)))
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode()
+                self._respond(dict(urllib.parse.parse_qsl(body, keep_blank_values=True)))
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve canned gateway diagnostic pages.")
+    parser.add_argument("--port", type=int, default=8254)
+    parser.add_argument("--access-code", default="test-code")
+    args = parser.parse_args()
+    fake = FakeGateway(access_code=args.access_code, port=args.port)
+    print(f"Fake gateway listening on {fake.base_url} (access code: {args.access_code})")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
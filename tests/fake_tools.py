@@ -0,0 +1,165 @@
+"""Deterministic stand-ins for the command-line tools the probes shell out to.
+
+`ping`, `speedtest`, `wdutil`, `route`, `arp` and `iperf3` are answered with canned
+macOS-style output, so a full check cycle runs offline with the same parsing work
+as a real one. Install them with `fake_tools()`, which patches `subprocess.run` and
+`subprocess.Popen` (the same module objects ookla.py uses).
+"""
+
+import io
+import json
+import os
+import subprocess
+from contextlib import ExitStack, contextmanager
+from typing import Any, Generator, Sequence
+from unittest.mock import patch
+
+
+def ping_output(target: str, count: int = 4, base_ms: float = 14.0) -> str:
+    """`ping -c <count>` output with a deterministic spread of per-packet times."""
+    times = [base_ms + (i * 7 % 11) / 10 for i in range(count)]
+    lines = [f"PING {target} (142.250.191.174): 56 data bytes"]
+    lines += [
+        f"64 bytes from 142.250.191.174: icmp_seq={i} ttl=115 time={t:.3f} ms"
+        for i, t in enumerate(times)
+    ]
+    avg = sum(times) / count
+    stddev = (sum((t - avg) ** 2 for t in times) / count) ** 0.5
+    lines += [
+        "",
+        f"--- {target} ping statistics ---",
+        f"{count} packets transmitted, {count} packets received, 0.0% packet loss",
+        f"round-trip min/avg/max/stddev = {min(times):.3f}/{avg:.3f}/{max(times):.3f}/"
+        f"{stddev:.3f} ms",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+WDUTIL_OUTPUT = """————————————————————————————————————————————————————————————————————
+WIFI
+————————————————————————————————————————————————————————————————————
+    MAC Address          : aa:bb:cc:dd:ee:ff (hw=aa:bb:cc:dd:ee:ff)
+    Interface Name       : en0
+    Power                : On [On]
+    Op Mode              : STA
+    SSID                 : HomeNetwork
+    Security             : WPA2 Personal
+    PHY Mode             : 11ax
+    Channel              : 5g149/80
+    RSSI                 : -55 dBm
+    Noise                : -92 dBm
+    Tx Rate              : 864.0 Mbps
+"""
+
+ROUTE_OUTPUT = """   route to: default
+destination: default
+       mask: default
+    gateway: 192.168.1.254
+  interface: en0
+"""
+
+ARP_OUTPUT = "? (192.168.1.254) at 11:22:33:44:55:66 on en0 ifscope [ethernet]\n"
+
+
+def speedtest_progress_lines(seconds: int = 10, events_per_second: int = 4) -> list[str]:
+    """
+    `speedtest --format=json --progress=yes` output: progress events, then the result.
+    Each transfer ramps up over its first second, then holds a steady rate.
+    """
+    step_ms = 1000 // events_per_second
+    rates = {"download": 11_000_000, "upload": 9_000_000}  # Bytes per event at full rate
+    events: list[dict[str, Any]] = [
+        {"type": "testStart"},
+        {"type": "ping", "ping": {"jitter": 0.4, "latency": 12.1, "progress": 1.0}},
+    ]
+    for phase, full_step in rates.items():
+        transferred = 0
+        for k in range(1, seconds * events_per_second + 1):
+            transferred += full_step // 2 if k <= events_per_second else full_step
+            events.append(
+                {
+                    "type": phase,
+                    phase: {
+                        "bandwidth": full_step * events_per_second,
+                        "bytes": transferred,
+                        "elapsed": step_ms * k,
+                        "progress": k / (seconds * events_per_second),
+                        "latency": {"iqm": 18.0 + k % 5},
+                    },
+                }
+            )
+    events.append(
+        {
+            "type": "result",
+            "ping": {"jitter": 0.4, "latency": 12.1},
+            "download": {
+                "bandwidth": rates["download"] * events_per_second,
+                "latency": {"iqm": 19.5},
+            },
+            "upload": {"bandwidth": rates["upload"] * events_per_second, "latency": {"iqm": 21.0}},
+            "packetLoss": 0.0,
+        }
+    )
+    return [json.dumps(event) + "\n" for event in events]
+
+
+class FakeProcess:
+    """Popen stand-in whose stdout is canned text and which has already exited."""
+
+    def __init__(self, stdout: str = "", returncode: int = 0) -> None:
+        self.stdout = io.StringIO(stdout)
+        self.stderr = io.StringIO("")
+        self.returncode = returncode
+        self.pid = 4242
+
+    def poll(self) -> int:
+        return self.returncode
+
+    def wait(self, timeout: float | None = None) -> int:
+        return self.returncode
+
+    def kill(self) -> None:
+        pass
+
+    def terminate(self) -> None:
+        pass
+
+
+def _output_for(command: Sequence[str] | str) -> str:
+    argv = command.split() if isinstance(command, str) else list(command)
+    tool = os.path.basename(argv[0]) if argv else ""
+    if tool == "sudo" and "wdutil" in argv:
+        return WDUTIL_OUTPUT
+    if tool == "ping":
+        count = int(argv[argv.index("-c") + 1]) if "-c" in argv else 4
+        return ping_output(argv[-1], count)
+    if tool == "route":
+        return ROUTE_OUTPUT
+    if tool == "arp":
+        return ARP_OUTPUT
+    if tool == "speedtest":
+        return "".join(speedtest_progress_lines())
+    return ""  # iperf3, pkill, ps: nothing the probes parse
+
+
+def fake_run(
+    command: Sequence[str] | str, *args: Any, **kwargs: Any
+) -> subprocess.CompletedProcess:
+    return subprocess.CompletedProcess(command, 0, stdout=_output_for(command), stderr="")
+
+
+def fake_popen(command: Sequence[str] | str, *args: Any, **kwargs: Any) -> FakeProcess:
+    return FakeProcess(_output_for(command))
+
+
+@contextmanager
+def fake_tools(speedtest_path: str) -> Generator[None, None, None]:
+    """
+    Routes the probes' subprocesses to the canned outputs. `speedtest_path` must be an
+    existing file; it is where main.py will "find" the Ookla CLI.
+    """
+    with ExitStack() as stack:
+        stack.enter_context(patch("main.subprocess.run", side_effect=fake_run))
+        stack.enter_context(patch("main.subprocess.Popen", side_effect=fake_popen))
+        stack.enter_context(patch("main.SPEEDTEST_PATHS", (speedtest_path,)))
+        yield
@@ -0,0 +1,45 @@
+import json
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main
+from tests import benchmark
+
+
+def test_full_cycle_benchmark_parses_every_fake_tool() -> None:
+    logged = []
+    log_results = main.log_results
+    with patch.object(main, "log_results", lambda row: logged.append(row) or log_results(row)):
+        (result,) = benchmark.run_benchmarks(only=("perform_checks",), repeats=1)
+
+    # The canned outputs fill every column the cycle logs.
+    assert [key for key, value in logged[-1].items() if value in (None, "N/A")] == []
+
+    assert result.unit == "cycle" and result.ops_per_second > 0
+    # Each probe ran against its fake and showed up as a traced stage.
+    assert {
+        "run_wifi_diagnostics_task",
+        "run_local_ping_task (WAN)",
+        "run_local_speed_test_task",
+        "run_lan_bufferbloat_task",
+        "run_http_ping_test_task",
+        "run_http_speed_test_task",
+        "log_results",
+    } <= set(result.stages)
+
+
+def test_saved_results_flag_regressions(tmp_path) -> None:
+    results = benchmark.run_benchmarks(only=("parsers",), repeats=1)
+    path = str(tmp_path / "before.json")
+    benchmark.save_results(path, results)
+    saved = json.loads(open(path).read())
+    assert [r["name"] for r in saved["results"]] == [r.name for r in results]
+
+    results[0].per_op_us *= 2
+    table, regressions = benchmark.compare_results(path, results, tolerance=0.25)
+
+    assert regressions == [results[0].name]
+    assert "+100.0%  REGRESSION" in table
@@ -0,0 +1,128 @@
+import csv
+import io
+import math
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import binlog
+
+
+def sample_rows(count: int) -> list[tuple[str, dict]]:
+    """Rows shaped like data_points: mostly-stable floats, N/A gaps, Wi-Fi text, markers."""
+    rng = random.Random(7)
+    start = datetime(2026, 10, 17, 0, 0, 0)
+    rows = []
+    for i in range(count):
+        # Mostly on the one-minute grid, with the odd late cycle.
+        ts = start + timedelta(seconds=60 * i + (3 if i % 17 == 0 else 0))
+        row: dict = {
+            "Gateway_LossPercentage": 0.0,
+            "Gateway_RTT_avg_ms": round(rng.uniform(1, 3), 3),
+            "Local_WAN_RTT_avg_ms": round(rng.uniform(15, 25), 3),
+            "Local_Downstream_Speed": 450.0 if i % 10 else None,
+            "Stream_WAN_Outages": 0,
+            "WiFi_BSSID": "a1:b2:c3:d4:e5:f6",
+            "WiFi_RSSI": "-55" if i % 30 else "-60",
+            "Gateway_Downstream_Speed": "TIMEOUT" if i == 5 else None,
+        }
+        row.update({f"Unused_{n}": None for n in range(20)})
+        rows.append((ts.strftime("%Y-%m-%d %H:%M:%S"), row))
+    return rows
+
+
+def csv_size(rows: list[tuple[str, dict]]) -> int:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for timestamp, row in rows:
+        writer.writerow(
+            [timestamp]
+            + [
+                f"{v:.3f}" if isinstance(v, float) else "N/A" if v is None else str(v)
+                for v in row.values()
+            ]
+        )
+    return len(out.getvalue())
+
+
+def test_round_trip_and_compression(tmp_path) -> None:
+    path = str(tmp_path / "log.sglb")
+    rows = sample_rows(500)
+    writer = binlog.BinaryLogWriter(path)
+    for timestamp, row in rows:
+        writer.append(timestamp, row)
+    writer.close()
+
+    decoded = list(binlog.read_binary_log(path))
+    assert len(decoded) == len(rows)
+    for (timestamp, row), (ts, got) in zip(rows, decoded):
+        assert ts.strftime("%Y-%m-%d %H:%M:%S") == timestamp
+        for name, value in row.items():
+            decoded_value = got[name]
+            if isinstance(value, (int, float)):
+                assert isinstance(decoded_value, float) and math.isclose(decoded_value, value)
+            else:
+                assert decoded_value == value
+    assert os.path.getsize(path) * 4 < csv_size(rows)
+
+
+def test_reopen_starts_new_block_and_truncated_tail_is_dropped(tmp_path) -> None:
+    path = str(tmp_path / "log.sglb")
+    first = binlog.BinaryLogWriter(path)
+    first.append("2026-10-17 00:00:00", {"A": 1.5, "B": None})
+    first.close()
+    second = binlog.BinaryLogWriter(path)
+    second.append("2026-10-17 00:01:00", {"A": 2.5, "B": "x", "C": -1.0})  # New column
+    second.append("2026-10-17 00:02:00", {"A": 2.5, "B": "x", "C": -1.0})
+    second.close()
+
+    rows = [row for _, row in binlog.read_binary_log(path)]
+    assert rows == [
+        {"A": 1.5, "B": None},
+        {"A": 2.5, "B": "x", "C": -1.0},
+        {"A": 2.5, "B": "x", "C": -1.0},
+    ]
+
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 1)
+    assert len(list(binlog.read_binary_log(path))) == 2
+
+
+def test_writers_reopening_the_file_continue_its_last_block(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(binlog, "MAX_BLOCK_ROWS", 150)
+    path = str(tmp_path / "log.sglb")
+    rows = sample_rows(200)
+    for timestamp, row in rows:  # One short-lived writer per row, as with run-once
+        writer = binlog.BinaryLogWriter(path)
+        writer.append(timestamp, row)
+        writer.close()
+
+    with open(path, "rb") as stream:
+        binlog._read_header(stream, path)
+        kinds = [kind for kind, _ in binlog._records(stream)]
+    assert kinds.count(binlog._SCHEMA) == 2  # 150 rows, then a fresh block
+    decoded = list(binlog.read_binary_log(path))
+    assert [ts.strftime("%Y-%m-%d %H:%M:%S") for ts, _ in decoded] == [t for t, _ in rows]
+    assert decoded[-1][1]["WiFi_BSSID"] == "a1:b2:c3:d4:e5:f6"
+    assert os.path.getsize(path) * 4 < csv_size(rows)
+
+
+def test_writer_cuts_off_a_truncated_row_before_appending(tmp_path) -> None:
+    path = str(tmp_path / "log.sglb")
+    writer = binlog.BinaryLogWriter(path)
+    for i in range(3):
+        writer.append(f"2026-10-17 00:0{i}:00", {"a": float(i + 1), "b": "x"})
+    writer.close()
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 3)
+
+    writer = binlog.BinaryLogWriter(path)
+    for i in range(3, 6):
+        writer.append(f"2026-10-17 00:0{i}:00", {"a": float(i + 1), "b": "y"})
+    writer.close()
+
+    rows = [(row["a"], row["b"]) for _, row in binlog.read_binary_log(path)]
+    assert rows == [(1.0, "x"), (2.0, "x"), (4.0, "y"), (5.0, "y"), (6.0, "y")]
@@ -0,0 +1,164 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import breaker
+import config
+import main
+
+
+def make_breaker(now: list[float], transitions: list) -> breaker.CircuitBreaker:
+    return breaker.CircuitBreaker(
+        "gateway_speed",
+        failure_threshold=2,
+        base_cooldown=60,
+        max_cooldown=200,
+        clock=lambda: now[0],
+        on_transition=lambda name, old, new, reason: transitions.append((old, new)),
+    )
+
+
+def test_breaker_opens_after_consecutive_failures_and_backs_off() -> None:
+    now = [0.0]
+    transitions: list = []
+    cb = make_breaker(now, transitions)
+
+    cb.record(False)
+    cb.record(True)  # A success in between resets the count
+    cb.record(False)
+    assert cb.allow() and cb.state == "closed"
+    cb.record(False)
+    assert cb.state == "open" and cb.blocking() and not cb.allow()
+
+    now[0] = 60
+    assert not cb.blocking() and cb.state == "open"  # Only allow() starts the trial
+    assert cb.allow() and cb.state == "half_open"
+    cb.record(False)
+    assert cb.retry_at == 180  # Cooldown doubled
+    now[0] = 179
+    assert not cb.allow()
+    now[0] = 180
+    assert cb.allow()
+    cb.record(False)
+    assert cb.retry_at == 380  # Capped at max_cooldown
+
+    now[0] = 380
+    assert cb.allow()
+    cb.record(True)
+    assert cb.state == "closed" and cb.cooldown == 60
+    assert transitions == [
+        ("closed", "open"),
+        ("open", "half_open"),
+        ("half_open", "open"),
+        ("open", "half_open"),
+        ("half_open", "open"),
+        ("open", "half_open"),
+        ("half_open", "closed"),
+    ]
+
+
+def test_open_breaker_skips_chrome_and_logs_skipped(monkeypatch: pytest.MonkeyPatch) -> None:
+    for name, value in {
+        "ENABLE_CIRCUIT_BREAKER": True,
+        "CIRCUIT_BREAKER_FAILURES": 2,
+        "RUN_LOCAL_PING_TEST": False,
+        "RUN_LOCAL_GATEWAY_PING_TEST": False,
+        "RUN_LOCAL_SPEED_TEST": False,
+        "RUN_WIFI_DIAGNOSTICS_TEST": False,
+        "RUN_LAN_BUFFERBLOAT_TEST": False,
+        "RUN_GATEWAY_PING_TEST": True,
+        "RUN_GATEWAY_SPEED_TEST_INTERVAL": 0,
+        "GATEWAY_BACKEND": "selenium",
+        "REUSE_WEBDRIVER_SESSION": False,
+    }.items():
+        monkeypatch.setattr(config, name, value, raising=False)
+    monkeypatch.setattr(main, "probe_breakers", {})
+    start_chrome = MagicMock(return_value=(None, None))  # Chrome fails to start
+    monkeypatch.setattr(main, "_start_webdriver", start_chrome)
+    logged = []
+    monkeypatch.setattr(main, "log_results", lambda results: logged.append(results) or {})
+
+    for _ in range(3):
+        main.perform_checks()
+
+    assert start_chrome.call_count == 2  # The third cycle never starts Chrome
+    assert main.probe_breakers["gateway_ping"].state == "open"
+    assert logged[-1]["gateway_rtt_avg_ms"] == main.SKIPPED
+    assert logged[0].get("gateway_rtt_avg_ms") != main.SKIPPED
+
+
+def test_breaker_is_asked_only_when_a_conditional_probe_runs(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    for name, value in {
+        "ENABLE_CIRCUIT_BREAKER": True,
+        "ENABLE_CONDITIONAL_PROBES": True,
+        "CONDITIONAL_PROBE_RULES": {
+            "local_speed": [("local_wan_rtt_avg_ms", ">", 50.0)],
+            "gateway_speed": [("local_wan_rtt_avg_ms", ">", 50.0)],
+        },
+        "CONDITIONAL_PROBE_BASELINE_RUNS": {},
+        "RUN_LOCAL_PING_TEST": True,
+        "RUN_LOCAL_GATEWAY_PING_TEST": False,
+        "RUN_LOCAL_SPEED_TEST": True,
+        "RUN_WIFI_DIAGNOSTICS_TEST": False,
+        "RUN_LAN_BUFFERBLOAT_TEST": False,
+        "RUN_GATEWAY_PING_TEST": False,
+        "RUN_GATEWAY_SPEED_TEST_INTERVAL": 100,
+        "GATEWAY_BACKEND": "http",
+    }.items():
+        monkeypatch.setattr(config, name, value, raising=False)
+    now = [0.0]
+    transitions: list = []
+    monkeypatch.setattr(main, "breaker_transitions", [])
+    monkeypatch.setattr(main, "expensive_probe_last_run", {})
+    monkeypatch.setattr(main, "DEVICE_ACCESS_CODE", "1234")
+    monkeypatch.setattr(main, "run_counter", 0)
+    breakers = {}
+    for probe in ("local_speed", "gateway_speed"):
+        breakers[probe] = make_breaker(now, transitions)
+        breakers[probe].name = probe
+        breakers[probe].on_transition = main.log_breaker_transition
+        breakers[probe].record(False)
+        breakers[probe].record(False)
+    monkeypatch.setattr(main, "probe_breakers", breakers)
+    main.breaker_transitions.clear()
+    rtt = [10.0]
+    monkeypatch.setattr(main, "run_local_ping_task", lambda target: {"rtt_avg_ms": rtt[0]})
+    speed_test = MagicMock(return_value={"local_downstream_speed": 500.0})
+    monkeypatch.setattr(main, "run_local_speed_test_task", speed_test)
+    monkeypatch.setattr(main, "run_http_speed_test_task", MagicMock(return_value={}))
+    logged = []
+    monkeypatch.setattr(main, "log_results", lambda results: logged.append(results) or {})
+
+    # Healthy pings: no rule fires, so an elapsed cooldown is left for a cycle that runs.
+    now[0] = 100.0
+    main.perform_checks()
+    assert [breakers[p].state for p in ("local_speed", "gateway_speed")] == ["open", "open"]
+    assert main.expensive_probe_last_run == {}
+    assert logged[-1].get("breaker_transitions") is None
+
+    # A rule fires while the cooldown is still running: skipped, and not noted as run.
+    now[0] = 30.0
+    rtt[0] = 80.0
+    main.perform_checks()
+    assert logged[-1]["local_downstream_speed"] == main.SKIPPED
+    assert main.expensive_probe_last_run == {}
+    speed_test.assert_not_called()
+
+    # Past the cooldown the probes run their trials, and the row records the transitions.
+    now[0] = 100.0
+    main.perform_checks()
+    assert breakers["local_speed"].state == "closed"
+    assert breakers["gateway_speed"].state == "open"  # Its trial returned no results
+    assert main.expensive_probe_last_run == {"local_speed": 3, "gateway_speed": 3}
+    assert logged[-1]["breaker_transitions"].split(" | ") == [
+        "local_speed open->half_open (cooldown elapsed, trying once)",
+        "local_speed half_open->closed (trial run succeeded)",
+        "gateway_speed open->half_open (cooldown elapsed, trying once)",
+        "gateway_speed half_open->open (trial run failed; retrying in 120s)",
+    ]
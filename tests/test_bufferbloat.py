@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 from unittest.mock import mock_open, patch
 
 import pytest
@@ -8,6 +9,8 @@ import pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import config
+import latency
+import main
 from main import Colors, log_results, perform_checks, run_lan_bufferbloat_task
 
 
@@ -54,7 +57,7 @@ def test_log_results_includes_bufferbloat_fields_and_highlighting(
 
     # CSV header contains the new fields
     handle = mock_open_file()
-    header = handle.mock_calls[1][1][0]
+    header = handle.write.call_args_list[0].args[0]
     assert "Download_Bufferbloat_ms" in header
     assert "Upload_Bufferbloat_ms" in header
 
@@ -125,6 +128,105 @@ def test_perform_checks_computes_bufferbloat(
     assert passed.get("upload_bufferbloat_ms") == pytest.approx(21.0)
 
 
+@patch("main.run_wifi_diagnostics_task", return_value={})
+@patch("main.run_local_ping_task")
+@patch("main.run_local_speed_test_task")
+@patch("main.log_results")
+@patch("main.get_access_code", return_value="code")
+def test_perform_checks_prefers_sampled_speedtest_latency(
+    _access, mock_log_results, mock_local_speed, mock_local_ping, _wifi, monkeypatch
+) -> None:
+    """Medians sampled during the speed test replace the separate idle ping and Ookla IQM."""
+    import main as main_module
+
+    monkeypatch.setattr(config, "RUN_LOCAL_PING_TEST", True)
+    monkeypatch.setattr(config, "RUN_LOCAL_GATEWAY_PING_TEST", False)
+    monkeypatch.setattr(config, "RUN_LOCAL_SPEED_TEST", True)
+    monkeypatch.setattr(config, "RUN_GATEWAY_SPEED_TEST_INTERVAL", 0)
+    mock_local_ping.return_value = {"rtt_avg_ms": 20.0}
+    mock_local_speed.return_value = {
+        "local_latency_down_load_ms": 55.0,
+        "local_latency_up_load_ms": 41.0,
+        "speedtest_wan_idle_rtt_p50_ms": 12.0,
+        "speedtest_wan_download_rtt_p50_ms": 30.0,
+        "speedtest_wan_upload_rtt_p50_ms": 90.0,
+    }
+    main_module.run_counter = 0
+
+    perform_checks()
+
+    passed = mock_log_results.call_args.args[0]
+    assert passed.get("download_bufferbloat_ms") == pytest.approx(18.0)
+    assert passed.get("upload_bufferbloat_ms") == pytest.approx(78.0)
+
+
+class _InstantSampler(latency.PhasedLatencySampler):
+    """Sampler without probe threads; the test feeds samples through record()."""
+
+    instances: list["_InstantSampler"] = []
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        _InstantSampler.instances.append(self)
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+@patch("main.os.path.exists", return_value=True)
+@patch("main.subprocess.Popen")
+def test_local_speed_test_samples_latency_per_ookla_phase(
+    mock_popen, _exists, monkeypatch
+) -> None:
+    monkeypatch.setattr(config, "ENABLE_SPEEDTEST_LATENCY_SAMPLER", True)
+    monkeypatch.setattr(main.latency, "PhasedLatencySampler", _InstantSampler)
+    _InstantSampler.instances.clear()
+
+    # Each progress line is followed by the probes taken once its phase is active.
+    progress = [
+        ('{"type":"testStart"}', "idle", [10.0, 11.0, 12.0]),
+        ('{"type":"ping","ping":{"progress":1.0}}', "idle", [13.0]),
+        ('{"type":"download","download":{"progress":0.5}}', "download", [40.0, 50.0, None]),
+        ('{"type":"upload","upload":{"progress":0.5}}', "upload", [80.0, 90.0, 100.0]),
+        (
+            '{"type":"result","download":{"bandwidth":12500000},"upload":{"bandwidth":1250000}}',
+            None,
+            [],
+        ),
+    ]
+
+    def stdout_lines():
+        for line, phase, samples in progress:
+            yield line + "\n"
+            sampler = _InstantSampler.instances[0]
+            # Lines are read ahead on a reader thread; wait until this one is consumed.
+            deadline = time.monotonic() + 2
+            while sampler.phase != phase and time.monotonic() < deadline:
+                time.sleep(0.001)
+            for rtt in samples:
+                sampler.record("wan", rtt)
+                sampler.record("gw", None if rtt is None else rtt / 10)
+
+    process = mock_popen.return_value
+    process.stdout = stdout_lines()
+    process.stderr.read.return_value = ""
+    process.wait.return_value = 0
+
+    results = main.run_local_speed_test_task()
+
+    assert results is not None
+    assert "--progress=yes" in mock_popen.call_args.args[0]
+    assert results.get("local_downstream_speed") == 100.0
+    assert results.get("speedtest_wan_idle_rtt_p50_ms") == pytest.approx(11.5)
+    assert results.get("speedtest_wan_download_rtt_p50_ms") == pytest.approx(45.0)
+    assert results.get("speedtest_wan_download_loss_percentage") == pytest.approx(100 / 3)
+    assert results.get("speedtest_wan_upload_rtt_p50_ms") == pytest.approx(90.0)
+    assert results.get("speedtest_gw_upload_rtt_p50_ms") == pytest.approx(9.0)
+
+
 @patch("main.subprocess.run")
 @patch("main.subprocess.Popen")
 @patch("main.run_local_ping_task")
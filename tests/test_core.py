@@ -88,6 +88,21 @@ def test_parse_local_ping_success():
     assert result.get("ping_stddev") == 0.123
 
 
+def test_parse_local_ping_percentiles_from_packet_times():
+    """Per-packet time= values feed the p50/p95/p99 fields."""
+    output = (
+        "64 bytes from 1.1.1.1: icmp_seq=0 ttl=57 time=10.0 ms\n"
+        "64 bytes from 1.1.1.1: icmp_seq=1 ttl=57 time=20.0 ms\n"
+        "64 bytes from 1.1.1.1: icmp_seq=2 ttl=57 time=30.0 ms\n"
+        "3 packets transmitted, 3 packets received, 0.0% packet loss\n"
+        "round-trip min/avg/max/stddev = 10.0/20.0/30.0/8.165 ms\n"
+    )
+    result = parse_local_ping_results(output)
+    assert result.get("rtt_p50_ms") == 20.0
+    assert result.get("rtt_p95_ms") == pytest.approx(29.0)
+    assert result.get("rtt_p99_ms") == pytest.approx(29.8)
+
+
 def test_parse_local_ping_with_loss():
     """Ensures local ping parser handles non-zero packet loss."""
     result = parse_local_ping_results(LOCAL_PING_PACKET_LOSS_OUTPUT)
@@ -142,11 +157,19 @@ def test_parse_gateway_ping_garbage_input():
 # --- Tests for Task Functions ---
 
 
+def fake_speedtest_process(mock_popen, stdout: str, returncode: int = 0) -> None:
+    """Makes the patched Popen stream `stdout` line by line and exit with `returncode`."""
+    process = mock_popen.return_value
+    process.stdout = iter(stdout.splitlines(keepends=True))
+    process.stderr.read.return_value = ""
+    process.wait.return_value = returncode
+
+
 @patch("main.os.path.exists", return_value=True)
-@patch("main.subprocess.run")
-def test_local_speed_test_parsing(mock_run, mock_exists):
+@patch("main.subprocess.Popen")
+def test_local_speed_test_parsing(mock_popen, mock_exists):
     """Ensures the local speed test task correctly parses JSON and returns floats."""
-    mock_run.return_value = MagicMock(stdout=SPEEDTEST_JSON_OUTPUT, returncode=0, stderr="")
+    fake_speedtest_process(mock_popen, SPEEDTEST_JSON_OUTPUT)
     results = run_local_speed_test_task()
     assert results is not None
     # Bandwidth is in bytes, so we convert to Mbps (bytes * 8 / 1,000,000)
@@ -159,12 +182,10 @@ def test_local_speed_test_parsing(mock_run, mock_exists):
 
 
 @patch("main.os.path.exists", return_value=True)
-@patch("main.subprocess.run")
-def test_local_speed_test_parsing_missing_keys(mock_run, mock_exists):
+@patch("main.subprocess.Popen")
+def test_local_speed_test_parsing_missing_keys(mock_popen, mock_exists):
     """Ookla JSON may omit latency/packetLoss; defaults should be 0.0 without errors."""
-    mock_run.return_value = MagicMock(
-        stdout=SPEEDTEST_JSON_OUTPUT_MISSING, returncode=0, stderr=""
-    )
+    fake_speedtest_process(mock_popen, SPEEDTEST_JSON_OUTPUT_MISSING)
     results = run_local_speed_test_task()
     assert results is not None
     # Speeds should parse
@@ -0,0 +1,127 @@
+from unittest.mock import patch
+
+import pytest
+
+import config
+import gateway_http
+import main
+from tests.fake_gateway import FakeGateway
+
+
+@pytest.fixture
+def fake_gateway():
+    with FakeGateway(access_code="secret", ping_polls=2, speed_polls=2) as gateway:
+        yield gateway
+
+
+def test_parse_gateway_page_extracts_forms_textareas_and_grid() -> None:
+    html = """
+    <form action="/cgi-bin/diag.ha" method="POST">
+      <input type="hidden" name="nonce" value="abc">
+      <input type="text" id="webaddress" name="webaddress" value="">
+      <input type="submit" name="Ping" value="Ping">
+      <textarea id="progress">line 1
+line 2</textarea>
+    </form>
+    <table class="grid table100">
+      <tr><th>Date</th><th>Direction</th><th>Speed</th></tr>
+      <tr><td>today</td><td> downstream </td><td>941.23</td></tr>
+    </table>
+    """
+    page = gateway_http.parse_gateway_page(html, "http://gw/cgi-bin/diag.ha")
+
+    form = page.form_with("webaddress")
+    assert form is not None
+    assert form.method == "post"
+    assert form.fields["nonce"] == "abc"
+    assert form.buttons == {"Ping": "Ping"}
+    assert page.textareas["progress"] == "line 1\nline 2"
+    assert page.grid_rows[1] == ["today", "downstream", "941.23"]
+
+
+def test_run_ping_polls_until_statistics_on_one_connection(fake_gateway) -> None:
+    client = gateway_http.GatewayHttpClient()
+    try:
+        text = gateway_http.run_ping(client, fake_gateway.diag_url, "example.com", poll_interval=0)
+    finally:
+        client.close()
+
+    assert "example.com ping statistics" in text
+    assert main.parse_gateway_ping_results(text) == {
+        "gateway_loss_percentage": 0.0,
+        "gateway_rtt_avg_ms": 15.2,
+    }
+    assert fake_gateway.connections == 1
+
+
+def test_run_speed_test_logs_in_and_reuses_session(fake_gateway) -> None:
+    client = gateway_http.GatewayHttpClient()
+    try:
+        rows = gateway_http.run_speed_test(
+            client, fake_gateway.speed_url, "secret", poll_interval=0
+        )
+        assert main.parse_gateway_speed_rows((r[1], r[2]) for r in rows if len(r) >= 3) == {
+            "downstream_speed": 941.23,
+            "upstream_speed": 812.40,
+        }
+        # The session cookie survives, so a second run skips the login form.
+        gateway_http.run_speed_test(client, fake_gateway.speed_url, "secret", poll_interval=0)
+    finally:
+        client.close()
+
+    assert len(fake_gateway.sessions) == 1
+
+
+def test_run_speed_test_rejects_wrong_access_code(fake_gateway) -> None:
+    client = gateway_http.GatewayHttpClient()
+    with pytest.raises(gateway_http.GatewayHttpError):
+        gateway_http.run_speed_test(client, fake_gateway.speed_url, "wrong", poll_interval=0)
+    client.close()
+
+
+def test_run_ping_times_out_when_results_never_arrive(fake_gateway) -> None:
+    fake_gateway.ping_polls = 1000
+    client = gateway_http.GatewayHttpClient()
+    with pytest.raises(TimeoutError):
+        gateway_http.run_ping(
+            client, fake_gateway.diag_url, "example.com", timeout=0.05, poll_interval=0.01
+        )
+    client.close()
+
+
+def test_http_backend_tasks_return_gateway_results(fake_gateway, monkeypatch) -> None:
+    monkeypatch.setattr(config, "DIAG_URL", fake_gateway.diag_url)
+    monkeypatch.setattr(config, "SPEED_TEST_URL", fake_gateway.speed_url)
+    monkeypatch.setattr(config, "LOG_RAW_GATEWAY_OUTPUT", False)
+    try:
+        with patch("gateway_http.time.sleep"):
+            ping = main.run_http_ping_test_task()
+            speed = main.run_http_speed_test_task("secret")
+    finally:
+        main.close_gateway_http_client()
+
+    assert ping == {"gateway_loss_percentage": 0.0, "gateway_rtt_avg_ms": 15.2}
+    assert speed == {"downstream_speed": 941.23, "upstream_speed": 812.40}
+
+
+def test_perform_checks_http_backend_skips_chrome(fake_gateway, monkeypatch) -> None:
+    monkeypatch.setattr(config, "GATEWAY_BACKEND", "http")
+    monkeypatch.setattr(config, "DIAG_URL", fake_gateway.diag_url)
+    monkeypatch.setattr(config, "RUN_GATEWAY_SPEED_TEST_INTERVAL", 0)
+    monkeypatch.setattr(config, "RUN_LOCAL_PING_TEST", False)
+    monkeypatch.setattr(config, "RUN_LOCAL_GATEWAY_PING_TEST", False)
+    monkeypatch.setattr(config, "RUN_LOCAL_SPEED_TEST", False)
+    monkeypatch.setattr(config, "RUN_LAN_BUFFERBLOAT_TEST", False)
+    monkeypatch.setattr(config, "LOG_RAW_GATEWAY_OUTPUT", False)
+    try:
+        with (
+            patch("gateway_http.time.sleep"),
+            patch("main.managed_webdriver_session") as mock_session,
+            patch("main.log_results") as mock_log,
+        ):
+            main.perform_checks()
+    finally:
+        main.close_gateway_http_client()
+
+    mock_session.assert_not_called()
+    assert mock_log.call_args[0][0]["gateway_rtt_avg_ms"] == 15.2
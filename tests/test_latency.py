@@ -0,0 +1,319 @@
+import socket
+import threading
+from typing import Optional
+
+import pytest
+
+import config
+import latency
+import main
+
+
+class FakeIcmpSocket:
+    """
+    Echoes each request back as a reply through a socketpair, dropping chosen seqs.
+    Like an unprivileged ICMP socket on macOS, it sees the replies to every socket in
+    `network`, each after its target's `delays` seconds.
+    """
+
+    def __init__(
+        self,
+        drop_every: int = 0,
+        ip_header: bool = False,
+        network: Optional[list["FakeIcmpSocket"]] = None,
+        delays: Optional[dict[str, float]] = None,
+    ) -> None:
+        self._reader, self._writer = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.drop_every = drop_every
+        self.ip_header = ip_header
+        self.network = network if network is not None else []
+        self.network.append(self)
+        self.delays = delays or {}
+        self.sent = 0
+
+    def fileno(self) -> int:
+        return self._reader.fileno()
+
+    def sendto(self, packet: bytes, address: tuple[str, int]) -> int:
+        self.sent += 1
+        if self.drop_every and self.sent % self.drop_every == 0:
+            return len(packet)
+        reply = socket.inet_aton(address[0]) + bytes([0]) + packet[1:]
+        if self.ip_header:
+            reply = socket.inet_aton(address[0]) + bytes([0x45]) + bytes(19) + reply[4:]
+        for sock in self.network:
+            threading.Timer(self.delays.get(address[0], 0), sock._deliver, [reply]).start()
+        return len(packet)
+
+    def _deliver(self, reply: bytes) -> None:
+        try:
+            self._writer.send(reply)
+        except OSError:
+            pass  # A late reply to a socket the test already closed
+
+    def recvfrom(self, size: int) -> tuple[bytes, tuple[str, int]]:
+        data = self._reader.recv(size)
+        return data[4:], (socket.inet_ntoa(data[:4]), 0)
+
+    def close(self) -> None:
+        self._reader.close()
+        self._writer.close()
+
+
+def _prober_with(sock: FakeIcmpSocket, target: str = "127.0.0.1") -> latency.LatencyProber:
+    prober = latency.LatencyProber(target, timeout=0.2)
+    prober.close()
+    prober._icmp_socket = sock
+    return prober
+
+
+@pytest.mark.parametrize("ip_header", [False, True])
+def test_icmp_probe_records_every_packet(ip_header: bool) -> None:
+    sock = FakeIcmpSocket(drop_every=4, ip_header=ip_header)
+    run = _prober_with(sock).probe(count=8, interval=0.001)
+    sock.close()
+
+    assert run.method == "icmp"
+    assert run.sent == 8
+    assert [rtt is None for rtt in run.rtts_ms] == [False, False, False, True] * 2
+    assert run.loss_percentage == 25.0
+    assert all(rtt > 0 for rtt in run.received_rtts_ms)
+
+
+def test_parse_echo_reply_ignores_foreign_packets() -> None:
+    request = latency._echo_request(ident=1, seq=42, token=b"mine")
+    assert latency._parse_echo_reply(bytes([0]) + request[1:], b"mine") == 42
+    assert latency._parse_echo_reply(bytes([0]) + request[1:], b"other") is None
+    assert latency._parse_echo_reply(request, b"mine") is None  # Our own echo request
+    assert latency._parse_echo_reply(bytes([0]) + bytes(15)) is None
+
+
+def test_concurrent_probers_only_take_their_own_replies() -> None:
+    network: list[FakeIcmpSocket] = []
+    delays = {"127.0.0.1": 0.05, "127.0.0.2": 0.0}
+    slow_sock = FakeIcmpSocket(network=network, delays=delays)
+    fast_sock = FakeIcmpSocket(network=network, delays=delays)
+    slow = _prober_with(slow_sock, "127.0.0.1")
+    fast = _prober_with(fast_sock, "127.0.0.2")
+    runs: dict[str, latency.ProbeRun] = {}
+    threads = [
+        threading.Thread(target=lambda: runs.update(slow=slow.probe(count=5, interval=0.01))),
+        threading.Thread(target=lambda: runs.update(fast=fast.probe(count=5, interval=0.01))),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    slow_sock.close()
+    fast_sock.close()
+
+    assert runs["slow"].loss_percentage == 0.0 and runs["fast"].loss_percentage == 0.0
+    assert min(runs["slow"].received_rtts_ms) >= 45
+    assert max(runs["fast"].received_rtts_ms) < 45
+
+
+def test_tcp_fallback_times_connects() -> None:
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(8)
+        port = listener.getsockname()[1]
+        prober = latency.LatencyProber("127.0.0.1", timeout=0.5, tcp_port=port)
+        prober.close()  # Drop any ICMP socket to force the TCP path
+        run = prober.probe(count=3, interval=0)
+
+    assert run.method == "tcp"
+    assert run.loss_percentage == 0.0
+    assert len(run.received_rtts_ms) == 3
+
+
+def test_summarize_probe_run_matches_ping_fields() -> None:
+    run = latency.ProbeRun("gw", "icmp", [1.0, None, 3.0, 2.0])
+    results = main.summarize_probe_run(run)
+    assert results["loss_percentage"] == 25.0
+    assert results["rtt_avg_ms"] == pytest.approx(2.0)
+    assert results["ping_stddev"] == pytest.approx((2 / 3) ** 0.5)
+
+
+def test_summarize_probe_run_all_lost() -> None:
+    results = main.summarize_probe_run(latency.ProbeRun("gw", "icmp", [None, None]))
+    assert results == {"loss_percentage": 100.0}
+
+
+def test_run_local_ping_task_uses_native_backend(monkeypatch) -> None:
+    monkeypatch.setattr(config, "LOCAL_PING_BACKEND", "native")
+    calls = []
+
+    def fake_native_ping(target: str, count: int, interval: float) -> latency.ProbeRun:
+        calls.append((target, count, interval))
+        return latency.ProbeRun(target, "icmp", [10.0, 12.0])
+
+    monkeypatch.setattr(main, "native_ping", fake_native_ping)
+    monkeypatch.setattr(main.subprocess, "run", lambda *a, **k: pytest.fail("forked ping"))
+
+    results = main.run_local_ping_task("example.com")
+
+    assert calls == [
+        ("example.com", config.NATIVE_PING_COUNT, config.NATIVE_PING_INTERVAL_SECONDS)
+    ]
+    assert results["rtt_avg_ms"] == pytest.approx(11.0)
+
+
+def test_native_ping_stops_sending_at_the_cycle_deadline(monkeypatch) -> None:
+    calls = []
+
+    class RecordingProber:
+        def __init__(self, target: str, timeout: float) -> None:
+            self.timeout = timeout
+
+        def __enter__(self) -> "RecordingProber":
+            return self
+
+        def __exit__(self, *exc_info: object) -> None:
+            pass
+
+        def probe(self, count: int, interval: float) -> latency.ProbeRun:
+            calls.append((count, self.timeout))
+            return latency.ProbeRun("lan", "icmp", [1.0] * count)
+
+    monkeypatch.setattr(latency, "LatencyProber", RecordingProber)
+    monkeypatch.setattr(config, "NATIVE_PING_TIMEOUT", 1.0, raising=False)
+
+    monkeypatch.setattr(main, "cycle_deadline", main.Deadline(3.0))
+    main.native_ping("lan", 200, 0.05)
+    monkeypatch.setattr(main, "cycle_deadline", main.Deadline(0.0))
+    main.native_ping("lan", 200, 0.05)
+    monkeypatch.setattr(main, "cycle_deadline", main.Deadline())
+    main.native_ping("lan", 200, 0.05)
+
+    # The last probe goes out with time left for its reply: (3 s - 1 s timeout) / 0.05 s.
+    assert 30 <= calls[0][0] <= 41 and calls[0][1] == 1.0
+    assert calls[1] == (1, 0.0)
+    assert calls[2] == (200, 1.0)
+
+
+def test_ring_buffer_keeps_most_recent_samples() -> None:
+    ring = latency.RttRingBuffer(capacity=3)
+    for i, rtt in enumerate([1.0, None, 3.0, 4.0]):
+        ring.append(i, rtt)
+
+    assert len(ring) == 3
+    assert ring.samples() == [(1, None), (2, 3.0), (3, 4.0)]
+
+
+def test_interval_stats_counts_outages_across_resets() -> None:
+    stats = latency.IntervalStats(outage_min_losses=3)
+    for rtt in [10.0, None, None, None, None, 20.0, None, None]:
+        stats.add(rtt)
+    summary = stats.summary()
+    assert summary.sent == 8
+    assert summary.loss_percentage == pytest.approx(75.0)
+    assert (summary.rtt_min_ms, summary.rtt_avg_ms, summary.rtt_max_ms) == (10.0, 15.0, 20.0)
+    assert summary.rtt_stddev_ms == pytest.approx(5.0)
+    assert summary.outages == 1
+
+    # The trailing two losses complete an outage in the next interval.
+    stats.reset()
+    stats.add(None)
+    assert stats.summary().outages == 1
+    assert stats.summary().rtt_avg_ms is None
+
+
+def test_latency_stream_summarizes_ring_samples_since_last_snapshot() -> None:
+    stream = latency.LatencyStream({"wan": "127.0.0.1"}, capacity=4, outage_min_losses=3)
+    for rtt in [5.0, 7.0, None, None]:
+        stream.record("wan", rtt)
+
+    assert stream.snapshot(reset=False)["wan"].sent == 4
+    first = stream.snapshot()["wan"]
+    assert (first.sent, first.received, first.rtt_avg_ms, first.outages) == (4, 2, 6.0, 0)
+    assert stream.snapshot()["wan"].sent == 0
+
+    # The two trailing losses and the next one make an outage, counted in this interval.
+    stream.record("wan", None)
+    assert stream.snapshot()["wan"].outages == 1
+
+    # An interval longer than the ring is summarized from its newest samples.
+    for rtt in [1.0, 2.0, 3.0, 4.0, 5.0]:
+        stream.record("wan", rtt)
+    last = stream.snapshot()["wan"]
+    assert len(stream.buffers["wan"]) == 4  # Ring stays bounded
+    assert (last.sent, last.rtt_min_ms, last.rtt_max_ms) == (4, 2.0, 5.0)
+
+
+def test_latency_stream_samples_in_background() -> None:
+    stream = latency.LatencyStream({"local": "127.0.0.1"}, interval=0.01, timeout=0.2)
+    stream.start()
+    try:
+        deadline = 100
+        while stream.snapshot(reset=False)["local"].sent < 3 and deadline:
+            deadline -= 1
+            stream._stop.wait(0.01)
+    finally:
+        stream.stop()
+
+    assert not stream.running
+    assert stream.snapshot()["local"].sent >= 3
+
+
+def test_collect_latency_stream_results_prefixes_targets(monkeypatch) -> None:
+    stream = latency.LatencyStream({"wan": "127.0.0.1", "gw": "127.0.0.1"})
+    stream.record("wan", 12.0)
+    monkeypatch.setattr(main, "latency_stream", stream)
+
+    results = main.collect_latency_stream_results()
+
+    assert results["stream_wan_rtt_avg_ms"] == 12.0
+    assert results["stream_wan_outages"] == 0
+    assert results["stream_gw_loss_percentage"] is None
+
+
+def test_p2_quantile_tracks_large_streams() -> None:
+    import random
+
+    rng = random.Random(7)
+    samples = [rng.expovariate(1 / 20) for _ in range(20000)]
+    sketch = latency.QuantileSketch()
+    for sample in samples:
+        sketch.add(sample)
+
+    ordered = sorted(samples)
+    for q in (0.5, 0.95, 0.99):
+        exact = ordered[int(q * len(ordered))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.05)
+
+
+def test_p2_quantile_is_exact_for_small_samples() -> None:
+    sketch = latency.QuantileSketch()
+    assert sketch.quantile(0.5) is None
+    for sample in [4.0, 1.0, 3.0, 2.0]:
+        sketch.add(sample)
+    assert sketch.quantile(0.5) == pytest.approx(2.5)
+    assert sketch.quantile(0.99) == pytest.approx(3.97)
+
+
+def test_interval_stats_reports_percentiles() -> None:
+    stats = latency.IntervalStats()
+    for rtt in range(1, 101):
+        stats.add(float(rtt))
+    summary = stats.summary()
+    # P² is an estimate; a monotonic stream is its worst case, so allow a few ms.
+    assert summary.rtt_p50_ms == pytest.approx(50.5, abs=3)
+    assert summary.rtt_p99_ms == pytest.approx(99.0, abs=3)
+
+
+def test_phased_sampler_buckets_samples_by_phase() -> None:
+    sampler = latency.PhasedLatencySampler({"wan": "example.invalid"})
+    sampler.record("wan", 5.0)  # No phase yet: not classified
+    sampler.set_phase("idle")
+    sampler.record("wan", 10.0)
+    sampler.set_phase("download")
+    sampler.record("wan", 50.0)
+    sampler.record("wan", None)
+    sampler.set_phase(None)
+    sampler.record("wan", 500.0)
+
+    summaries = sampler.phase_summaries()
+    assert set(summaries) == {("wan", "idle"), ("wan", "download")}
+    assert summaries[("wan", "idle")].rtt_p50_ms == 10.0
+    assert summaries[("wan", "download")].sent == 2
+    assert summaries[("wan", "download")].loss_percentage == 50.0
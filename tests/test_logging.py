@@ -74,8 +74,8 @@ def test_log_results_csv_creation(mock_exists, mock_open_file) -> None:
     """Tests that a new CSV file is created with a header."""
     log_results(MOCK_DATA_COMPLETE)
     handle = mock_open_file()
-    written_header = handle.mock_calls[1][1][0]
-    written_data_row = handle.mock_calls[2][1][0]
+    written_header = handle.write.call_args_list[0].args[0]
+    written_data_row = handle.write.call_args_list[1].args[0]
     # Header should include new bufferbloat fields
     assert "Local_Load_Down_ms" in written_header
     assert "Local_Load_Up_ms" in written_header
@@ -166,7 +166,7 @@ def test_log_results_csv_precision_for_new_fields(mock_exists, mock_open_file) -
     data["local_packet_loss_pct"] = 0.78901
     log_results(data)
     handle = mock_open_file()
-    written_data_row = handle.mock_calls[2][1][0]
+    written_data_row = handle.write.call_args_list[1].args[0]
     assert ",1.235," in written_data_row
     assert ",9.877," in written_data_row
     assert ",0.789," in written_data_row
@@ -213,14 +213,78 @@ def test_log_results_handles_gateway_jitter(
     handle = mock_open_file()
 
     # 1. Check that the CSV Header is always correct
-    written_header = handle.mock_calls[1][1][0]
+    written_header = handle.write.call_args_list[0].args[0]
     assert "Local_GW_Ping_StdDev" in written_header
 
     # 2. Check that the CSV Data Row contains the expected value ('0.531' or 'N/A')
-    written_data_row = handle.mock_calls[2][1][0]
+    written_data_row = handle.write.call_args_list[1].args[0]
     assert expected_jitter_csv in written_data_row
 
     # 3. Check that the Console Output contains the expected value
     all_output = " ".join([str(call.args[0]) for call in mock_print.call_args_list if call.args])
     assert "Gateway Jitter (StdDev):" in all_output
     assert expected_jitter_console in all_output
+
+
+@patch("builtins.open", new_callable=mock_open)
+@patch("builtins.print")
+def test_log_results_prints_latency_stream_section(mock_print, mock_open_file) -> None:
+    """The continuous latency section appears only when stream data is present."""
+    log_results(MOCK_DATA_COMPLETE)
+    all_output = " ".join(str(call.args[0]) for call in mock_print.call_args_list if call.args)
+    assert "Continuous Latency" not in all_output
+
+    mock_print.reset_mock()
+    data = dict(MOCK_DATA_COMPLETE)
+    data.update(
+        {
+            "stream_wan_loss_percentage": 0.0,
+            "stream_wan_rtt_avg_ms": 18.5,
+            "stream_wan_rtt_max_ms": 44.0,
+            "stream_wan_rtt_stddev_ms": 2.0,
+            "stream_wan_outages": 2,
+        }
+    )
+    log_results(data)
+    all_output = " ".join(str(call.args[0]) for call in mock_print.call_args_list if call.args)
+    assert "Continuous Latency" in all_output
+    assert "WAN Outages:" in all_output
+
+
+@patch("builtins.open", new_callable=mock_open)
+@patch("builtins.print")
+def test_log_results_highlights_tail_latency(mock_print, mock_open_file) -> None:
+    """p95/p99 RTTs over their thresholds are highlighted and written to the CSV."""
+    config.ENABLE_ANOMALY_HIGHLIGHTING = True
+    config.PING_RTT_P95_THRESHOLD = 60.0
+    config.PING_RTT_P99_THRESHOLD = 100.0
+    data = dict(MOCK_DATA_COMPLETE)
+    data.update(
+        {
+            "local_wan_rtt_p50_ms": 19.0,
+            "local_wan_rtt_p95_ms": 75.0,
+            "local_wan_rtt_p99_ms": 140.0,
+        }
+    )
+    log_results(data)
+
+    all_output = " ".join(str(call.args[0]) for call in mock_print.call_args_list if call.args)
+    assert "WAN RTT (p50/p95/p99):" in all_output
+    assert f"{Colors.RED}75.00{Colors.RESET}" in all_output
+    assert f"{Colors.RED}140.00{Colors.RESET}" in all_output
+    written = "".join(call.args[0] for call in mock_open_file().write.call_args_list)
+    assert "19.000,75.000,140.000" in written
+
+
+@patch("builtins.open", new_callable=mock_open)
+@patch("builtins.print")
+def test_log_results_shows_timed_out_marker(mock_print, mock_open_file) -> None:
+    """Columns of a probe that ran out of cycle budget print and log as TIMEOUT."""
+    data = dict(MOCK_DATA_COMPLETE)
+    data["local_downstream_speed"] = "TIMEOUT"
+    log_results(data)
+
+    all_output = " ".join(str(call.args[0]) for call in mock_print.call_args_list if call.args)
+    assert f"Downstream Speed:           {Colors.RED}TIMEOUT{Colors.RESET}" in all_output
+    written = "".join(call.args[0] for call in mock_open_file().write.call_args_list)
+    assert ",TIMEOUT," in written
@@ -0,0 +1,85 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+import logindex
+import main
+import rotation
+import storage
+
+HEADER = ["Timestamp", "Gateway_RTT_avg_ms", "WiFi_Channel"]
+
+
+def write_rows(path, minutes, index=True) -> None:
+    sink = storage.CsvResultSink(
+        str(path), index=logindex.TimestampIndex(str(path)) if index else None
+    )
+    for minute in minutes:
+        sink.write(HEADER, [f"2026-10-17 08:{minute:02d}:00", f"{minute}.000", "149,80"])
+    sink.close()
+
+
+def test_index_seeks_to_time_window(tmp_path) -> None:
+    path = tmp_path / "log.csv"
+    write_rows(path, range(0, 60, 5))
+    index = logindex.TimestampIndex(str(path))
+
+    entries = list(index.entries(datetime(2026, 10, 17, 8, 12), datetime(2026, 10, 17, 8, 25)))
+
+    assert [ts.minute for ts, _ in entries] == [15, 20]
+    assert entries[0][1] == b'2026-10-17 08:15:00,15.000,"149,80"\r\n'
+    # One fixed-width record per row after the header.
+    assert os.path.getsize(index.index_path) == 16 + 12 * 16
+
+
+def test_writer_rebuilds_stale_index_and_readers_scan_meanwhile(tmp_path) -> None:
+    path = tmp_path / "log.csv"
+    write_rows(path, [0, 1])
+    index = logindex.TimestampIndex(str(path))
+
+    # Rows appended without the index are picked up when the writer syncs.
+    write_rows(path, [2, 3], index=False)
+    index.sync()
+    assert [ts.minute for ts, _ in index.entries()] == [0, 1, 2, 3]
+
+    # Deleted index: readers scan the log and leave the rebuild to the writer.
+    os.remove(index.index_path)
+    assert [ts.minute for ts, _ in index.entries(datetime(2026, 10, 17, 8, 3))] == [3]
+    assert not os.path.exists(index.index_path)
+    index.sync()
+    assert os.path.getsize(index.index_path) == 16 + 4 * 16
+
+    # Log rewritten in place (offsets no longer match): scanned, index left untouched.
+    with open(path, "w", newline="") as f:
+        f.write("Timestamp,Gateway_RTT_avg_ms,WiFi_Channel\r\n")
+        f.write("2026-10-17 09:00:00,1.000,N/A\r\n")
+        f.write("2026-10-17 09:01:00,2.000,N/A\r\n")
+    with open(index.index_path, "rb") as f:
+        stale = f.read()
+    window = index.entries(datetime(2026, 10, 17, 9, 1))
+    assert [(ts.hour, ts.minute, entry) for ts, entry in window] == [
+        (9, 1, b"2026-10-17 09:01:00,2.000,N/A\r\n")
+    ]
+    with open(index.index_path, "rb") as f:
+        assert f.read() == stale
+
+
+def test_raw_gateway_log_is_indexed(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    raw_log = tmp_path / "raw.log"
+    monkeypatch.setattr(main, "RAW_GATEWAY_LOG_FILE", str(raw_log))
+    monkeypatch.setattr(config, "LOG_RAW_GATEWAY_OUTPUT", True)
+    monkeypatch.setattr(config, "ENABLE_LOG_INDEX", True, raising=False)
+
+    main.log_raw_gateway_output("first\nmulti-line output")
+    main.log_raw_gateway_output("second")
+
+    entries = list(logindex.TimestampIndex(str(raw_log), rotation.RAW_LOG_ENTRY).entries())
+    assert len(entries) == 2
+    assert entries[0][1].startswith(b"--- Log entry from ")
+    assert entries[0][1].endswith(b"first\nmulti-line output\n\n")
+    assert entries[1][1].endswith(b"second\n\n")
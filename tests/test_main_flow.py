@@ -121,3 +121,75 @@ def test_perform_checks_gateway_speed_test_disabled(mock_tasks, monkeypatch):
     perform_checks()
 
     mock_tasks["gateway_speed"].assert_not_called()
+
+
+def test_perform_checks_runs_only_selected_probes(mock_tasks, monkeypatch):
+    """A per-probe job runs just its probe, regardless of the gateway speed interval."""
+    main_module.run_counter = 0
+    monkeypatch.setattr(config_module, "RUN_GATEWAY_SPEED_TEST_INTERVAL", 0)
+
+    perform_checks(probes=("gateway_speed",))
+
+    mock_tasks["gateway_speed"].assert_called_once()
+    mock_tasks["local_ping"].assert_not_called()
+    mock_tasks["local_speed"].assert_not_called()
+    mock_tasks["gateway_ping"].assert_not_called()
+    assert main_module.run_counter == 0  # Only full cycles count toward the interval
+
+
+def test_perform_checks_cycle_skips_separately_scheduled_probes(mock_tasks, monkeypatch):
+    """Probes with their own cadence in PROBE_SCHEDULES drop out of the full cycle."""
+    monkeypatch.setattr(config_module, "PROBE_SCHEDULES", {"local_speed": 3600}, raising=False)
+    monkeypatch.setattr(config_module, "RUN_LOCAL_SPEED_TEST", True)
+    monkeypatch.setattr(config_module, "RUN_LOCAL_PING_TEST", True)
+
+    perform_checks()
+
+    mock_tasks["local_speed"].assert_not_called()
+    mock_tasks["local_ping"].assert_called()
+
+
+def test_conditional_probes_skip_expensive_tests_when_healthy(mock_tasks, monkeypatch):
+    """With healthy pings and no baseline due, the speed tests and LAN test stay idle."""
+    main_module.run_counter = 0
+    monkeypatch.setattr(config_module, "ENABLE_CONDITIONAL_PROBES", True, raising=False)
+    monkeypatch.setattr(config_module, "RUN_LAN_BUFFERBLOAT_TEST", True)
+    # Runs every cycle outside conditional mode; here only the baseline count applies.
+    monkeypatch.setattr(config_module, "RUN_GATEWAY_SPEED_TEST_INTERVAL", 1)
+    monkeypatch.setattr(
+        config_module,
+        "CONDITIONAL_PROBE_BASELINE_RUNS",
+        {"local_speed": 12, "gateway_speed": 12},
+        raising=False,
+    )
+    # Baselines ran on this first cycle already.
+    monkeypatch.setattr(
+        main_module, "expensive_probe_last_run", {"local_speed": 1, "gateway_speed": 1}
+    )
+    mock_tasks["local_ping"].return_value = {"rtt_avg_ms": 5.0, "loss_percentage": 0.0}
+
+    with patch("main.run_lan_bufferbloat_task", return_value={}) as mock_lan:
+        perform_checks()
+
+    mock_tasks["local_speed"].assert_not_called()
+    mock_tasks["gateway_speed"].assert_not_called()
+    mock_lan.assert_not_called()
+    mock_tasks["gateway_ping"].assert_called_once()
+
+
+def test_conditional_probes_escalate_from_cheap_results(mock_tasks, monkeypatch):
+    """High WAN RTT triggers the local speed test; a slow result then triggers the gateway's."""
+    main_module.run_counter = 0
+    monkeypatch.setattr(config_module, "ENABLE_CONDITIONAL_PROBES", True, raising=False)
+    monkeypatch.setattr(config_module, "RUN_GATEWAY_SPEED_TEST_INTERVAL", 12)
+    monkeypatch.setattr(config_module, "PING_RTT_THRESHOLD", 30.0)
+    monkeypatch.setattr(config_module, "LOCAL_DOWNSTREAM_SPEED_THRESHOLD", 225.0)
+    monkeypatch.setattr(main_module, "expensive_probe_last_run", {"gateway_speed": 1})
+    mock_tasks["local_ping"].return_value = {"rtt_avg_ms": 80.0, "loss_percentage": 0.0}
+    mock_tasks["local_speed"].return_value = {"local_downstream_speed": 40.0}
+
+    perform_checks()
+
+    mock_tasks["local_speed"].assert_called_once()
+    mock_tasks["gateway_speed"].assert_called_once()
+    assert main_module.expensive_probe_last_run == {"local_speed": 1, "gateway_speed": 1}
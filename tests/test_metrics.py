@@ -0,0 +1,106 @@
+import os
+import sys
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+import main
+import metrics
+
+
+def test_registry_renders_openmetrics() -> None:
+    registry = metrics.MetricsRegistry()
+    registry.update(
+        "2026-10-17 12:00:00",
+        {
+            "Gateway_RTT_avg_ms": 12.5,
+            "Stream_WAN_Outages": 2,
+            "WiFi_RSSI": "-55",
+            "WiFi_BSSID": "a1:b2",
+            "Gateway_Downstream_Mbps": "TIMEOUT",
+            "Local_Downstream_Mbps": None,
+        },
+    )
+    registry.record_probe("local_ping", 3.25, failed=False)
+    registry.record_probe("local_ping", None, failed=True)
+
+    text = registry.exposition().decode()
+    lines = text.splitlines()
+    assert "# TYPE Gateway_RTT_avg_ms gauge" in lines
+    assert "Gateway_RTT_avg_ms 12.5" in lines
+    assert "Stream_WAN_Outages 2" in lines
+    assert "WiFi_RSSI -55" in lines
+    assert not any(
+        line.startswith(("WiFi_BSSID", "Gateway_Downstream", "Local_Down")) for line in lines
+    )
+    assert 'sgl_probe_duration_seconds{probe="local_ping"} 3.25' in lines
+    assert 'sgl_probe_runs_total{probe="local_ping"} 2' in lines
+    assert 'sgl_probe_failures_total{probe="local_ping"} 1' in lines
+    assert lines[-1] == "# EOF"
+
+
+def test_registry_keeps_last_value_of_columns_missing_from_a_cycle() -> None:
+    registry = metrics.MetricsRegistry()
+    registry.update(
+        "2026-10-17 12:00:00", {"Gateway_RTT_avg_ms": 12.5, "Local_Downstream_Mbps": 450.0}
+    )
+    registry.update(
+        "2026-10-17 12:01:00",
+        {"Gateway_RTT_avg_ms": 13.0, "Local_Downstream_Mbps": "SKIPPED"},
+    )
+
+    lines = registry.exposition().decode().splitlines()
+    assert "Gateway_RTT_avg_ms 13" in lines
+    assert "Local_Downstream_Mbps 450" in lines
+    first, second = (datetime(2026, 10, 17, 12, minute).timestamp() for minute in (0, 1))
+    assert f'sgl_metric_timestamp_seconds{{metric="Gateway_RTT_avg_ms"}} {second:.0f}' in lines
+    assert f'sgl_metric_timestamp_seconds{{metric="Local_Downstream_Mbps"}} {first:.0f}' in lines
+    assert f"sgl_last_cycle_timestamp_seconds {second:.0f}" in lines
+
+
+def test_server_serves_metrics() -> None:
+    registry = metrics.MetricsRegistry()
+    registry.update("2026-10-17 12:00:00", {"Gateway_RTT_avg_ms": 1.0})
+    server = metrics.MetricsServer(registry, port=0)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+            assert b"Gateway_RTT_avg_ms 1\n" in response.read()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{server.port}/other")
+    finally:
+        server.stop()
+
+
+def test_perform_checks_records_probe_runs(monkeypatch: pytest.MonkeyPatch) -> None:
+    for name, value in {
+        "RUN_LOCAL_PING_TEST": True,
+        "RUN_LOCAL_GATEWAY_PING_TEST": True,
+        "RUN_LOCAL_SPEED_TEST": False,
+        "RUN_WIFI_DIAGNOSTICS_TEST": False,
+        "RUN_LAN_BUFFERBLOAT_TEST": False,
+        "RUN_GATEWAY_PING_TEST": False,
+        "RUN_GATEWAY_SPEED_TEST_INTERVAL": 0,
+    }.items():
+        monkeypatch.setattr(config, name, value, raising=False)
+    registry = metrics.MetricsRegistry()
+    monkeypatch.setattr(main, "metrics_registry", registry)
+    monkeypatch.setattr(
+        main,
+        "run_local_ping_task",
+        lambda target: {} if target == main.gateway_host() else {"rtt_avg_ms": 12.0},
+    )
+    monkeypatch.setattr(main, "log_results", lambda results: {})
+
+    main.perform_checks()
+
+    lines = registry.exposition().decode().splitlines()
+    assert 'sgl_probe_failures_total{probe="local_ping"} 0' in lines
+    assert 'sgl_probe_failures_total{probe="local_gateway_ping"} 1' in lines
+    assert any(line.startswith('sgl_probe_duration_seconds{probe="local_ping"}') for line in lines)
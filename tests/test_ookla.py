@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import ookla
+
+
+def transfer_event(phase: str, elapsed_ms: int, transferred: int, iqm: float = 20.0) -> dict:
+    return {
+        "type": phase,
+        phase: {"bytes": transferred, "elapsed": elapsed_ms, "latency": {"iqm": iqm}},
+    }
+
+
+def test_tracker_builds_per_second_series_and_ramp_up() -> None:
+    phases: list = []
+    tracker = ookla.ProgressTracker(on_phase=phases.append)
+    tracker.feed({"type": "testStart"})
+    tracker.feed({"type": "ping", "ping": {"progress": 1.0}})
+    # 25 Mbps for the first second, then 12.5 MB/s = 100 Mbps, one event every 250 ms.
+    transferred = 0
+    for k in range(1, 21):
+        transferred += 781_250 if k <= 4 else 3_125_000
+        tracker.feed(transfer_event("download", 250 * k - 1, transferred, iqm=float(k)))
+    tracker.feed({"type": "result", "download": {"bandwidth": 12_500_000}})
+
+    series = tracker.series["download"]
+    assert phases == ["idle", "download", None]
+    assert series.final_mbps == 100.0
+    assert series.mbps == pytest.approx([25.0, 100.0, 100.0, 100.0, 100.0], rel=0.01)
+    assert series.latency_ms == [4.0, 8.0, 12.0, 16.0, 20.0]
+    assert series.ramp_up_seconds() == 2.0
+    assert series.stability_cv() == pytest.approx(0.0)
+    assert ookla.format_series(series.mbps) == "25.0;100.0;100.0;100.0;100.0"
+    assert ookla.format_series([1.25, None]) == "1.2;"
+
+
+def test_tracker_detects_stalled_transfer() -> None:
+    tracker = ookla.ProgressTracker(stall_seconds=5.0)
+    tracker.feed({"type": "ping"}, now=0.0)
+    assert not tracker.stalled(now=100.0)  # Only transfers can stall
+
+    tracker.feed(transfer_event("download", 250, 1000), now=1.0)
+    tracker.feed(transfer_event("download", 500, 1000), now=4.0)  # No new bytes
+    assert not tracker.stalled(now=5.5)
+    assert tracker.stalled(now=6.5)
+
+
+@patch("ookla.subprocess.Popen")
+def test_stream_speedtest_aborts_on_stall(mock_popen) -> None:
+    release = threading.Event()
+
+    def stdout_lines():
+        yield json.dumps(transfer_event("download", 250, 1000)) + "\n"
+        release.wait(5)  # The CLI goes quiet mid-download
+
+    process = mock_popen.return_value
+    process.stdout = stdout_lines()
+    process.kill.side_effect = lambda: release.set()
+
+    tracker = ookla.ProgressTracker(stall_seconds=0.2)
+    with pytest.raises(ookla.SpeedtestStalled):
+        ookla.stream_speedtest(["speedtest"], tracker, timeout=5)
+    process.kill.assert_called_once()
+
+
+@patch("ookla.subprocess.Popen")
+def test_stream_speedtest_reports_failed_exit(mock_popen) -> None:
+    process = mock_popen.return_value
+    process.stdout = iter(["Configuration error\n"])
+    process.stderr.read.return_value = "boom"
+    process.wait.return_value = 2
+
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        ookla.stream_speedtest(["speedtest"], ookla.ProgressTracker())
+    assert excinfo.value.stdout == "Configuration error\n"
+    assert excinfo.value.stderr == "boom"
+
+
+def test_stream_speedtest_drains_stderr_while_reading_progress() -> None:
+    # More stderr than a pipe buffer holds, written before any stdout.
+    script = (
+        "import json, sys; sys.stderr.write('x' * 200_000); sys.stderr.flush(); "
+        "print(json.dumps({'type': 'result', 'ping': {'latency': 9.0}}))"
+    )
+
+    result = ookla.stream_speedtest([sys.executable, "-c", script], ookla.ProgressTracker(), 10)
+
+    assert result["ping"]["latency"] == 9.0
@@ -0,0 +1,175 @@
+import threading
+import time
+
+import latency
+import main
+import ookla
+
+
+def _make_executor(max_workers: int = 4) -> main.ProbeExecutor:
+    return main.ProbeExecutor(main.DebugLogger(start_time=time.time()), max_workers)
+
+
+def test_shared_probes_overlap() -> None:
+    barrier = threading.Barrier(2, timeout=2)
+
+    def probe() -> str:
+        # Both probes must be inside the lock at once for the barrier to release.
+        barrier.wait()
+        return "ok"
+
+    with _make_executor() as executor:
+        first = executor.submit("first", probe)
+        second = executor.submit("second", probe)
+        assert executor.result(first) == "ok"
+        assert executor.result(second) == "ok"
+
+
+def test_exclusive_probes_never_overlap_other_probes() -> None:
+    active: list[str] = []
+    overlaps: list[tuple[str, ...]] = []
+    guard = threading.Lock()
+
+    def probe(name: str) -> None:
+        with guard:
+            active.append(name)
+            if len(active) > 1 and any(n.startswith("exclusive") for n in active):
+                overlaps.append(tuple(active))
+        time.sleep(0.02)
+        with guard:
+            active.remove(name)
+
+    with _make_executor() as executor:
+        futures = [
+            executor.submit("ping-1", probe, "ping-1"),
+            executor.submit("exclusive-1", probe, "exclusive-1", kind="exclusive"),
+            executor.submit("exclusive-2", probe, "exclusive-2", kind="exclusive"),
+            executor.submit("ping-2", probe, "ping-2"),
+        ]
+        for future in futures:
+            executor.result(future)
+
+    assert overlaps == []
+
+
+def test_local_probe_runs_during_exclusive_probe() -> None:
+    exclusive_started = threading.Event()
+    local_done = threading.Event()
+
+    def exclusive_probe() -> bool:
+        exclusive_started.set()
+        return local_done.wait(timeout=2)
+
+    def local_probe() -> None:
+        exclusive_started.wait(timeout=2)
+        local_done.set()
+
+    with _make_executor() as executor:
+        exclusive = executor.submit("speed", exclusive_probe, kind="exclusive")
+        executor.submit("chrome", local_probe, kind="local")
+        assert executor.result(exclusive) is True
+
+
+def test_result_returns_none_when_probe_raises(capsys) -> None:
+    def broken() -> None:
+        raise RuntimeError("boom")
+
+    with _make_executor(max_workers=1) as executor:
+        assert executor.run("broken_probe", broken) is None
+
+    assert "An error occurred during broken_probe: boom" in capsys.readouterr().out
+
+
+def test_deadline_caps_timeouts() -> None:
+    unlimited = main.Deadline()
+    assert unlimited.cap(30) == 30
+    assert unlimited.wait_timeout() is None
+    assert not unlimited.expired()
+
+    deadline = main.Deadline(10)
+    assert deadline.cap(30) <= 10
+    assert deadline.cap(5) == 5
+
+    spent = main.Deadline(0)
+    assert spent.expired()
+    assert spent.cap(30) == 0
+
+
+def test_straggler_is_abandoned_without_blocking_shutdown() -> None:
+    release = threading.Event()
+    started = time.monotonic()
+    with _make_executor() as executor:
+        future = executor.submit("slow", lambda: release.wait(5))
+        assert executor.result(future, timeout=0.05) is None
+        assert future in executor.abandoned
+    assert time.monotonic() - started < 2
+    release.set()
+
+
+def test_straggler_keeps_its_cycles_deadline_after_the_cycle_ends(monkeypatch) -> None:
+    cycle_over = threading.Event()
+
+    def straggler() -> float:
+        cycle_over.wait(2)
+        return main.current_deadline().cap(30)
+
+    monkeypatch.setattr(main, "cycle_deadline", main.Deadline(0.05))
+    with _make_executor() as executor:
+        future = executor.submit("straggler", straggler)
+        assert executor.result(future, timeout=0.05) is None
+        monkeypatch.setattr(main, "cycle_deadline", main.Deadline())  # The cycle ends
+        cycle_over.set()
+        assert future.result(2) == 0  # Still capped by its own, spent budget
+    assert main.current_deadline().cap(30) == 30
+
+
+def test_perform_checks_marks_stragglers_timed_out(monkeypatch) -> None:
+    import config
+
+    release = threading.Event()
+
+    def slow_speed_test() -> dict:
+        release.wait(5)
+        return {"local_downstream_speed": 1.0}
+
+    for name, value in {
+        "RUN_LOCAL_PING_TEST": True,
+        "RUN_LOCAL_GATEWAY_PING_TEST": False,
+        "RUN_LOCAL_SPEED_TEST": True,
+        "RUN_WIFI_DIAGNOSTICS_TEST": False,
+        "RUN_LAN_BUFFERBLOAT_TEST": False,
+        "RUN_GATEWAY_PING_TEST": False,
+        "RUN_GATEWAY_SPEED_TEST_INTERVAL": 0,
+        "ENABLE_CONCURRENT_PROBES": True,
+    }.items():
+        monkeypatch.setattr(config, name, value, raising=False)
+    monkeypatch.setattr(main.Deadline, "GRACE_SECONDS", 0.0)
+    monkeypatch.setattr(main, "run_local_ping_task", lambda target: {"rtt_avg_ms": 12.0})
+    monkeypatch.setattr(main, "run_local_speed_test_task", slow_speed_test)
+    logged: list[dict] = []
+    monkeypatch.setattr(main, "log_results", lambda results: logged.append(results) or {})
+
+    started = time.monotonic()
+    main.perform_checks(budget_seconds=0.2)
+    release.set()
+
+    assert time.monotonic() - started < 2
+    row = logged[0]
+    assert row["local_wan_rtt_avg_ms"] == 12.0
+    assert row["local_downstream_speed"] == main.TIMED_OUT
+    assert row["local_packet_loss_pct"] == main.TIMED_OUT
+    assert row["download_bufferbloat_ms"] is None
+    assert main.cycle_deadline.remaining() is None  # Reset for probes run outside a cycle
+
+
+def test_local_speed_result_keys_cover_progress_and_sampler_results() -> None:
+    summary = latency.LatencySummary(10, 9, 10.0, 1.0, 2.0, 3.0, 0.5, 0, 2.0, 3.0)
+    summaries = {(t, p): summary for t in ("wan", "gw") for p in ("idle", "download", "upload")}
+    produced = {
+        **main.collect_speedtest_progress_results(ookla.ProgressTracker()),
+        **main.collect_speedtest_latency_results(summaries),
+    }
+
+    # So a timed-out or skipped speed test marks these columns too.
+    assert set(produced) <= set(main.PROBE_RESULT_KEYS["local_speed"])
+    assert len(produced) == 26 and produced["speedtest_gw_upload_rtt_p95_ms"] == 3.0
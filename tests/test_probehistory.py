@@ -0,0 +1,103 @@
+import csv
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+import main
+import probehistory
+
+
+def usage(wall: float) -> probehistory.ProbeUsage:
+    return probehistory.ProbeUsage(wall_seconds=wall, child_cpu_seconds=0.1, peak_rss_mb=50.0)
+
+
+def test_history_flags_runs_slower_than_the_baseline_median(tmp_path) -> None:
+    path = str(tmp_path / "probe_history.csv")
+    history = probehistory.ProbeHistory(path, window=5, factor=2.0, min_samples=3)
+    for wall in (10.0, 11.0):
+        assert history.record("gateway_ping", usage(wall), failed=False) is None
+    # Too few samples for a baseline yet, and failures never join it.
+    assert history.record("gateway_ping", usage(40.0), failed=True) is None
+    assert history.median("gateway_ping") is None
+    history.record("gateway_ping", usage(12.0), failed=False)
+    history.close()
+
+    # The baseline is rebuilt from the file.
+    reopened = probehistory.ProbeHistory(path, window=5, factor=2.0, min_samples=3)
+    assert reopened.median("gateway_ping") == 11.0
+    assert reopened.record("gateway_ping", usage(21.0), failed=False) is None
+    regression = reopened.record("gateway_ping", usage(30.0), failed=False)
+    reopened.close()
+
+    assert regression is not None and "2.6x its median of 11.5s" in regression
+    lines = (tmp_path / "probe_history.csv").read_text().splitlines()
+    assert lines[0] == ",".join(probehistory.HEADER)
+    assert len(lines) == 7
+    assert lines[3].split(",")[1:] == ["gateway_ping", "40.000", "0.100", "50.0", "1"]
+
+
+def test_usage_meter_counts_child_cpu_time_and_samples_peak_rss() -> None:
+    samples = iter([10.0, 80.0, 30.0])
+    meter = probehistory.UsageMeter(rss=lambda: next(samples, 20.0), rss_interval=0.01)
+    meter.start()
+    subprocess.run([sys.executable, "-c", "sum(i * i for i in range(2_000_000))"], check=True)
+    measured = meter.stop()
+
+    assert measured.wall_seconds > 0
+    assert measured.child_cpu_seconds is not None and measured.child_cpu_seconds > 0
+    assert measured.peak_rss_mb == 80.0
+
+    unmeasured = probehistory.UsageMeter(child_cpu=False)
+    unmeasured.start()
+    assert unmeasured.stop().child_cpu_seconds is None
+
+
+def test_perform_checks_records_probe_history(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "probe_history.csv"
+    for name, value in {
+        "PROBE_HISTORY_FILE": str(path),
+        "RUN_LOCAL_PING_TEST": True,
+        "RUN_LOCAL_GATEWAY_PING_TEST": True,
+        "RUN_LOCAL_SPEED_TEST": False,
+        "RUN_WIFI_DIAGNOSTICS_TEST": False,
+        "RUN_LAN_BUFFERBLOAT_TEST": False,
+        "RUN_GATEWAY_PING_TEST": False,
+        "RUN_GATEWAY_SPEED_TEST_INTERVAL": 0,
+    }.items():
+        monkeypatch.setattr(config, name, value, raising=False)
+    monkeypatch.setattr(
+        main,
+        "run_local_ping_task",
+        lambda target: {} if target == main.gateway_host() else {"rtt_avg_ms": 12.0},
+    )
+    monkeypatch.setattr(main, "log_results", lambda results: {})
+
+    main.perform_checks()
+    main.close_probe_history()
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = {row["Probe"]: row for row in csv.DictReader(f)}
+    assert {probe: row["Failed"] for probe, row in rows.items()} == {
+        "local_gateway_ping": "1",
+        "local_ping": "0",
+        "cycle": "1",
+    }
+    # Probes run one at a time, so each gets its own child CPU time and RSS peak.
+    assert float(rows["local_ping"]["Child_CPU_s"]) >= 0
+    assert float(rows["local_ping"]["Peak_RSS_MB"]) > 0
+    assert float(rows["cycle"]["Peak_RSS_MB"]) == max(
+        float(row["Peak_RSS_MB"]) for probe, row in rows.items() if probe != "cycle"
+    )
+
+
+def test_concurrent_probes_record_rss_but_not_child_cpu(monkeypatch) -> None:
+    monkeypatch.setattr(main, "process_tree_rss_mb", lambda pid: 64.0)
+    debug_logger = main.DebugLogger(start_time=time.time())
+    with main.ProbeExecutor(debug_logger, max_workers=2, measure_usage=True) as executor:
+        executor.result(executor.submit("probe", lambda: True))
+    assert executor.usage["probe"].child_cpu_seconds is None
+    assert executor.usage["probe"].peak_rss_mb == 64.0
@@ -0,0 +1,124 @@
+import io
+import json
+import os
+import sys
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import logindex
+import main
+import report
+import rotation
+import storage
+
+HEADER = ["Timestamp", "Gateway_RTT_avg_ms", "Local_Downstream_Mbps"]
+
+
+def write_log(path, rows, max_bytes=None) -> None:
+    sink = storage.CsvResultSink(str(path), rotator=rotation.LogRotator(str(path), max_bytes))
+    for row in rows:
+        sink.write(HEADER, row)
+    sink.close()
+
+
+def test_report_aggregates_buckets_across_rotated_segments(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(main.config, "PING_RTT_THRESHOLD", 30.0)
+    monkeypatch.setattr(main.config, "LOCAL_DOWNSTREAM_SPEED_THRESHOLD", 200.0)
+    path = tmp_path / "log.csv"
+    rows = [
+        [f"2026-10-17 {hour:02d}:{minute:02d}:00", str(10.0 + minute), "150.0"]
+        for hour in (8, 9)
+        for minute in range(0, 60, 10)
+    ]
+    rows[3][1] = "TIMEOUT"
+    write_log(path, rows, max_bytes=200)
+    assert rotation.LogRotator(str(path)).manifest()  # Some rows live in segments
+
+    out = io.StringIO()
+    count = report.run_report(
+        str(path),
+        columns=["Gateway_RTT_avg_ms", "Local_Downstream_Mbps"],
+        since=datetime(2026, 10, 17, 8, 0),
+        until=datetime(2026, 10, 17, 9, 30),
+        bucket_seconds=3600,
+        as_json=True,
+        out=out,
+    )
+
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert count == 9
+    assert [(r["bucket"], r["column"]) for r in lines] == [
+        ("2026-10-17 08:00:00", "Gateway_RTT_avg_ms"),
+        ("2026-10-17 08:00:00", "Local_Downstream_Mbps"),
+        ("2026-10-17 09:00:00", "Gateway_RTT_avg_ms"),
+        ("2026-10-17 09:00:00", "Local_Downstream_Mbps"),
+    ]
+    rtt_8 = lines[0]
+    assert rtt_8["count"] == 5 and rtt_8["markers"] == 1
+    assert rtt_8["mean"] == pytest.approx((10 + 20 + 30 + 50 + 60) / 5)
+    assert (rtt_8["min"], rtt_8["max"]) == (10.0, 60.0)
+    assert rtt_8["anomalies"] == 2  # 50 and 60 > 30 ms
+    assert lines[3]["count"] == 3 and lines[3]["anomalies"] == 3  # 150 < 200 Mbps
+
+
+def test_iter_rows_seeks_to_since_through_the_log_index(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "log.csv"
+    sink = storage.CsvResultSink(str(path), index=logindex.TimestampIndex(str(path)))
+    for hour in range(6):
+        sink.write(HEADER, [f"2026-10-17 {hour:02d}:00:00", str(float(hour)), "300.0"])
+    sink.close()
+    with open(path, "a", newline="") as f:
+        f.write("2026-10-17 06:00:00,6.0,300.0\r\n")  # Appended after the last index flush
+
+    def full_scan(file_path):  # type: ignore[no-untyped-def]
+        raise AssertionError(f"{file_path} was read from the top")
+
+    monkeypatch.setattr(report, "_csv_records", full_scan)
+    rows = list(report.iter_rows(str(path), since=datetime(2026, 10, 17, 4, 0)))
+
+    assert [row["Gateway_RTT_avg_ms"] for _, row in rows] == ["4.0", "5.0", "6.0"]
+    assert rows[0][0] == datetime(2026, 10, 17, 4, 0)
+
+
+def test_parse_time_and_bucket_alignment() -> None:
+    now = datetime(2026, 10, 17, 12, 0)
+    assert report.parse_time("24h", now) == datetime(2026, 10, 16, 12, 0)
+    assert report.parse_time("2026-10-17 08:30", now) == datetime(2026, 10, 17, 8, 30)
+    with pytest.raises(ValueError):
+        report.parse_time("yesterday", now)
+    ts = datetime(2026, 10, 17, 12, 47, 5)
+    assert report.bucket_start(ts, 900) == datetime(2026, 10, 17, 12, 45)
+    assert report.bucket_start(ts, None) is None
+
+
+def test_cli_dispatches_report_subcommand(tmp_path, capsys) -> None:
+    path = tmp_path / "log.csv"
+    write_log(path, [["2026-10-17 08:00:00", "12.0", "300.0"]])
+
+    with patch("main.main") as mock_main:
+        code = main.cli(["report", "--file", str(path), "--bucket", "all"])
+    assert code == 0
+    mock_main.assert_not_called()
+    table = capsys.readouterr().out
+    assert "Gateway_RTT_avg_ms" in table and "12.00" in table
+
+    with patch("main.main") as mock_main:
+        assert main.cli([]) == 0
+    mock_main.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "option, value", [("--percentiles", "0"), ("--percentiles", "100"), ("--bucket", "0s")]
+)
+def test_report_rejects_degenerate_percentiles_and_buckets(
+    tmp_path, capsys, option, value
+) -> None:
+    path = tmp_path / "log.csv"
+    write_log(path, [["2026-10-17 08:00:00", "12.0", "300.0"]])
+
+    assert main.cli(["report", "--file", str(path), option, value]) == 2
+    assert capsys.readouterr().err.startswith("Error: Invalid")
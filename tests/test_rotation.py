@@ -0,0 +1,64 @@
+import gzip
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+import main
+import rotation
+import storage
+
+HEADER = ["Timestamp", "Gateway_RTT_avg_ms"]
+
+
+def test_size_rotation_writes_segment_and_manifest(tmp_path) -> None:
+    path = tmp_path / "log.csv"
+    sink = storage.CsvResultSink(str(path), rotator=rotation.LogRotator(str(path), max_bytes=100))
+    for minute in range(6):
+        sink.write(HEADER, [f"2026-10-17 12:0{minute}:00", "4.000"])
+    sink.close()
+
+    rotator = rotation.LogRotator(str(path))
+    [segment] = rotator.manifest()
+    assert segment["file"] == "log.20261017-120000.csv.gz"
+    assert (segment["start"], segment["end"]) == ("2026-10-17 12:00:00", "2026-10-17 12:02:00")
+    assert segment["rows"] == 3
+    with gzip.open(tmp_path / segment["file"], "rt") as f:
+        assert f.readline().startswith("Timestamp,")
+    # The live file restarts with a header.
+    assert path.read_text().splitlines()[0] == ",".join(HEADER)
+
+
+def test_daily_rotation_and_range_lookup(tmp_path) -> None:
+    path = tmp_path / "log.csv"
+    sink = storage.CsvResultSink(str(path), rotator=rotation.LogRotator(str(path), daily=True))
+    for day in (15, 16, 17):
+        sink.write(HEADER, [f"2026-10-{day} 23:00:00", "4.000"])
+        sink.write(HEADER, [f"2026-10-{day} 23:30:00", "5.000"])
+    sink.close()
+
+    rotator = rotation.LogRotator(str(path))
+    assert [s["rows"] for s in rotator.manifest()] == [2, 2]
+    files = rotator.files_for_range(datetime(2026, 10, 16), datetime(2026, 10, 17))
+    assert [os.path.basename(f) for f in files] == ["log.20261016-230000.csv.gz", "log.csv"]
+    with rotation.open_log(files[0]) as f:
+        assert f.read().count("2026-10-16") == 2
+
+
+def test_raw_gateway_log_rotates(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    raw_log = tmp_path / "raw.log"
+    monkeypatch.setattr(main, "RAW_GATEWAY_LOG_FILE", str(raw_log))
+    monkeypatch.setattr(config, "LOG_RAW_GATEWAY_OUTPUT", True)
+    monkeypatch.setattr(config, "LOG_ROTATE_MAX_BYTES", 10, raising=False)
+
+    main.log_raw_gateway_output("ping output")
+    main.log_raw_gateway_output("ping output")
+
+    [segment] = rotation.LogRotator(str(raw_log)).manifest()
+    assert segment["rows"] == 1
+    assert segment["file"].startswith("raw.") and segment["file"].endswith(".log.gz")
+    assert raw_log.read_text().count("--- Log entry from") == 1
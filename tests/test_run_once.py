@@ -0,0 +1,105 @@
+import json
+import os
+import stat
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+import main
+import statefile
+
+
+@pytest.fixture
+def local_only(monkeypatch, tmp_path):
+    """Config with every probe off and the logs under tmp_path."""
+    for name, value in {
+        "LOG_FILE": str(tmp_path / "log.csv"),
+        "ENABLE_SQLITE_STORE": False,
+        "ENABLE_BINARY_LOG": False,
+        "RUN_LOCAL_PING_TEST": False,
+        "RUN_LOCAL_GATEWAY_PING_TEST": False,
+        "RUN_LOCAL_SPEED_TEST": False,
+        "RUN_WIFI_DIAGNOSTICS_TEST": False,
+        "RUN_LAN_BUFFERBLOAT_TEST": False,
+        "RUN_GATEWAY_PING_TEST": False,
+        "RUN_GATEWAY_SPEED_TEST_INTERVAL": 0,
+        "PING_RTT_THRESHOLD": 50.0,
+    }.items():
+        monkeypatch.setattr(config, name, value, raising=False)
+    monkeypatch.setattr(main, "run_counter", 0)
+    monkeypatch.setattr(main, "DEVICE_ACCESS_CODE", "")
+    monkeypatch.setattr(main, "saved_gateway_cookies", {})
+    monkeypatch.setattr(main, "expensive_probe_last_run", {})
+    return tmp_path
+
+
+def test_state_file_round_trips_with_owner_only_permissions(tmp_path, capsys) -> None:
+    path = tmp_path / "state.json"
+    assert statefile.load(str(path)) == {}
+
+    path.write_text("{}")
+    path.chmod(0o644)
+    statefile.save(str(path), {"gateway_cookies": {"SID": "abc"}, "run_counter": 3})
+
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    assert statefile.load(str(path)) == {"gateway_cookies": {"SID": "abc"}, "run_counter": 3}
+    assert "Warning" not in capsys.readouterr().out
+
+    path.chmod(0o644)
+    statefile.load(str(path))
+    assert "accessible to other users" in capsys.readouterr().out
+
+
+def test_run_once_prints_json_row_and_exits_on_anomaly(local_only, monkeypatch, capsys) -> None:
+    monkeypatch.setattr(main, "run_local_ping_task", lambda target: {"rtt_avg_ms": 80.0})
+    state_path = local_only / "state.json"
+    state_path.write_text(json.dumps({"run_counter": 4, "access_code": "1234"}))
+
+    code = main.cli(
+        ["run-once", "--probe", "local_ping", "--sink", "json", "--state-file", str(state_path)]
+    )
+
+    assert code == main.EXIT_ANOMALY
+    assert not (local_only / "log.csv").exists()
+    captured = capsys.readouterr()
+    row = json.loads(captured.out.splitlines()[-1])
+    assert row["Local_WAN_RTT_avg_ms"] == 80.0
+    assert row["Anomalies"] == ["Local_WAN_RTT_avg_ms"] and row["Failed_Probes"] == []
+    assert "Starting scheduled checks: local_ping" in captured.err
+    assert config.RUN_LOCAL_PING_TEST is False  # The --probe override is undone
+
+    state = statefile.load(str(state_path))
+    assert "access_code" not in state and state["run_counter"] == 4  # Left to .env
+
+
+def test_run_once_carries_state_and_reports_failed_probes(local_only, monkeypatch) -> None:
+    monkeypatch.setattr(main, "run_local_ping_task", lambda target: {})
+    monkeypatch.setattr(config, "RUN_LOCAL_PING_TEST", True)
+    state_path = local_only / "state.json"
+    statefile.save(str(state_path), {"run_counter": 6, "gateway_cookies": {"SID": "abc"}})
+
+    code = main.cli(["run-once", "--sink", "csv", "--state-file", str(state_path)])
+
+    assert code == main.EXIT_PROBE_FAILED
+    assert (local_only / "log.csv").exists()
+    assert main.get_gateway_http_client().cookies == {"SID": "abc"}
+    main.close_gateway_http_client()
+    state = statefile.load(str(state_path))
+    assert state["run_counter"] == 7 and state["gateway_cookies"] == {"SID": "abc"}
+
+
+def test_run_once_maps_a_failed_cycle_to_exit_error(local_only, monkeypatch, capsys) -> None:
+    def no_terminal(prompt: str) -> str:
+        raise EOFError
+
+    monkeypatch.delenv("GATEWAY_ACCESS_CODE", raising=False)
+    monkeypatch.setattr("dotenv.load_dotenv", lambda: False)
+    monkeypatch.setattr(main.getpass, "getpass", no_terminal)
+
+    code = main.cli(["run-once", "--probe", "gateway_speed", "--sink", "json", "--no-state"])
+
+    assert code == main.EXIT_ERROR
+    assert "Check cycle failed: EOFError" in capsys.readouterr().err
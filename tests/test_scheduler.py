@@ -0,0 +1,226 @@
+import os
+import sys
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+import main
+import scheduler
+import thresholds
+
+
+class FakeClock:
+    """Monotonic and wall clocks that only move when a job 'runs' or the test advances."""
+
+    def __init__(self, wall: float = 1_000_000.0) -> None:
+        self.now = 0.0
+        self.wall_offset = wall
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def wall(self) -> float:
+        return self.wall_offset + self.now
+
+
+def make_scheduler(clock: FakeClock) -> scheduler.Scheduler:
+    return scheduler.Scheduler(clock=clock.monotonic, wall_clock=clock.wall)
+
+
+def run_until(sched: scheduler.Scheduler, clock: FakeClock, end: float) -> None:
+    """Jumps the clock from due time to due time, as wait() would, until `end`."""
+    while True:
+        idle = sched.idle_seconds()
+        if idle is None or clock.now + idle > end:
+            break
+        clock.now += idle
+        sched.run_pending()
+
+
+def test_sub_minute_interval_runs_on_a_fixed_grid() -> None:
+    clock = FakeClock()
+    sched = make_scheduler(clock)
+    calls: list[float] = []
+    sched.every(0.5, "fast", lambda: calls.append(clock.now))
+
+    run_until(sched, clock, 2.0)
+
+    assert calls == [0.5, 1.0, 1.5, 2.0]
+    assert sched.idle_seconds() == pytest.approx(0.5)
+
+
+def test_aligned_job_fires_on_wall_clock_multiples() -> None:
+    clock = FakeClock(wall=60 * 16_667 + 10.0)  # 10 s past a minute boundary
+    sched = make_scheduler(clock)
+    sched.every(60, "checks", lambda: None, align=True)
+
+    assert sched.idle_seconds() == pytest.approx(50.0)
+
+
+@pytest.mark.parametrize(
+    ("policy", "expected_starts"),
+    [
+        # A 25 s run at t=10 misses the 20 and 30 slots.
+        ("skip", [10.0, 40.0, 50.0]),
+        ("coalesce", [10.0, 35.0, 40.0, 50.0]),
+        ("queue", [10.0, 35.0, 35.0, 40.0, 50.0]),
+    ],
+)
+def test_overrun_policies(policy: scheduler.OverrunPolicy, expected_starts: list[float]) -> None:
+    clock = FakeClock()
+    sched = make_scheduler(clock)
+    starts: list[float] = []
+
+    def job() -> None:
+        starts.append(clock.now)
+        if len(starts) == 1:
+            clock.now += 25.0
+
+    sched.every(10, "probe", job, overrun=policy)
+    run_until(sched, clock, 50.0)
+
+    assert starts == expected_starts
+    assert sched.jobs["probe"].missed == 2
+
+
+def test_daily_job_waits_for_time_of_day() -> None:
+    ten_pm = datetime(2026, 10, 17, 22, 0).timestamp()
+    clock = FakeClock(wall=ten_pm)
+    sched = make_scheduler(clock)
+    sched.daily("03:00", "nightly", lambda: None)
+
+    assert sched.idle_seconds() == pytest.approx(5 * 3600)
+    assert sched.next_run("nightly") == datetime(2026, 10, 18, 3, 0)
+
+
+def test_failing_job_is_rescheduled() -> None:
+    clock = FakeClock()
+    sched = make_scheduler(clock)
+
+    def boom() -> None:
+        raise RuntimeError("boom")
+
+    sched.every(1, "boom", boom)
+    run_until(sched, clock, 3.0)
+
+    assert sched.jobs["boom"].runs == 3
+
+
+def test_build_scheduler_adds_per_probe_jobs(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        config,
+        "PROBE_SCHEDULES",
+        {"gateway_ping": 30, "gateway_speed": "03:00", "bogus": 5},
+        raising=False,
+    )
+    monkeypatch.setattr(config, "RUN_INTERVAL_MINUTES", 5)
+    monkeypatch.setattr(config, "CYCLE_DEADLINE_FRACTION", 0.9, raising=False)
+
+    with patch("main.perform_checks") as mock_checks:
+        sched = main.build_scheduler()
+        sched.jobs["gateway_ping"].func()
+
+    assert set(sched.jobs) == {"checks", "gateway_ping", "gateway_speed"}
+    assert sched.jobs["checks"].interval == 300
+    assert sched.jobs["gateway_ping"].interval == 30
+    assert sched.jobs["gateway_speed"].daily_at == (3, 0)
+    assert sched.idle_seconds() == 0  # Interval probes run right away
+    # Each probe gets 90% of its own interval as its cycle budget.
+    mock_checks.assert_called_once_with(probes=("gateway_ping",), budget_seconds=27.0)
+
+
+def test_cancel_removes_job_even_while_it_runs() -> None:
+    clock = FakeClock()
+    sched = make_scheduler(clock)
+    calls: list[float] = []
+
+    def once() -> None:
+        calls.append(clock.now)
+        sched.cancel("once")
+
+    sched.every(1, "once", once)
+    sched.every(5, "other", lambda: None)
+    run_until(sched, clock, 10.0)
+
+    assert calls == [1.0]
+    assert set(sched.jobs) == {"other"}
+
+
+def test_adaptive_cadence_escalates_and_relaxes() -> None:
+    clock = FakeClock()
+    sched = make_scheduler(clock)
+    fast_runs: list[float] = []
+    adaptive = scheduler.AdaptiveCadence(
+        sched, "adaptive", lambda: fast_runs.append(clock.now), fast_interval=10, hold_seconds=60
+    )
+
+    adaptive.observe([])
+    assert not adaptive.active
+    adaptive.observe(["local_wan_rtt_avg_ms"])
+    assert adaptive.active
+    run_until(sched, clock, 30.0)
+    assert fast_runs == [10.0, 20.0, 30.0]
+
+    adaptive.observe([])  # Healthy, but still inside the hold window
+    assert adaptive.active
+    clock.now = 61.0
+    adaptive.observe([])
+    assert not adaptive.active
+    assert "adaptive" not in sched.jobs
+
+
+def test_find_anomalies_uses_thresholds(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "PING_RTT_THRESHOLD", 30.0)
+    monkeypatch.setattr(config, "PING_RTT_P95_THRESHOLD", 60.0)
+    monkeypatch.setattr(config, "PACKET_LOSS_THRESHOLD", 0.0)
+    monkeypatch.setattr(config, "LOCAL_DOWNSTREAM_SPEED_THRESHOLD", 200.0)
+    monkeypatch.setattr(config, "LATENCY_UNDER_LOAD_THRESHOLD", 100.0)
+    row = {
+        "Timestamp": "2026-10-17 12:00:00",
+        "Local_WAN_RTT_avg_ms": 45.0,
+        "Local_GW_RTT_avg_ms": 2.0,
+        "Local_WAN_LossPercentage": 0.0,
+        "Local_WAN_RTT_p95_ms": 75.0,
+        "Local_Downstream_Mbps": 150.0,
+        "Local_Load_Down_ms": 120.0,
+        "Speedtest_WAN_Down_RTT_p95_ms": 90.0,  # Under load: checked against 100 ms
+        "Gateway_RTT_avg_ms": main.TIMED_OUT,
+    }
+    assert thresholds.find_anomalies(row) == [
+        "Local_WAN_RTT_avg_ms",
+        "Local_WAN_RTT_p95_ms",
+        "Local_Downstream_Mbps",
+        "Local_Load_Down_ms",
+    ]
+
+
+def test_build_scheduler_wires_adaptive_cadence(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "PROBE_SCHEDULES", {}, raising=False)
+    monkeypatch.setattr(config, "ENABLE_ADAPTIVE_CADENCE", True, raising=False)
+    monkeypatch.setattr(config, "ADAPTIVE_PROBES", ("local_ping", "local_speed"), raising=False)
+    monkeypatch.setattr(config, "ADAPTIVE_FAST_INTERVAL_SECONDS", 20, raising=False)
+    monkeypatch.setattr(config, "CYCLE_DEADLINE_FRACTION", 0.9, raising=False)
+
+    with patch("main.perform_checks") as mock_checks:
+        sched = main.build_scheduler()
+        assert main.adaptive_cadence is not None
+        main.adaptive_cadence.observe(["local_wan_rtt_avg_ms"])
+        sched.jobs["adaptive"].func()
+
+    assert sched.jobs["adaptive"].interval == 20
+    # The expensive speed test is never put on the fast cadence.
+    mock_checks.assert_called_once_with(probes=("local_ping",), budget_seconds=18.0)
+    monkeypatch.setattr(main, "adaptive_cadence", None)
+
+
+def test_gateway_speed_baseline_does_not_follow_its_interval(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(config, "RUN_GATEWAY_SPEED_TEST_INTERVAL", 1)
+    assert main.baseline_runs("gateway_speed") == 12
+    monkeypatch.setattr(config, "CONDITIONAL_PROBE_BASELINE_RUNS", {}, raising=False)
+    assert main.baseline_runs("gateway_speed") == 0
@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def test_import_defers_selenium_dotenv_and_http_backend() -> None:
+    code = (
+        "import json, sys; import main; "
+        "before = sorted(m for m in ('selenium', 'dotenv', 'gateway_http') if m in sys.modules); "
+        "main.By; "
+        "print(json.dumps([before, 'selenium' in sys.modules, main.By.ID]))"
+    )
+    probe = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=REPO_ROOT, check=True
+    )
+
+    before, selenium_loaded, by_id = json.loads(probe.stdout)
+    assert before == []
+    assert selenium_loaded and by_id == "id"
+
+
+def test_startup_profile_reports_import_cycle_and_deferred_imports(monkeypatch, capsys) -> None:
+    monkeypatch.setattr(main, "lazy_import_seconds", {})
+    monkeypatch.delitem(vars(main), "gateway_http", raising=False)
+    monkeypatch.setattr(main, "perform_checks", lambda: main.get_gateway_http_client())
+
+    assert main.cli(["startup"]) == 0
+
+    output = capsys.readouterr().out
+    assert "Warning" not in output
+    assert "Import main:" in output and "First cycle:" in output
+    assert "Deferred imports:         gateway_http " in output
@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+import main
+import rotation
+import storage
+
+
+def test_store_uses_wal_typed_columns_and_timestamp_index(tmp_path) -> None:
+    path = str(tmp_path / "results.db")
+    store = storage.ResultStore(path, batch_rows=1)
+    store.append("2026-10-17 12:00:00", {"Gateway_RTT_avg_ms": 4.5, "WiFi_BSSID": "a1:b2"})
+    store.append("2026-10-17 12:01:00", {"Gateway_RTT_avg_ms": "TIMEOUT", "WiFi_BSSID": None})
+    store.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(results)")}
+    assert columns == {"timestamp": "TEXT", "Gateway_RTT_avg_ms": "REAL", "WiFi_BSSID": "TEXT"}
+    indexes = [row[1] for row in conn.execute("PRAGMA index_list(results)")]
+    assert "idx_results_timestamp" in indexes
+    conn.close()
+
+
+def test_store_batches_commits(tmp_path) -> None:
+    path = str(tmp_path / "results.db")
+    store = storage.ResultStore(path, batch_rows=3, batch_seconds=3600)
+    reader = sqlite3.connect(path)
+
+    def committed_rows() -> int:
+        return reader.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    store.append("2026-10-17 12:00:00", {"Gateway_RTT_avg_ms": 1.0})
+    store.append("2026-10-17 12:01:00", {"Gateway_RTT_avg_ms": 2.0})
+    assert committed_rows() == 0
+    store.append("2026-10-17 12:02:00", {"Gateway_RTT_avg_ms": 3.0})
+    assert committed_rows() == 3
+    store.append("2026-10-17 12:03:00", {"Gateway_RTT_avg_ms": 4.0})
+    store.close()
+    assert committed_rows() == 4
+    reader.close()
+
+
+def test_store_commits_lone_row_once_batch_seconds_pass(tmp_path) -> None:
+    path = str(tmp_path / "results.db")
+    store = storage.ResultStore(path, batch_rows=10, batch_seconds=0.05)
+    reader = sqlite3.connect(path)
+
+    store.append("2026-10-17 12:00:00", {"Gateway_RTT_avg_ms": 1.0})
+    assert reader.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 0
+    deadline = time.monotonic() + 5
+    while reader.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 0:
+        assert time.monotonic() < deadline, "pending row was never committed"
+        time.sleep(0.01)
+    store.close()
+    reader.close()
+
+
+def test_query_range_and_new_columns(tmp_path) -> None:
+    store = storage.ResultStore(str(tmp_path / "results.db"), batch_rows=1)
+    store.append("2026-10-16 23:59:00", {"Gateway_RTT_avg_ms": 9.0})
+    store.append("2026-10-17 00:05:00", {"Gateway_RTT_avg_ms": "N/A"})
+    # A column added by a newer version of the logger extends the table.
+    store.append("2026-10-17 06:00:00", {"Gateway_RTT_avg_ms": 5.0, "Local_RTT_p99_ms": 30.0})
+
+    rows = store.query_range(
+        datetime(2026, 10, 17), datetime(2026, 10, 18), columns=["Gateway_RTT_avg_ms"]
+    )
+    assert rows == [
+        {"timestamp": "2026-10-17 00:05:00", "Gateway_RTT_avg_ms": None},
+        {"timestamp": "2026-10-17 06:00:00", "Gateway_RTT_avg_ms": 5.0},
+    ]
+    assert store.query_range(datetime(2026, 10, 17, 6), datetime(2026, 10, 18))[0][
+        "Local_RTT_p99_ms"
+    ] == pytest.approx(30.0)
+    store.close()
+
+
+def test_log_results_writes_to_store(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "LOG_FILE", str(tmp_path / "log.csv"))
+    monkeypatch.setattr(config, "ENABLE_SQLITE_STORE", True, raising=False)
+    monkeypatch.setattr(config, "SQLITE_DB_FILE", str(tmp_path / "log.db"), raising=False)
+    monkeypatch.setattr(config, "SQLITE_BATCH_ROWS", 1, raising=False)
+
+    with patch("builtins.print"):
+        main.log_results({"gateway_rtt_avg_ms": 12.25, "wifi_bssid": "a1:b2"})
+    main.close_result_store()
+
+    conn = sqlite3.connect(str(tmp_path / "log.db"))
+    row = conn.execute("SELECT Gateway_RTT_avg_ms, WiFi_BSSID FROM results").fetchone()
+    conn.close()
+    assert row == (12.25, "a1:b2")
+
+
+def read_lines(path) -> list[str]:
+    return path.read_text().splitlines()
+
+
+def test_csv_sink_writes_header_once_and_flushes_every_n_rows(tmp_path) -> None:
+    path = tmp_path / "log.csv"
+    sink = storage.CsvResultSink(str(path), flush_every_rows=2)
+    with patch("builtins.open", wraps=open) as spy_open:
+        sink.write(["Timestamp", "A"], ["t1", "1"])
+        assert read_lines(path) == []  # Still buffered
+        sink.write(["Timestamp", "A"], ["t2", "2"])
+        assert read_lines(path) == ["Timestamp,A", "t1,1", "t2,2"]
+        sink.write(["Timestamp", "A"], ["t3", "3"])
+    spy_open.assert_called_once()  # One handle for every row
+    sink.close()
+    assert read_lines(path)[-1] == "t3,3"
+
+
+def test_csv_sink_flushes_after_interval(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [0.0]
+    monkeypatch.setattr(storage.time, "monotonic", lambda: now[0])
+    path = tmp_path / "log.csv"
+    sink = storage.CsvResultSink(str(path), flush_every_rows=100, flush_every_seconds=5)
+    now[0] = 1.0
+    sink.write(["Timestamp"], ["t1"])
+    assert read_lines(path) == []
+    now[0] = 6.0
+    sink.write(["Timestamp"], ["t2"])
+    assert read_lines(path) == ["Timestamp", "t1", "t2"]
+
+
+def test_csv_sink_reopens_after_external_rotation(tmp_path, monkeypatch) -> None:
+    now = [0.0]
+    monkeypatch.setattr(storage.time, "monotonic", lambda: now[0])
+    path = tmp_path / "log.csv"
+    sink = storage.CsvResultSink(str(path))
+    stats = []
+    file_identity = sink._file_identity
+    monkeypatch.setattr(sink, "_file_identity", lambda: stats.append(1) or file_identity())
+    sink.write(["Timestamp"], ["t1"])
+    os.rename(path, tmp_path / "log.csv.1")
+    sink.write(["Timestamp"], ["t2"])  # Within REOPEN_CHECK_SECONDS: not re-checked yet
+    now[0] = storage.REOPEN_CHECK_SECONDS
+    sink.write(["Timestamp"], ["t3"])
+    sink.close()
+
+    assert len(stats) == 3  # Each open, plus the one re-check
+    assert read_lines(tmp_path / "log.csv.1") == ["Timestamp", "t1", "t2"]
+    assert read_lines(path) == ["Timestamp", "t3"]
+
+
+def test_csv_sink_starts_new_file_when_header_changes(tmp_path) -> None:
+    path = tmp_path / "log.csv"
+    path.write_text("Timestamp,A\n2026-10-16 12:00:00,1\n")
+    sink = storage.CsvResultSink(str(path))
+    sink.write(["Timestamp", "A", "B"], ["2026-10-17 12:00:00", "2", "3"])
+    sink.close()
+
+    assert read_lines(path) == ["Timestamp,A,B", "2026-10-17 12:00:00,2,3"]
+    rotator = rotation.LogRotator(str(path))
+    [segment] = rotator.manifest()
+    assert segment["start"] == "2026-10-16 12:00:00"
+    with rotation.open_log(str(tmp_path / segment["file"])) as f:
+        assert f.read().splitlines() == ["Timestamp,A", "2026-10-16 12:00:00,1"]
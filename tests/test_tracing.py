@@ -0,0 +1,113 @@
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+import main
+import tracing
+
+
+def test_tracer_exports_chrome_trace_events(tmp_path) -> None:
+    tracer = tracing.Tracer()
+    with tracer.span("outer", "probe", target="gw"):
+        worker = threading.Thread(target=lambda: tracer.add("inner", 0, 0), name="probe_0")
+        worker.start()
+        worker.join()
+    with pytest.raises(ValueError):
+        with tracer.span("broken"):
+            raise ValueError("boom")
+
+    path = tmp_path / "trace.json"
+    tracer.export(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+
+    spans = {e["name"]: e for e in events if e["ph"] == "X"}
+    assert spans["outer"]["cat"] == "probe" and spans["outer"]["args"] == {"target": "gw"}
+    assert spans["outer"]["dur"] >= 0
+    assert spans["broken"]["args"]["error"] == "ValueError: boom"
+    assert spans["inner"]["tid"] != spans["outer"]["tid"]
+    thread_names = {e["args"]["name"] for e in events if e["ph"] == "M"}
+    assert "probe_0" in thread_names
+
+
+def test_span_is_a_no_op_without_an_active_cycle() -> None:
+    assert tracing.finish() is None
+    with tracing.span("ignored"):
+        pass
+    assert tracing.finish() is None
+
+
+def test_perform_checks_writes_a_trace_per_cycle(tmp_path, monkeypatch) -> None:
+    for name, value in {
+        "TRACE_DIR": str(tmp_path / "traces"),
+        "RUN_LOCAL_PING_TEST": True,
+        "RUN_LOCAL_GATEWAY_PING_TEST": False,
+        "RUN_LOCAL_SPEED_TEST": False,
+        "RUN_WIFI_DIAGNOSTICS_TEST": False,
+        "RUN_LAN_BUFFERBLOAT_TEST": False,
+        "RUN_GATEWAY_PING_TEST": False,
+        "RUN_GATEWAY_SPEED_TEST_INTERVAL": 0,
+    }.items():
+        monkeypatch.setattr(config, name, value, raising=False)
+    monkeypatch.setattr(main, "run_local_ping_task", lambda target: {"rtt_avg_ms": 12.0})
+    monkeypatch.setattr(main, "log_results", lambda results: {})
+
+    main.perform_checks()
+
+    (trace_file,) = (tmp_path / "traces").iterdir()
+    assert trace_file.name.startswith("trace-") and trace_file.suffix == ".json"
+    names = {e["name"] for e in json.loads(trace_file.read_text())["traceEvents"]}
+    assert {"perform_checks", "run_local_ping_task (WAN)", "log_results"} <= names
+
+
+def test_abandoned_probe_keeps_recording_to_its_own_cycle() -> None:
+    release = threading.Event()
+
+    def straggler() -> bool:
+        release.wait(5)
+        with tracing.span("late step"):
+            return True
+
+    with main.ProbeExecutor(main.DebugLogger(start_time=0.0), max_workers=1) as executor:
+        first = tracing.start("first")
+        future = executor.submit("straggler", straggler)
+        assert tracing.finish() is first
+        second = tracing.start("second")
+        release.set()
+        assert future.result(5)
+    assert tracing.finish() is second
+
+    assert {"straggler", "late step"} <= {e["name"] for e in first.events()}
+    assert not {"straggler", "late step"} & {e["name"] for e in second.events()}
+
+
+def test_perform_checks_closes_the_trace_when_a_cycle_raises(tmp_path, monkeypatch) -> None:
+    for name, value in {
+        "TRACE_DIR": str(tmp_path / "traces"),
+        "RUN_LOCAL_PING_TEST": False,
+        "RUN_LOCAL_GATEWAY_PING_TEST": False,
+        "RUN_LOCAL_SPEED_TEST": False,
+        "RUN_WIFI_DIAGNOSTICS_TEST": False,
+        "RUN_LAN_BUFFERBLOAT_TEST": False,
+        "RUN_GATEWAY_PING_TEST": False,
+        "RUN_GATEWAY_SPEED_TEST_INTERVAL": 0,
+    }.items():
+        monkeypatch.setattr(config, name, value, raising=False)
+
+    def broken_sink(results):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(main, "log_results", broken_sink)
+
+    with pytest.raises(OSError):
+        main.perform_checks()
+
+    assert tracing.finish() is None
+    (trace_file,) = (tmp_path / "traces").iterdir()
+    names = {e["name"] for e in json.loads(trace_file.read_text())["traceEvents"]}
+    assert {"perform_checks", "log_results"} <= names
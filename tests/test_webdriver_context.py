@@ -96,3 +96,108 @@ def test_perform_checks_uses_context_manager_once(monkeypatch: pytest.MonkeyPatc
     with patch("builtins.open", new_callable=mock_open):
         main.perform_checks()
     assert calls.count == 1
+
+
+def _make_persistent_session(monkeypatch: pytest.MonkeyPatch, drivers: list[MagicMock]):
+    """Builds a PersistentWebDriverSession whose Chrome launches return the given drivers."""
+    monkeypatch.setattr(config, "WEBDRIVER_MAX_MEMORY_MB", None, raising=False)
+    services = [_make_service_with_process(pid=100 + i) for i in range(len(drivers))]
+    for service in services:
+        service.process.poll.return_value = None
+    monkeypatch.setattr(main, "ChromeService", MagicMock(side_effect=services))
+    monkeypatch.setattr(main.webdriver, "Chrome", MagicMock(side_effect=drivers))
+    monkeypatch.setattr(main, "log_running_chromedriver_processes", lambda logger: None)
+    return main.PersistentWebDriverSession(), services
+
+
+def test_persistent_session_reuses_healthy_driver(monkeypatch: pytest.MonkeyPatch) -> None:
+    debug_logger = main.DebugLogger(start_time=time.time())
+    first = _make_driver()
+    session, _ = _make_persistent_session(monkeypatch, [first])
+
+    driver, fresh = session.acquire(main.Options(), debug_logger)
+    assert driver is first and fresh
+    driver, fresh = session.acquire(main.Options(), debug_logger)
+    assert driver is first and not fresh
+    first.quit.assert_not_called()
+
+
+def test_persistent_session_recycles_after_crash(monkeypatch: pytest.MonkeyPatch) -> None:
+    debug_logger = main.DebugLogger(start_time=time.time())
+    first, second = _make_driver(), _make_driver()
+    session, services = _make_persistent_session(monkeypatch, [first, second])
+
+    session.acquire(main.Options(), debug_logger)
+    first.execute_script.side_effect = RuntimeError("chrome not reachable")
+    driver, fresh = session.acquire(main.Options(), debug_logger)
+
+    assert driver is second and fresh
+    first.quit.assert_called_once()
+    services[0].process.kill.assert_called_once()
+
+
+def test_persistent_session_recycles_after_max_uses(monkeypatch: pytest.MonkeyPatch) -> None:
+    debug_logger = main.DebugLogger(start_time=time.time())
+    first, second = _make_driver(), _make_driver()
+    session, _ = _make_persistent_session(monkeypatch, [first, second])
+    monkeypatch.setattr(config, "WEBDRIVER_MAX_SESSION_USES", 2, raising=False)
+
+    drivers = [session.acquire(main.Options(), debug_logger)[0] for _ in range(3)]
+
+    assert drivers == [first, first, second]
+
+
+def test_persistent_session_close_tears_down(monkeypatch: pytest.MonkeyPatch) -> None:
+    debug_logger = main.DebugLogger(start_time=time.time())
+    first = _make_driver()
+    session, services = _make_persistent_session(monkeypatch, [first])
+
+    session.acquire(main.Options(), debug_logger)
+    session.close(debug_logger)
+    session.close(debug_logger)  # Second close is a no-op
+
+    first.quit.assert_called_once()
+    services[0].process.kill.assert_called_once()
+    assert session.driver is None
+
+
+def test_process_tree_rss_sums_descendants() -> None:
+    ps_output = "  10     1  1024\n  11    10  2048\n  12    11  1024\n  13     1  9999\n"
+    with patch.object(main.subprocess, "run", return_value=MagicMock(stdout=ps_output)):
+        assert main.process_tree_rss_mb(10) == pytest.approx(4.0)
+        assert main.process_tree_rss_mb(99) is None
+
+
+def test_abandoned_chrome_startup_is_torn_down_when_it_finishes(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(config, "RUN_GATEWAY_PING_TEST", True, raising=False)
+    monkeypatch.setattr(config, "GATEWAY_BACKEND", "selenium", raising=False)
+    monkeypatch.setattr(config, "REUSE_WEBDRIVER_SESSION", False, raising=False)
+    monkeypatch.setattr(main.Deadline, "GRACE_SECONDS", 0.0)
+    monkeypatch.setattr(main, "build_chrome_options", lambda: None)
+    monkeypatch.setattr(main, "log_results", lambda results: {})
+    events: list[str] = []
+
+    class SlowSession:
+        """Chrome that starts after the cycle budget is spent."""
+
+        def __init__(self, chrome_options, debug_logger) -> None:  # type: ignore[no-untyped-def]
+            pass
+
+        def __enter__(self) -> MagicMock:
+            time.sleep(0.3)
+            events.append("started")
+            return MagicMock()
+
+        def __exit__(self, *exc_info: object) -> None:
+            events.append("torn down")
+
+    monkeypatch.setattr(main, "managed_webdriver_session", SlowSession)
+
+    main.perform_checks(probes=("gateway_ping",), budget_seconds=0.05)
+    deadline = time.monotonic() + 2
+    while len(events) < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert events == ["started", "torn down"]
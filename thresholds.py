@@ -0,0 +1,72 @@
+# thresholds.py
+"""Which config.py threshold applies to each logged column, and in which direction.
+
+Used by run-once and adaptive cadence (a cycle's anomalies) and by the `report`
+subcommand (per-bucket anomaly counts), so both flag the same values.
+"""
+
+from typing import Literal, Mapping, Optional
+
+import config
+
+Comparison = Literal["greater", "less"]
+
+# Column -> (config threshold, direction that counts as an anomaly), mirroring the
+# console highlighting in main.log_results.
+EXACT_THRESHOLDS: dict[str, tuple[str, Comparison]] = {
+    "Gateway_Downstream_Mbps": ("GATEWAY_DOWNSTREAM_SPEED_THRESHOLD", "less"),
+    "Gateway_Upstream_Mbps": ("GATEWAY_UPSTREAM_SPEED_THRESHOLD", "less"),
+    "Local_Downstream_Mbps": ("LOCAL_DOWNSTREAM_SPEED_THRESHOLD", "less"),
+    "Local_Upstream_Mbps": ("LOCAL_UPSTREAM_SPEED_THRESHOLD", "less"),
+    "Download_Bufferbloat_ms": ("BUFFERBLOAT_DELTA_THRESHOLD", "greater"),
+    "Upload_Bufferbloat_ms": ("BUFFERBLOAT_DELTA_THRESHOLD", "greater"),
+    "LAN_Bufferbloat_ms": ("LAN_BUFFERBLOAT_DELTA_THRESHOLD", "greater"),
+    "Local_Load_Down_ms": ("LATENCY_UNDER_LOAD_THRESHOLD", "greater"),
+    "Local_Load_Up_ms": ("LATENCY_UNDER_LOAD_THRESHOLD", "greater"),
+    "Local_Pkt_Loss_Pct": ("SPEEDTEST_PACKET_LOSS_THRESHOLD", "greater"),
+}
+# Column suffix -> config threshold for columns not listed above, first match wins.
+# All of these count values above the threshold.
+SUFFIX_THRESHOLDS: tuple[tuple[str, str], ...] = (
+    # Latency sampled while the speed test loads the link
+    *(
+        (f"_{phase}_RTT_{percentile}_ms", "LATENCY_UNDER_LOAD_THRESHOLD")
+        for phase in ("Down", "Up")
+        for percentile in ("p50", "p95", "p99")
+    ),
+    ("LossPercentage", "PACKET_LOSS_THRESHOLD"),
+    ("_RTT_p50_ms", "PING_RTT_P50_THRESHOLD"),
+    ("_RTT_p95_ms", "PING_RTT_P95_THRESHOLD"),
+    ("_RTT_p99_ms", "PING_RTT_P99_THRESHOLD"),
+    ("_RTT_avg_ms", "PING_RTT_THRESHOLD"),
+    ("StdDev", "JITTER_THRESHOLD"),
+    ("Jitter_ms", "JITTER_THRESHOLD"),
+    ("_Stability_CV", "SPEEDTEST_STABILITY_CV_THRESHOLD"),
+)
+
+
+def anomaly_threshold(column: str) -> Optional[tuple[float, Comparison]]:
+    """The config.py threshold (and its direction) that applies to `column`, if any."""
+    name, comparison = EXACT_THRESHOLDS.get(column, (None, "greater"))
+    if name is None:
+        name = next((n for suffix, n in SUFFIX_THRESHOLDS if column.endswith(suffix)), None)
+    threshold = getattr(config, name, None) if name else None
+    return (threshold, comparison) if threshold is not None else None
+
+
+def crosses(value: float, threshold: tuple[float, Comparison]) -> bool:
+    """True when `value` is on the anomalous side of `threshold`."""
+    limit, comparison = threshold
+    return value > limit if comparison == "greater" else value < limit
+
+
+def find_anomalies(row: Mapping[str, object]) -> list[str]:
+    """Columns of a logged row whose numeric value crosses its config threshold."""
+    anomalies = []
+    for column, value in row.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue  # Missing values and markers like TIMEOUT
+        threshold = anomaly_threshold(column)
+        if threshold is not None and crosses(value, threshold):
+            anomalies.append(column)
+    return anomalies
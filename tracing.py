@@ -0,0 +1,143 @@
+# tracing.py
+"""Span tracing for check cycles, exported as Chrome trace-event JSON.
+
+A Tracer collects spans timed with time.perf_counter_ns(): each probe run by the
+ProbeExecutor, plus the sub-steps inside the WebDriver session and the gateway and
+local tasks (Chrome startup, page loads, element waits, subprocesses). Each span is
+recorded as a complete ("X") event on the thread that ran it. export() writes the
+file that chrome://tracing and https://ui.perfetto.dev open directly.
+
+Code calls the module-level span(), which records to the tracer of the cycle in
+progress and does nothing when tracing is off. The ProbeExecutor binds each probe's
+thread to the tracer that was current when the probe was submitted, so a probe
+abandoned at the cycle deadline keeps recording to its own cycle's trace and its
+late spans never leak into the next one.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Generator, Optional
+
+
+class Tracer:
+    """Thread-safe collector of one cycle's spans."""
+
+    def __init__(self, name: str = "perform_checks") -> None:
+        self.name = name
+        self.origin_ns = time.perf_counter_ns()
+        self._events: list[dict[str, Any]] = []
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        name: str,
+        start_ns: int,
+        end_ns: int,
+        category: str = "task",
+        args: Optional[dict[str, Any]] = None,
+    ) -> None:
+        """Records a finished span on the calling thread."""
+        thread = threading.current_thread()
+        event: dict[str, Any] = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start_ns - self.origin_ns) / 1000,  # Trace events use microseconds
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+            self._threads.setdefault(thread.ident or 0, thread.name)
+
+    @contextmanager
+    def span(self, name: str, category: str = "task", **args: Any) -> Generator[None, None, None]:
+        """Times the block; an exception escaping it is noted in the span's args."""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.add(name, start, time.perf_counter_ns(), category, args)
+
+    def events(self) -> list[dict[str, Any]]:
+        """Spans in start order, preceded by thread-name metadata events."""
+        with self._lock:
+            spans = sorted(self._events, key=lambda e: e["ts"])
+            threads = dict(self._threads)
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in threads.items()
+        ]
+        return metadata + spans
+
+    def export(self, path: str) -> None:
+        """Writes the trace as a JSON object with a traceEvents list."""
+        staging = f"{path}.tmp"
+        with open(staging, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
+        os.replace(staging, path)
+
+
+_active: Optional[Tracer] = None
+# Per-thread tracer set by bind(); a thread without one uses _active.
+_bound = threading.local()
+_UNBOUND = object()
+
+
+def start(name: str = "perform_checks") -> Tracer:
+    """Starts collecting spans for a new cycle."""
+    global _active
+    _active = Tracer(name)
+    return _active
+
+
+def finish() -> Optional[Tracer]:
+    """Stops collecting and returns the cycle's tracer, with a span covering all of it."""
+    global _active
+    tracer, _active = _active, None
+    if tracer is not None:
+        tracer.add(tracer.name, tracer.origin_ns, time.perf_counter_ns(), "cycle")
+    return tracer
+
+
+def current() -> Optional[Tracer]:
+    """The tracer spans on this thread record to: its bound one, else the active cycle's."""
+    return getattr(_bound, "tracer", _active)
+
+
+@contextmanager
+def bind(tracer: Optional[Tracer]) -> Generator[None, None, None]:
+    """Makes spans on this thread record to `tracer` (None: nowhere) inside the block."""
+    previous = vars(_bound).get("tracer", _UNBOUND)
+    _bound.tracer = tracer
+    try:
+        yield
+    finally:
+        if previous is _UNBOUND:
+            del _bound.tracer
+        else:
+            _bound.tracer = previous
+
+
+def span(name: str, category: str = "task", **args: Any) -> ContextManager[None]:
+    """A span on this thread's tracer, or a no-op when no cycle is being traced."""
+    tracer = current()
+    if tracer is None:
+        return nullcontext()
+    return tracer.span(name, category, **args)